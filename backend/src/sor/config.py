@@ -3,10 +3,97 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     anthropic_api_key: str = ""
+    anthropic_base_url: str = "https://api.anthropic.com"
+    # "anthropic", or "fake" for the bundled stand-in server (engine/fake_server.py)
+    llm_provider: str = "anthropic"
     database_path: str = "./data/sor.db"
     default_model: str = "claude-sonnet-4-20250514"
     cors_origins: list[str] = ["*"]
 
+    # Starting budgets for the shared LLM rate limiter; corrected at runtime
+    # from the anthropic-ratelimit-* response headers.
+    llm_requests_per_minute: int = 1000
+    llm_input_tokens_per_minute: int = 450_000
+    llm_output_tokens_per_minute: int = 90_000
+    # Concurrent LLM calls: the starting limit, halved on 429/529 responses
+    # and regained on success; also the ceiling of the stage scheduler
+    llm_max_concurrency: int = 8
+    llm_batch_poll_seconds: float = 60.0
+    # Follow-up calls allowed to continue a response cut off at max_tokens
+    llm_max_continuations: int = 2
+    # Cap on the shared agent context, in estimated tokens; 0 derives the
+    # budget from the context window and each agent's max_tokens
+    context_budget_tokens: int = 0
+    # Finished stage-run jobs and their event logs are pruned after this long
+    stage_job_retention_hours: int = 7 * 24
+    # Resume stages left running by a crash or redeploy at startup, running
+    # only the agents whose output wasn't checkpointed (and restart the
+    # pipelines that were running them)
+    recover_interrupted_stages: bool = True
+    # A running stage holds a lease in the database so processes sharing it
+    # never run the same stage twice; an unrenewed lease expires after this
+    stage_run_lock_ttl_seconds: float = 30.0
+    # Viewers of a running stage share its event stream; each gets a bounded
+    # queue (a slow one catches up from the log) and idle-time heartbeats
+    sse_subscriber_queue_size: int = 256
+    sse_heartbeat_seconds: float = 15.0
+    # Agent calls from every project queue in one scheduler: at most this
+    # many run at once (never more than the rate limiter allows), projects
+    # share them fairly, and interactive runs go before pipelines and
+    # resumed stages, which still get one grant in every batch_every
+    scheduler_max_concurrency: int = 8
+    scheduler_batch_every: int = 4
+    # New stage runs are refused (429 + Retry-After) once this many agent
+    # calls are queued (pipelines at half of it) or this many stage runs are
+    # in progress, and (503) while the circuit breaker is open; 0 disables a
+    # limit. A refused request first waits up to the queue timeout for room.
+    admission_max_queued_calls: int = 32
+    admission_max_running_stages: int = 0
+    admission_queue_timeout_seconds: float = 0.0
+    admission_max_retry_after_seconds: int = 120
+    # Conflict detection starts once this share of a stage's agents has
+    # finished (1.0 waits for all of them) and later outputs are folded in;
+    # agents still running at the stage deadline are stopped, whether or
+    # not the quorum is met (0 = no deadline)
+    stage_quorum: float = 1.0
+    stage_deadline_seconds: float = 0.0
+
+    # Retries (full-jitter backoff, never sooner than retry-after), per-attempt
+    # timeout and overall per-call deadline; the circuit breaker opens after
+    # consecutive upstream failures and sheds calls during its cooldown.
+    llm_max_attempts: int = 5
+    llm_backoff_base_seconds: float = 1.0
+    llm_backoff_max_seconds: float = 30.0
+    llm_attempt_timeout_seconds: float = 120.0
+    llm_call_deadline_seconds: float = 300.0
+    llm_breaker_failure_threshold: int = 5
+    llm_breaker_cooldown_seconds: float = 30.0
+
+    # HTTP connection pool for the LLM client. HTTP/2 needs the optional h2
+    # package (pip install "httpx[http2]"); warm-up opens connections at startup.
+    llm_pool_max_connections: int = 100
+    llm_pool_max_keepalive: int = 20
+    llm_pool_keepalive_expiry_seconds: float = 30.0
+    llm_http2: bool = False
+    llm_warmup_connections: int = 4
+
+    # Opt-in response cache (in-memory LRU in front of the SQLite llm_cache table)
+    llm_cache_enabled: bool = False
+    llm_cache_ttl_seconds: int = 7 * 24 * 3600
+    llm_cache_memory_entries: int = 256
+    llm_cache_max_rows: int = 5000
+
+    # Fake provider: an empty URL mounts the fake server in-process
+    fake_llm_url: str = ""
+    fake_llm_ttft_ms: float = 500.0
+    fake_llm_ttft_distribution: str = "lognormal"
+    fake_llm_tokens_per_second: float = 60.0
+    fake_llm_output_tokens: int = 400
+    fake_llm_error_rate_429: float = 0.0
+    fake_llm_error_rate_529: float = 0.0
+    fake_llm_requests_per_minute: int = 1000
+    fake_llm_seed: int = 0
+
     model_config = {"env_file": ".env", "env_file_encoding": "utf-8"}
 
 
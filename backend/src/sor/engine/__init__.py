@@ -1,10 +1,25 @@
 from .conflict_detector import detect_conflicts
-from .llm_client import LLMClient, LLMError
+from .llm_client import CircuitOpenError, LLMClient, LLMError, cacheable
 from .orchestrator import StageOrchestrator
+from .providers import AnthropicProvider, FakeProvider, LLMProvider
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .retry import CircuitBreaker, RetryPolicy
+from .usage import track_usage
 
 __all__ = [
+    "AnthropicProvider",
+    "CircuitBreaker",
+    "CircuitOpenError",
+    "FakeProvider",
     "LLMClient",
     "LLMError",
+    "LLMProvider",
+    "RateLimiter",
+    "ResponseCache",
+    "RetryPolicy",
     "StageOrchestrator",
+    "cacheable",
     "detect_conflicts",
+    "track_usage",
 ]
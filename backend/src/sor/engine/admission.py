@@ -0,0 +1,222 @@
+"""Admission control for new stage runs.
+
+The scheduler queues agent calls without limit, so a burst of runs would
+only make every queue longer and every run slower. Before a new run is
+started, the controller checks the current load and refuses the run with
+a retry delay when:
+
+- the LLM circuit breaker is open: the upstream is failing and the run
+  could not make progress (503);
+- the agent calls already queued, plus those of the new run, exceed
+  ``max_queued_calls`` (429);
+- ``max_running_stages`` stage runs are already in progress (429).
+
+A refused request can instead wait up to ``queue_timeout`` seconds for the
+load to drop. Joining a run that is already in progress is always allowed.
+
+A run takes a few awaits to start and its agents reach the scheduler later
+still, so an admitted run holds a ``Reservation``: its agent calls count
+as queued, and the run as in progress, until they show up in the scheduler
+and the running jobs. Otherwise a burst of requests would all be admitted
+against the load from before the burst.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from dataclasses import dataclass
+
+from .jobs import JobManager
+from .retry import CircuitBreaker
+from .scheduler import Lane, StageScheduler
+
+# How often a waiting request re-checks the load
+ADMISSION_POLL_SECONDS = 0.5
+
+
+@dataclass
+class Refusal:
+    """Why a run was not admitted, and when to try again."""
+
+    status_code: int
+    reason: str
+    retry_after: int
+
+
+class AdmissionRefused(Exception):
+    """Raised by ``AdmissionController.admit`` when a run is refused."""
+
+    def __init__(self, refusal: Refusal) -> None:
+        super().__init__(refusal.reason)
+        self.refusal = refusal
+
+
+class Reservation:
+    """Load counted for an admitted run until it shows up elsewhere.
+
+    Each agent call takes itself off the reservation when it enters the
+    scheduler (``take_call``), and the run stops counting as starting once
+    its job runs (``started``). ``release`` gives back whatever is left:
+    the run ended, failed to start, or joined one already in progress.
+    """
+
+    def __init__(self, controller: AdmissionController, calls: int) -> None:
+        self._controller = controller
+        self.calls = calls
+        self.starting = True
+
+    def take_call(self) -> None:
+        if self.calls:
+            self.calls -= 1
+            self._controller._reserved_calls -= 1
+
+    def started(self) -> None:
+        if self.starting:
+            self.starting = False
+            self._controller._starting_runs -= 1
+
+    def release(self) -> None:
+        self.started()
+        self._controller._reserved_calls -= self.calls
+        self.calls = 0
+
+
+class AdmissionController:
+    """Decides whether a new stage run may start under the current load.
+
+    Args:
+        scheduler: The scheduler the run's agent calls would queue in.
+        jobs: The running stage jobs.
+        breaker: The LLM client's circuit breaker.
+        max_queued_calls: Queued agent calls beyond which runs are
+            refused; 0 disables the limit.
+        max_running_stages: Stage runs in progress beyond which runs are
+            refused; 0 disables the limit.
+        queue_timeout: Seconds a refused request waits for room before
+            it is refused for good.
+        max_retry_after: Upper bound on the advertised retry delay.
+    """
+
+    def __init__(
+        self,
+        scheduler: StageScheduler,
+        jobs: JobManager,
+        breaker: CircuitBreaker,
+        max_queued_calls: int = 32,
+        max_running_stages: int = 0,
+        queue_timeout: float = 0.0,
+        max_retry_after: int = 120,
+    ) -> None:
+        self._scheduler = scheduler
+        self._jobs = jobs
+        self._breaker = breaker
+        self._max_queued_calls = max_queued_calls
+        self._max_running_stages = max_running_stages
+        self._queue_timeout = queue_timeout
+        self._max_retry_after = max(1, max_retry_after)
+        self._admitted = 0
+        self._refused = 0
+        # Held by admitted runs (see Reservation)
+        self._reserved_calls = 0
+        self._starting_runs = 0
+
+    def check(self, agent_count: int, lane: Lane = Lane.INTERACTIVE) -> Refusal | None:
+        """Refuse a run of ``agent_count`` agents now, or return None to admit it.
+
+        Batch runs (pipelines) are refused once half the queue budget is
+        used, leaving the rest to interactive runs.
+        """
+        if self._breaker.state == "open":
+            return Refusal(
+                status_code=503,
+                reason="The LLM provider is failing; runs are paused until it recovers",
+                retry_after=self._retry_after(self._breaker.retry_in()),
+            )
+
+        max_queued = self._max_queued_calls
+        if max_queued and lane == Lane.BATCH:
+            max_queued = max(1, max_queued // 2)
+        queued = self._scheduler.queued + self._reserved_calls
+        if max_queued and queued + agent_count > max_queued:
+            return Refusal(
+                status_code=429,
+                reason=(
+                    f"{queued} agent calls are already queued; "
+                    "try again when the queue has drained"
+                ),
+                retry_after=self._retry_after(
+                    self._scheduler.estimated_wait(self._reserved_calls + agent_count),
+                ),
+            )
+
+        running = self._jobs.running_count + self._starting_runs
+        if self._max_running_stages and running >= self._max_running_stages:
+            return Refusal(
+                status_code=429,
+                reason=f"{running} stage runs are already in progress",
+                retry_after=self._retry_after(
+                    self._scheduler.estimated_wait(self._reserved_calls),
+                ),
+            )
+        return None
+
+    async def admit(self, agent_count: int, lane: Lane = Lane.INTERACTIVE) -> Reservation:
+        """Like ``check``, but wait up to the queue timeout for room first.
+
+        Returns the run's reservation, which the caller hands to the job
+        it starts (or releases).
+
+        Raises:
+            AdmissionRefused: If the run is still refused at the timeout.
+        """
+        deadline = time.monotonic() + self._queue_timeout
+        while True:
+            refusal = self.check(agent_count, lane)
+            remaining = deadline - time.monotonic()
+            if refusal is None or remaining <= 0:
+                break
+            await asyncio.sleep(min(ADMISSION_POLL_SECONDS, remaining))
+        if refusal is not None:
+            self._refused += 1
+            raise AdmissionRefused(refusal)
+        self._admitted += 1
+        self._reserved_calls += agent_count
+        self._starting_runs += 1
+        return Reservation(self, agent_count)
+
+    def status(self) -> dict:
+        """Current load, and whether a new interactive run would be admitted."""
+        refusal = self.check(0)
+        if refusal is not None:
+            state = "unavailable" if refusal.status_code == 503 else "overloaded"
+        elif self._scheduler.queued or self._reserved_calls:
+            state = "busy"
+        else:
+            state = "ok"
+        scheduler = self._scheduler.stats()
+        return {
+            "state": state,
+            "reason": refusal.reason if refusal else None,
+            "retry_after_seconds": refusal.retry_after if refusal else None,
+            "agent_calls": {
+                "running": scheduler["running"],
+                "ceiling": scheduler["ceiling"],
+                "queued": scheduler["waiting"],
+                "reserved": self._reserved_calls,
+                "max_queued": self._max_queued_calls or None,
+                "estimated_wait_seconds": scheduler["estimated_wait_seconds"],
+            },
+            "stage_runs": {
+                "running": self._jobs.running_count,
+                "starting": self._starting_runs,
+                "max_running": self._max_running_stages or None,
+            },
+            "circuit_breaker": self._breaker.state,
+            "admitted": self._admitted,
+            "refused": self._refused,
+        }
+
+    def _retry_after(self, seconds: float) -> int:
+        return min(self._max_retry_after, max(1, math.ceil(seconds)))
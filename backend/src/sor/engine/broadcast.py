@@ -0,0 +1,147 @@
+"""In-process pub/sub for live stage runs.
+
+A channel per (project, stage) carries the events of the run in progress,
+so every viewer of a stage shares one run instead of starting their own.
+The channel keeps the full event log as a backlog: a subscriber first
+replays it from the requested position, then receives live events through
+its own bounded queue.
+
+Publishing never waits on a subscriber. When a slow subscriber's queue is
+full it is marked as lagging and stops receiving pushes; it catches up from
+the backlog once it reads again, so it loses nothing and holds up no one.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator
+
+from ..models import SSEEvent
+
+SUBSCRIBER_QUEUE_SIZE = 256
+HEARTBEAT_SECONDS = 15.0
+
+_CLOSED = (0, None)
+
+
+class _Subscriber:
+    def __init__(self, queue_size: int) -> None:
+        self.queue: asyncio.Queue[tuple[int, SSEEvent | None]] = asyncio.Queue(queue_size)
+        self.lagging = False
+
+    def offer(self, item: tuple[int, SSEEvent | None]) -> None:
+        if self.lagging:
+            return
+        try:
+            self.queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.lagging = True
+
+    def drain(self) -> None:
+        while not self.queue.empty():
+            self.queue.get_nowait()
+
+
+class Channel:
+    """The event log of one run and the subscribers following it."""
+
+    def __init__(self, key: tuple[str, int], job_id: str, queue_size: int) -> None:
+        self.key = key
+        self.job_id = job_id
+        self.backlog: list[SSEEvent] = []
+        self.closed = False
+        self._queue_size = queue_size
+        self._subscribers: set[_Subscriber] = set()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event: SSEEvent) -> int:
+        """Append ``event`` to the log, push it to every subscriber, and return its sequence number."""
+        self.backlog.append(event)
+        seq = len(self.backlog)
+        for subscriber in self._subscribers:
+            subscriber.offer((seq, event))
+        return seq
+
+    def close(self) -> None:
+        """End the run; subscribers return once they have caught up."""
+        self.closed = True
+        for subscriber in self._subscribers:
+            subscriber.offer(_CLOSED)
+
+    async def subscribe(
+        self,
+        after: int = 0,
+        heartbeat: float | None = HEARTBEAT_SECONDS,
+    ) -> AsyncIterator[tuple[int, SSEEvent] | None]:
+        """Yield (sequence number, event) for every event after ``after``.
+
+        Yields None after ``heartbeat`` seconds without an event, so the
+        caller can keep an idle connection alive. Returns when the channel
+        is closed and every event has been delivered.
+        """
+        subscriber = _Subscriber(self._queue_size)
+        self._subscribers.add(subscriber)
+        sent = after
+        try:
+            while True:
+                # Replay (and catch-up after lagging) comes from the backlog
+                while sent < len(self.backlog):
+                    sent += 1
+                    yield sent, self.backlog[sent - 1]
+                if self.closed:
+                    return
+                if subscriber.lagging:
+                    subscriber.lagging = False
+                    subscriber.drain()
+                    continue
+
+                try:
+                    async with asyncio.timeout(heartbeat):
+                        seq, event = await subscriber.queue.get()
+                except TimeoutError:
+                    yield None
+                    continue
+                if event is not None and seq > sent:
+                    sent = seq
+                    yield seq, event
+        finally:
+            self._subscribers.discard(subscriber)
+
+
+class BroadcastHub:
+    """Channels of the runs in progress, keyed by (project id, stage number)."""
+
+    def __init__(
+        self,
+        queue_size: int = SUBSCRIBER_QUEUE_SIZE,
+        heartbeat: float = HEARTBEAT_SECONDS,
+    ) -> None:
+        self.heartbeat = heartbeat
+        self._queue_size = queue_size
+        self._channels: dict[tuple[str, int], Channel] = {}
+
+    def active(self, project_id: str, stage_number: int) -> Channel | None:
+        """The open channel of a stage's run, if one is in progress."""
+        channel = self._channels.get((project_id, stage_number))
+        return channel if channel is not None and not channel.closed else None
+
+    def open(self, project_id: str, stage_number: int, job_id: str) -> Channel:
+        """Create the channel for a new run of a stage."""
+        key = (project_id, stage_number)
+        channel = Channel(key, job_id, self._queue_size)
+        self._channels[key] = channel
+        return channel
+
+    def close(self, channel: Channel) -> None:
+        channel.close()
+        if self._channels.get(channel.key) is channel:
+            del self._channels[channel.key]
+
+    def stats(self) -> dict:
+        return {
+            "channels": len(self._channels),
+            "subscribers": sum(c.subscriber_count for c in self._channels.values()),
+        }
@@ -2,12 +2,23 @@
 
 Compares multiple agent outputs and produces a structured ConflictReport
 identifying agreements, disagreements, unresolved tensions, and a synthesis.
+Outputs that arrive after a report was made are folded into it with
+``update_conflicts``, which sends only the new outputs and the report.
 """
 
 from __future__ import annotations
 
-from ..models import AgentOutput, ConflictReport
-from .llm_client import LLMClient, LLMError
+from pydantic import BaseModel, ValidationError
+
+from ..models import AgentOutput, AgreementPoint, ConflictReport, DisagreementPoint
+from .llm_client import LLMClient, LLMError, cacheable
+from .usage import track_usage
+
+REPORT_TOOL_NAME = "record_conflict_report"
+PROBE_TOOL_NAME = "record_disagreements"
+
+# Room for a full report across many agents; truncated output is salvaged anyway
+CONFLICT_MAX_TOKENS = 8192
 
 CONFLICT_DETECTION_PROMPT = """\
 You are an expert research conflict analyst. Your PRIMARY job is to surface \
@@ -29,7 +40,8 @@ CRITICAL: Dig deep for disagreements. Even when agents seem to agree on the surf
 - OMISSIONS — what one agent covers that others ignore entirely
 - IMPLICIT vs EXPLICIT disagreements (agents may agree on "what" but disagree on "why" or "how much")
 
-Analyze the provided agent outputs and return a JSON object with this exact structure:
+Analyze the provided agent outputs and record your analysis with the \
+record_conflict_report tool. The report has this structure:
 
 {
   "agreements": [
@@ -80,7 +92,6 @@ Rules:
 - Flag any claim that sounds authoritative but lacks a cited source — these are the most dangerous.
 - The synthesis should be actionable and balanced, not merely descriptive.
 - If within_agent_contradictions or evidence_chain_breaks are found, the synthesis MUST mention them.
-- Only output valid JSON. No markdown fences, no commentary outside the JSON.
 """
 
 
@@ -111,16 +122,19 @@ async def detect_conflicts(
             ),
         )
 
-    user_message = _build_comparison_message(agent_outputs, stage)
+    comparison = _build_comparison_message(agent_outputs, stage)
 
     try:
-        data = await llm_client.complete_json(
-            system_prompt=CONFLICT_DETECTION_PROMPT,
-            user_message=user_message,
+        data = await llm_client.complete_tool(
+            system_prompt=_comparison_system(comparison, CONFLICT_DETECTION_PROMPT),
+            user_message=ANALYZE_INSTRUCTION,
+            tools=_report_tools(),
+            tool_name=REPORT_TOOL_NAME,
             temperature=0.0,
+            max_tokens=CONFLICT_MAX_TOKENS,
         )
     except LLMError:
-        # If JSON parsing fails, return a minimal report rather than crashing
+        # If nothing usable came back, return a minimal report rather than crashing
         return ConflictReport(
             stage=stage,
             synthesis="Conflict detection failed: unable to parse LLM response.",
@@ -131,9 +145,7 @@ async def detect_conflicts(
     disagreements = data.get("disagreements", [])
     if not disagreements and len(agent_outputs) >= 2:
         try:
-            second_pass = await _probe_for_disagreements(
-                agent_outputs, llm_client, stage,
-            )
+            second_pass = await _probe_for_disagreements(comparison, llm_client)
             if second_pass:
                 disagreements = second_pass.get("disagreements", [])
                 # Merge any new tensions found
@@ -143,14 +155,94 @@ async def detect_conflicts(
         except LLMError:
             pass  # Keep first-pass results if second pass fails
 
+    data["disagreements"] = disagreements
+    return _report_from(data, stage)
+
+
+CONFLICT_UPDATE_PROMPT = """\
+You are an expert research conflict analyst. A conflict report was already \
+made from the outputs of some of this stage's agents; the outputs of agents \
+that finished later are given above, along with that report.
+
+Update the report so it covers every agent:
+1. Add each late agent to the agreements it supports, and as a position in \
+the disagreements it takes a side on.
+2. Record new agreements and disagreements the late agents raise, including \
+ones between a late agent and the agents already analyzed (use their \
+positions and evidence in the report).
+3. Check the late agents for within-agent contradictions and evidence chain \
+breaks, as for the others.
+4. Rewrite the synthesis to integrate the late agents.
+
+Keep every item of the existing report unless a late agent's evidence \
+changes it. Record the complete updated report with the \
+record_conflict_report tool; the same rules apply as for the original \
+analysis: prioritize disagreements and confidence ranges from 0.0 to 1.0.
+"""
+
+
+async def update_conflicts(
+    report: ConflictReport,
+    analyzed_outputs: list[AgentOutput],
+    late_outputs: list[AgentOutput],
+    llm_client: LLMClient,
+    stage: int,
+) -> ConflictReport:
+    """Fold the outputs of agents that finished late into an existing report.
+
+    Only the late outputs are sent in full, with the report standing in for
+    the outputs it was made from, so the update is far cheaper than running
+    detection again over every output.
+
+    Args:
+        report: The report made from ``analyzed_outputs``.
+        analyzed_outputs: The outputs ``report`` covers.
+        late_outputs: The completed outputs to add.
+        llm_client: The LLM client to use for analysis.
+        stage: The stage number these outputs belong to.
+
+    Returns:
+        The updated ConflictReport; if the update fails, ``report`` with the
+        late agents noted as an unresolved tension.
+    """
+    if not late_outputs:
+        return report
+    if len(analyzed_outputs) < 2:
+        # Nothing was compared yet, so there is nothing to build on
+        return await detect_conflicts(analyzed_outputs + late_outputs, llm_client, stage)
+
+    message = _build_update_message(report, analyzed_outputs, late_outputs, stage)
+    try:
+        data = await llm_client.complete_tool(
+            system_prompt=_comparison_system(message, CONFLICT_UPDATE_PROMPT),
+            user_message=ANALYZE_INSTRUCTION,
+            tools=_report_tools(),
+            tool_name=REPORT_TOOL_NAME,
+            temperature=0.0,
+            max_tokens=CONFLICT_MAX_TOKENS,
+        )
+    except LLMError:
+        names = ", ".join(o.agent_name for o in late_outputs)
+        return report.model_copy(update={
+            "unresolved_tensions": report.unresolved_tensions + [
+                f"Automated conflict analysis of late outputs ({names}) was unsuccessful.",
+            ],
+        })
+    return _report_from(data, stage)
+
+
+def _report_from(data: dict, stage: int) -> ConflictReport:
+    # Items are validated one by one so a truncated or malformed entry is
+    # dropped without losing the rest of the report.
+    synthesis = data.get("synthesis")
     return ConflictReport(
         stage=stage,
-        agreements=data.get("agreements", []),
-        disagreements=disagreements,
-        unresolved_tensions=data.get("unresolved_tensions", []),
-        within_agent_contradictions=data.get("within_agent_contradictions", []),
-        evidence_chain_breaks=data.get("evidence_chain_breaks", []),
-        synthesis=data.get("synthesis", ""),
+        agreements=_valid_items(AgreementPoint, data.get("agreements")),
+        disagreements=_valid_items(DisagreementPoint, data.get("disagreements")),
+        unresolved_tensions=_strings(data.get("unresolved_tensions")),
+        within_agent_contradictions=_strings(data.get("within_agent_contradictions")),
+        evidence_chain_breaks=_strings(data.get("evidence_chain_breaks")),
+        synthesis=synthesis if isinstance(synthesis, str) else "",
     )
 
 
@@ -167,7 +259,7 @@ Look specifically for:
 5. IMPLICIT assumptions — what does each agent take for granted that others don't?
 6. DEGREE differences — do agents agree on direction but differ on magnitude/urgency?
 
-Return a JSON object with ONLY these fields:
+Record your findings with the record_disagreements tool, filling ONLY these fields:
 {
   "disagreements": [
     {
@@ -181,28 +273,106 @@ Return a JSON object with ONLY these fields:
   ],
   "unresolved_tensions": ["Any new tensions found"]
 }
-
-Only output valid JSON. No markdown fences.
 """
 
+ANALYZE_INSTRUCTION = (
+    "Analyze the agent outputs above according to your instructions and "
+    "record the result with the tool they name."
+)
+
 
 async def _probe_for_disagreements(
-    agent_outputs: list[AgentOutput],
+    comparison: str,
     llm_client: LLMClient,
-    stage: int,
 ) -> dict | None:
-    """Second pass: probe specifically for disagreements when first pass found none."""
-    user_message = _build_comparison_message(agent_outputs, stage)
+    """Second pass: probe specifically for disagreements when first pass found none.
+
+    Reuses the first pass's comparison prefix, so the agent outputs are read
+    from the prompt cache rather than billed again at full price.
+    """
     try:
-        return await llm_client.complete_json(
-            system_prompt=DISAGREEMENT_PROBE_PROMPT,
-            user_message=user_message,
-            temperature=0.2,  # Slightly creative to find subtle differences
-        )
+        with track_usage("probe"):
+            return await llm_client.complete_tool(
+                system_prompt=_comparison_system(comparison, DISAGREEMENT_PROBE_PROMPT),
+                user_message=ANALYZE_INSTRUCTION,
+                tools=_report_tools(),
+                tool_name=PROBE_TOOL_NAME,
+                temperature=0.2,  # Slightly creative to find subtle differences
+                max_tokens=CONFLICT_MAX_TOKENS,
+            )
     except LLMError:
         return None
 
 
+def _report_tools() -> list[dict]:
+    """Tools for the detection pass and the probe, with schemas taken from ConflictReport.
+
+    Both calls are offered the same tool list (tools come first in the
+    prompt-cache prefix), so the probe still reads the comparison from cache.
+    """
+    return [
+        _report_tool(
+            REPORT_TOOL_NAME,
+            "Record the conflict analysis of the agent outputs.",
+            ("agreements", "disagreements", "unresolved_tensions",
+             "within_agent_contradictions", "evidence_chain_breaks", "synthesis"),
+        ),
+        _report_tool(
+            PROBE_TOOL_NAME,
+            "Record subtle disagreements and tensions found on a second look.",
+            ("disagreements", "unresolved_tensions"),
+        ),
+    ]
+
+
+def _report_tool(name: str, description: str, fields: tuple[str, ...]) -> dict:
+    schema = ConflictReport.model_json_schema()
+    defs = schema.get("$defs", {})
+    return {
+        "name": name,
+        "description": description,
+        "input_schema": {
+            "type": "object",
+            "properties": {field: _inline_refs(schema["properties"][field], defs) for field in fields},
+            "required": list(fields),
+        },
+    }
+
+
+def _inline_refs(node: object, defs: dict) -> object:
+    """Resolve ``$ref``s into ``$defs`` and drop the generated titles."""
+    if isinstance(node, dict):
+        if "$ref" in node:
+            return _inline_refs(defs[node["$ref"].rsplit("/", 1)[-1]], defs)
+        return {
+            key: _inline_refs(value, defs)
+            for key, value in node.items()
+            if not (key == "title" and isinstance(value, str))
+        }
+    if isinstance(node, list):
+        return [_inline_refs(value, defs) for value in node]
+    return node
+
+
+def _valid_items(model: type[BaseModel], items: object) -> list:
+    valid = []
+    for item in items if isinstance(items, list) else []:
+        try:
+            valid.append(model.model_validate(item))
+        except ValidationError:
+            continue
+    return valid
+
+
+def _strings(items: object) -> list[str]:
+    return [item for item in items if isinstance(item, str)] if isinstance(items, list) else []
+
+
+def _comparison_system(comparison: str, instructions: str) -> list[dict]:
+    """Put the (large, shared) agent outputs first as a cacheable block, then the task prompt."""
+    return [cacheable(comparison), {"type": "text", "text": instructions}]
+
+
 def _build_comparison_message(agent_outputs: list[AgentOutput], stage: int) -> str:
     """Build the user message by concatenating all agent outputs with headers."""
     parts: list[str] = [
@@ -210,7 +380,12 @@ def _build_comparison_message(agent_outputs: list[AgentOutput], stage: int) -> s
         f"Compare the following {len(agent_outputs)} agent outputs and identify "
         "agreements, disagreements, unresolved tensions, and provide a synthesis.\n",
     ]
+    parts.extend(_output_sections(agent_outputs))
+    return "\n".join(parts)
+
 
+def _output_sections(agent_outputs: list[AgentOutput]) -> list[str]:
+    parts: list[str] = []
     for i, output in enumerate(agent_outputs, 1):
         parts.append(f"### Agent {i}: {output.agent_name}")
         parts.append(f"**Agent ID:** {output.agent_id}")
@@ -220,5 +395,23 @@ def _build_comparison_message(agent_outputs: list[AgentOutput], stage: int) -> s
         else:
             parts.append("\n(No content produced)\n")
         parts.append("---\n")
+    return parts
 
+
+def _build_update_message(
+    report: ConflictReport,
+    analyzed_outputs: list[AgentOutput],
+    late_outputs: list[AgentOutput],
+    stage: int,
+) -> str:
+    """The existing report, then the late outputs in full."""
+    analyzed = ", ".join(o.agent_name for o in analyzed_outputs)
+    parts = [
+        f"## Stage {stage} Conflict Report So Far\n",
+        f"Made from the outputs of {len(analyzed_outputs)} agents: {analyzed}.\n",
+        report.model_dump_json(indent=2, exclude={"stage"}),
+        "\n---\n",
+        f"## Stage {stage} Late Agent Outputs\n",
+    ]
+    parts.extend(_output_sections(late_outputs))
     return "\n".join(parts)
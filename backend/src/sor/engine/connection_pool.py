@@ -0,0 +1,134 @@
+"""Connection pool configuration and metrics for the LLM HTTP client.
+
+``PoolConfig`` carries the httpx pool limits and the HTTP/2 switch to the
+provider that builds the client. ``PoolMetrics`` measures how long requests
+wait for a pooled connection, using httpcore's per-request ``trace``
+extension, and reports how many pooled connections are active or idle.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import logging
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Trace events that mark the moment a request has been handed a connection:
+# either a new one is being opened, or a pooled one starts sending.
+_ASSIGNED_EVENTS = (
+    "connection.connect_tcp.started",
+    "connection.connect_unix_socket.started",
+    "http11.send_request_headers.started",
+    "http2.send_request_headers.started",
+)
+
+
+def http2_available() -> bool:
+    """Whether the optional ``h2`` package needed for HTTP/2 is installed."""
+    return importlib.util.find_spec("h2") is not None
+
+
+@dataclass
+class PoolConfig:
+    """httpx connection pool settings.
+
+    Args:
+        max_connections: Upper bound on open connections.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        keepalive_expiry: Seconds an idle connection is kept before closing.
+        http2: Negotiate HTTP/2, multiplexing concurrent requests over one
+            connection. Falls back to HTTP/1.1 if ``h2`` is not installed.
+    """
+
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0
+    http2: bool = False
+
+    @property
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive_connections,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    @property
+    def use_http2(self) -> bool:
+        if self.http2 and not http2_available():
+            logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+            self.http2 = False
+        return self.http2
+
+
+class PoolMetrics:
+    """Connection acquisition timings and pool occupancy for one httpx client."""
+
+    def __init__(self) -> None:
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._connections_opened = 0
+        self._http_versions: Counter[str] = Counter()
+
+    def trace(self) -> Callable:
+        """Return a ``trace`` extension callback for one request.
+
+        Pass it as ``extensions={"trace": metrics.trace()}`` right before the
+        request is sent; the time until the pool assigns a connection is
+        recorded as that request's connection wait.
+        """
+        started = time.monotonic()
+        assigned = False
+
+        async def on_event(name: str, info: dict) -> None:
+            nonlocal assigned
+            if name == "connection.connect_tcp.started":
+                self._connections_opened += 1
+            if not assigned and name in _ASSIGNED_EVENTS:
+                assigned = True
+                self._record_wait(time.monotonic() - started)
+
+        return on_event
+
+    def observe_response(self, response: httpx.Response) -> None:
+        """Count the HTTP version a response was served over."""
+        self._http_versions[response.http_version] += 1
+
+    def stats(self, client: httpx.AsyncClient) -> dict:
+        """Return wait-time aggregates and a snapshot of the client's pool."""
+        connections = _pool_connections(client)
+        active = idle = None
+        if connections is not None:
+            active = sum(1 for c in connections if not c.is_closed() and not c.is_idle())
+            idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "active_connections": active,
+            "idle_connections": idle,
+            "connections_opened": self._connections_opened,
+            "connection_waits": self._waits,
+            "avg_connection_wait_ms": (
+                round(self._wait_total / self._waits * 1000, 2) if self._waits else 0.0
+            ),
+            "max_connection_wait_ms": round(self._wait_max * 1000, 2),
+            "http_versions": dict(self._http_versions),
+        }
+
+    def _record_wait(self, seconds: float) -> None:
+        self._waits += 1
+        self._wait_total += seconds
+        self._wait_max = max(self._wait_max, seconds)
+
+
+def _pool_connections(client: httpx.AsyncClient) -> list | None:
+    # httpx does not expose its httpcore pool publicly; transports without a
+    # pool (ASGI, mock) report None.
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    return list(connections) if connections is not None else None
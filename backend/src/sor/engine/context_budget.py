@@ -0,0 +1,156 @@
+"""Local token estimates and context-window packing for agent prompts.
+
+``estimate_tokens`` approximates the tokenizer closely enough for
+budgeting, without a network round trip. ``pack_sections`` fits prompt
+sections into a token budget in priority order: each section is kept in
+full if it fits, otherwise replaced by its shorter fallback (a summary),
+otherwise trimmed at a paragraph boundary, otherwise dropped. The result
+only depends on the input, so every agent of a stage, and every rerun,
+gets the same context.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+
+# Every current Claude model has a 200k-token window (Sonnet 4's 1M window
+# needs a beta header this client doesn't send)
+CONTEXT_WINDOW = 200_000
+
+# Estimates are approximate; keep this share of the window as headroom
+SAFETY_MARGIN = 0.1
+# Trimming a section below this many tokens isn't worth it; drop it instead
+MIN_TRIMMED_TOKENS = 200
+
+TRIM_MARKER = "\n\n[... trimmed to fit the context budget ...]"
+
+_WORD = re.compile(r"[A-Za-z]+")
+_LONG_WORD = re.compile(r"[A-Za-z]{6,}")
+_OTHER = re.compile(r"[^ \tA-Za-z]")
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the token count of ``text``.
+
+    Counts a token per word, plus one for each long word (which the
+    tokenizer usually splits), plus one per digit, punctuation mark,
+    line break or non-Latin character. Runs in a few milliseconds on a
+    full context window; SAFETY_MARGIN absorbs its error.
+    """
+    if not text:
+        return 0
+    return (
+        len(_WORD.findall(text))
+        + len(_LONG_WORD.findall(text))
+        + len(_OTHER.findall(text))
+    )
+
+
+def prompt_budget(max_tokens: int, reserved_text: str = "") -> int:
+    """Tokens left for shared context once output and ``reserved_text`` are accounted for."""
+    usable = int(CONTEXT_WINDOW * (1 - SAFETY_MARGIN))
+    return max(0, usable - max_tokens - estimate_tokens(reserved_text))
+
+
+@dataclass
+class ContextSection:
+    """One packable part of a prompt.
+
+    Attributes:
+        key: Name of the section in the packing report.
+        text: The full text.
+        priority: Lower values are packed first and so survive longest.
+        fallback: Shorter stand-in used when the full text doesn't fit.
+        trimmable: Whether the text may be cut short to fit.
+    """
+
+    key: str
+    text: str
+    priority: int
+    fallback: str = ""
+    trimmable: bool = True
+
+
+@dataclass
+class PackedContext:
+    """Outcome of packing: the text kept per section key, and what was done."""
+
+    texts: dict[str, str]
+    decisions: dict[str, str]
+    budget_tokens: int
+    estimated_tokens: int
+
+    def report(self) -> dict:
+        return {
+            "budget_tokens": self.budget_tokens,
+            "estimated_tokens": self.estimated_tokens,
+            "sections": self.decisions,
+        }
+
+
+def pack_sections(sections: list[ContextSection], budget: int) -> PackedContext:
+    """Fit ``sections`` into ``budget`` tokens, highest priority first.
+
+    Sections marked non-trimmable that don't fit are kept anyway if nothing
+    else has been packed yet (e.g. the research question), and dropped
+    otherwise.
+    """
+    remaining = budget
+    texts: dict[str, str] = {}
+    decisions: dict[str, str] = {}
+
+    for section in sorted(sections, key=lambda s: s.priority):
+        if not section.text:
+            continue
+        full = estimate_tokens(section.text)
+        if full <= remaining:
+            texts[section.key], decisions[section.key] = section.text, "full"
+            remaining -= full
+            continue
+
+        summary = estimate_tokens(section.fallback)
+        if section.fallback and summary <= remaining:
+            texts[section.key], decisions[section.key] = section.fallback, "summarised"
+            remaining -= summary
+        elif section.trimmable and remaining >= MIN_TRIMMED_TOKENS:
+            trimmed = _trim_to(section.text, remaining, full)
+            texts[section.key], decisions[section.key] = trimmed, "trimmed"
+            remaining -= estimate_tokens(trimmed)
+        elif not texts:
+            texts[section.key], decisions[section.key] = section.text, "full"
+            remaining -= full
+        else:
+            decisions[section.key] = "dropped"
+
+    return PackedContext(
+        texts=texts,
+        decisions=decisions,
+        budget_tokens=budget,
+        estimated_tokens=budget - remaining,
+    )
+
+
+def _trim_to(text: str, tokens: int, total_tokens: int) -> str:
+    """Cut ``text`` to at most ``tokens`` tokens, at a paragraph or line break if possible.
+
+    The first cut assumes tokens are spread evenly over the text; while the
+    estimate of the result is still over, the cut moves back in proportion.
+    """
+    cut = int(len(text) * max(0, tokens - estimate_tokens(TRIM_MARKER)) / max(1, total_tokens))
+    while True:
+        trimmed = text[:_break_before(text, cut)].rstrip() + TRIM_MARKER
+        used = estimate_tokens(trimmed)
+        if used <= tokens or cut == 0:
+            return trimmed
+        # Shrink by the overshoot, and by at least a tenth so it always ends
+        cut = min(int(cut * tokens / used), int(cut * 0.9))
+
+
+def _break_before(text: str, cut: int) -> int:
+    """The paragraph or line break shortly before ``cut``, or ``cut`` itself."""
+    for boundary in ("\n\n", "\n"):
+        at = text.rfind(boundary, 0, cut)
+        if at > cut // 2:
+            return at
+    return cut
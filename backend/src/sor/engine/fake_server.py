@@ -0,0 +1,412 @@
+"""Local, deterministic stand-in for the Anthropic Messages API.
+
+Serves ``POST /v1/messages`` (plain and ``stream: true``) and the Message
+Batches endpoints with synthetic responses, so the whole pipeline can be
+exercised and benchmarked without an API key, spend or real rate limits.
+
+Timing and failure behaviour are configurable: time to first token is
+drawn from a fixed, uniform or lognormal distribution, output streams at
+a set token rate, and 429/529 responses and mid-stream overloaded_error
+events can be injected at given rates.
+Responses are seeded from a hash of the request, so identical requests
+get identical text. System prompts asking for JSON get a small valid
+conflict-report-shaped object, and forced tool calls (``tool_choice``) get
+an input generated from the tool's schema, streamed as ``input_json_delta``.
+
+Run standalone with ``python -m sor.engine.fake_server --port 8001`` and
+point the backend at it with ``LLM_PROVIDER=fake FAKE_LLM_URL=http://127.0.0.1:8001``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import random
+import time
+from collections import deque
+from collections.abc import AsyncIterator
+from dataclasses import dataclass
+from typing import TYPE_CHECKING
+from uuid import uuid4
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+if TYPE_CHECKING:
+    from ..config import Settings
+
+WORDS = (
+    "evidence", "stakeholders", "signal", "pattern", "assumption", "insight",
+    "tension", "users", "workflow", "risk", "opportunity", "decision", "context",
+    "constraint", "behaviour", "adoption", "friction", "trust", "outcome", "metric",
+)
+
+
+@dataclass
+class FakeServerConfig:
+    """Behaviour of the fake Messages API.
+
+    Attributes:
+        ttft_ms: Median time to first token, in milliseconds.
+        ttft_distribution: "fixed", "uniform" (0.5x-1.5x) or "lognormal".
+        ttft_sigma: Shape of the lognormal distribution.
+        tokens_per_second: Output streaming rate.
+        output_tokens: Mean response length in tokens (capped by max_tokens).
+        error_rate_429: Probability that a request is rejected as rate limited.
+        error_rate_529: Probability that a request is rejected as overloaded.
+        stream_error_rate: Probability that a streamed response is cut off by
+            an ``overloaded_error`` event.
+        stream_error_after: Output tokens streamed before that event.
+        requests_per_minute: Limit reported in the rate-limit headers; requests
+            beyond it within a 60s window also get a 429.
+        input_tokens_per_minute: Reported input-token limit.
+        output_tokens_per_minute: Reported output-token limit.
+        seed: Mixed into every per-request seed.
+    """
+
+    ttft_ms: float = 500.0
+    ttft_distribution: str = "lognormal"
+    ttft_sigma: float = 0.5
+    tokens_per_second: float = 60.0
+    output_tokens: int = 400
+    error_rate_429: float = 0.0
+    error_rate_529: float = 0.0
+    stream_error_rate: float = 0.0
+    stream_error_after: int = 0
+    requests_per_minute: int = 1000
+    input_tokens_per_minute: int = 450_000
+    output_tokens_per_minute: int = 90_000
+    seed: int = 0
+
+    @classmethod
+    def from_settings(cls, settings: Settings) -> FakeServerConfig:
+        return cls(
+            ttft_ms=settings.fake_llm_ttft_ms,
+            ttft_distribution=settings.fake_llm_ttft_distribution,
+            tokens_per_second=settings.fake_llm_tokens_per_second,
+            output_tokens=settings.fake_llm_output_tokens,
+            error_rate_429=settings.fake_llm_error_rate_429,
+            error_rate_529=settings.fake_llm_error_rate_529,
+            requests_per_minute=settings.fake_llm_requests_per_minute,
+            seed=settings.fake_llm_seed,
+        )
+
+
+class _FakeMessages:
+    """Generates responses and tracks the state a real API would keep."""
+
+    def __init__(self, config: FakeServerConfig):
+        self.config = config
+        self._window: deque[float] = deque()
+        self._cached_prefixes: set[str] = set()
+        self._failure_rng = random.Random(config.seed)
+        self.batches: dict[str, dict] = {}
+        self.batch_results: dict[str, list[dict]] = {}
+
+    # --- Admission ---
+
+    def admit(self) -> tuple[int | None, dict[str, str]]:
+        """Return (error status or None, rate-limit headers) for a new request."""
+        now = time.monotonic()
+        while self._window and now - self._window[0] > 60.0:
+            self._window.popleft()
+
+        status = None
+        roll = self._failure_rng.random()
+        if len(self._window) >= self.config.requests_per_minute or roll < self.config.error_rate_429:
+            status = 429
+        elif roll < self.config.error_rate_429 + self.config.error_rate_529:
+            status = 529
+        else:
+            self._window.append(now)
+
+        remaining = max(0, self.config.requests_per_minute - len(self._window))
+        headers = {
+            "anthropic-ratelimit-requests-limit": str(self.config.requests_per_minute),
+            "anthropic-ratelimit-requests-remaining": str(remaining),
+            "anthropic-ratelimit-input-tokens-limit": str(self.config.input_tokens_per_minute),
+            "anthropic-ratelimit-input-tokens-remaining": str(self.config.input_tokens_per_minute),
+            "anthropic-ratelimit-output-tokens-limit": str(self.config.output_tokens_per_minute),
+            "anthropic-ratelimit-output-tokens-remaining": str(self.config.output_tokens_per_minute),
+        }
+        if status == 429:
+            headers["retry-after"] = "1"
+        return status, headers
+
+    def stream_fails(self) -> bool:
+        """Whether the next streamed response is cut off by an error event."""
+        rate = self.config.stream_error_rate
+        return rate > 0 and self._failure_rng.random() < rate
+
+    # --- Response generation ---
+
+    def plan(self, params: dict) -> dict:
+        """Decide the full response for a request: text, usage, stop reason, timing."""
+        digest = hashlib.sha256(
+            json.dumps(params, sort_keys=True).encode("utf-8") + str(self.config.seed).encode()
+        ).hexdigest()
+        rng = random.Random(digest)
+
+        max_tokens = int(params.get("max_tokens", 1024))
+        tool = _forced_tool(params)
+        if tool is not None:
+            text = json.dumps(_example_input(tool.get("input_schema", {}), rng))
+            tokens = text.split(" ")
+        elif _wants_json(params):
+            text = json.dumps({
+                "agreements": [],
+                "disagreements": [],
+                "unresolved_tensions": [],
+                "within_agent_contradictions": [],
+                "evidence_chain_breaks": [],
+                "synthesis": f"Synthetic synthesis {digest[:8]}.",
+            })
+            tokens = text.split(" ")
+        else:
+            length = max(1, int(rng.gauss(self.config.output_tokens, self.config.output_tokens * 0.2)))
+            tokens = [rng.choice(WORDS) for _ in range(length)]
+        stop_reason = "tool_use" if tool is not None else "end_turn"
+        if len(tokens) > max_tokens:
+            tokens = tokens[:max_tokens]
+            stop_reason = "max_tokens"
+        # A prefilled assistant turn is continued after a space, like the real API does
+        continuing = params.get("messages", [{}])[-1].get("role") == "assistant"
+        chunks = [t if i == 0 and not continuing else " " + t for i, t in enumerate(tokens)]
+
+        prefix, prefix_tokens, total_tokens = _cache_prefix(params)
+        usage = {"input_tokens": total_tokens, "output_tokens": len(chunks),
+                 "cache_creation_input_tokens": 0, "cache_read_input_tokens": 0}
+        if prefix:
+            usage["input_tokens"] = total_tokens - prefix_tokens
+            if prefix in self._cached_prefixes:
+                usage["cache_read_input_tokens"] = prefix_tokens
+            else:
+                usage["cache_creation_input_tokens"] = prefix_tokens
+                self._cached_prefixes.add(prefix)
+
+        return {
+            "id": f"msg_fake_{digest[:20]}",
+            "model": params.get("model", "fake-model"),
+            "chunks": chunks,
+            "usage": usage,
+            "stop_reason": stop_reason,
+            "tool": tool["name"] if tool is not None else None,
+            "ttft": self._draw_ttft(rng),
+        }
+
+    def _draw_ttft(self, rng: random.Random) -> float:
+        base = self.config.ttft_ms / 1000.0
+        if self.config.ttft_distribution == "fixed":
+            return base
+        if self.config.ttft_distribution == "uniform":
+            return rng.uniform(0.5 * base, 1.5 * base)
+        return rng.lognormvariate(0.0, self.config.ttft_sigma) * base
+
+    def message(self, plan: dict) -> dict:
+        return {
+            "id": plan["id"],
+            "type": "message",
+            "role": "assistant",
+            "model": plan["model"],
+            "content": [self._content_block(plan, complete=True)],
+            "stop_reason": plan["stop_reason"],
+            "stop_sequence": None,
+            "usage": plan["usage"],
+        }
+
+    @staticmethod
+    def _content_block(plan: dict, complete: bool) -> dict:
+        if plan["tool"] is None:
+            return {"type": "text", "text": "".join(plan["chunks"]) if complete else ""}
+        tool_input: dict = {}
+        if complete and plan["stop_reason"] == "tool_use":
+            tool_input = json.loads("".join(plan["chunks"]))
+        return {"type": "tool_use", "id": f"toolu_{plan['id'][-16:]}", "name": plan["tool"], "input": tool_input}
+
+    def generation_time(self, plan: dict) -> float:
+        return plan["ttft"] + len(plan["chunks"]) / self.config.tokens_per_second
+
+    async def stream(self, plan: dict, fail: bool = False) -> AsyncIterator[bytes]:
+        start_usage = {**plan["usage"], "output_tokens": 1}
+        yield _sse("message_start", {
+            "type": "message_start",
+            "message": {**self.message(plan), "content": [], "stop_reason": None, "usage": start_usage},
+        })
+        yield _sse("content_block_start", {
+            "type": "content_block_start", "index": 0,
+            "content_block": self._content_block(plan, complete=False),
+        })
+        await asyncio.sleep(plan["ttft"])
+        interval = 1.0 / self.config.tokens_per_second
+        for i, chunk in enumerate(plan["chunks"]):
+            if fail and i == self.config.stream_error_after:
+                yield _sse("error", {
+                    "type": "error",
+                    "error": {"type": "overloaded_error", "message": "Fake overloaded_error"},
+                })
+                return
+            yield _sse("content_block_delta", {
+                "type": "content_block_delta", "index": 0,
+                "delta": (
+                    {"type": "text_delta", "text": chunk} if plan["tool"] is None
+                    else {"type": "input_json_delta", "partial_json": chunk}
+                ),
+            })
+            await asyncio.sleep(interval)
+        yield _sse("content_block_stop", {"type": "content_block_stop", "index": 0})
+        yield _sse("message_delta", {
+            "type": "message_delta",
+            "delta": {"stop_reason": plan["stop_reason"], "stop_sequence": None},
+            "usage": {"output_tokens": plan["usage"]["output_tokens"]},
+        })
+        yield _sse("message_stop", {"type": "message_stop"})
+
+
+def create_fake_app(config: FakeServerConfig | None = None) -> FastAPI:
+    """Build the fake Messages API as an ASGI app."""
+    fake = _FakeMessages(config or FakeServerConfig())
+    app = FastAPI(title="Fake Anthropic Messages API")
+    app.state.fake = fake
+
+    @app.post("/v1/messages")
+    async def create_message(request: Request):
+        params = await request.json()
+        status, headers = fake.admit()
+        if status is not None:
+            return _error(status, headers)
+
+        plan = fake.plan(params)
+        if params.get("stream"):
+            return StreamingResponse(fake.stream(plan, fake.stream_fails()), media_type="text/event-stream", headers=headers)
+        await asyncio.sleep(fake.generation_time(plan))
+        return JSONResponse(fake.message(plan), headers=headers)
+
+    @app.get("/v1/models")
+    async def list_models():
+        # Cheap authenticated GET, used by LLMClient.warm_up
+        return JSONResponse({"data": [], "has_more": False, "first_id": None, "last_id": None})
+
+    @app.post("/v1/messages/batches")
+    async def create_batch(request: Request):
+        body = await request.json()
+        batch_id = f"msgbatch_fake_{uuid4().hex[:16]}"
+        results = []
+        for entry in body.get("requests", []):
+            plan = fake.plan(entry["params"])
+            results.append({
+                "custom_id": entry["custom_id"],
+                "result": {"type": "succeeded", "message": fake.message(plan)},
+            })
+        fake.batch_results[batch_id] = results
+        fake.batches[batch_id] = {
+            "id": batch_id,
+            "type": "message_batch",
+            "processing_status": "ended",
+            "request_counts": {"processing": 0, "succeeded": len(results), "errored": 0,
+                               "canceled": 0, "expired": 0},
+            "results_url": f"/v1/messages/batches/{batch_id}/results",
+        }
+        return JSONResponse({**fake.batches[batch_id], "processing_status": "in_progress"})
+
+    @app.get("/v1/messages/batches/{batch_id}")
+    async def get_batch(batch_id: str):
+        if batch_id not in fake.batches:
+            return _error(404, {})
+        return JSONResponse(fake.batches[batch_id])
+
+    @app.get("/v1/messages/batches/{batch_id}/results")
+    async def get_batch_results(batch_id: str):
+        if batch_id not in fake.batch_results:
+            return _error(404, {})
+        lines = "\n".join(json.dumps(r) for r in fake.batch_results[batch_id])
+        return PlainTextResponse(lines, media_type="application/x-jsonl")
+
+    return app
+
+
+def _error(status: int, headers: dict[str, str]) -> JSONResponse:
+    error_type = {429: "rate_limit_error", 529: "overloaded_error", 404: "not_found_error"}[status]
+    return JSONResponse(
+        {"type": "error", "error": {"type": error_type, "message": f"Fake {error_type}"}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def _sse(event: str, data: dict) -> bytes:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n".encode("utf-8")
+
+
+def _text_of(content: str | list[dict]) -> str:
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+def _forced_tool(params: dict) -> dict | None:
+    choice = params.get("tool_choice") or {}
+    if choice.get("type") != "tool":
+        return None
+    return next((t for t in params.get("tools", []) if t.get("name") == choice.get("name")), None)
+
+
+def _example_input(schema: dict, rng: random.Random, name: str = "value") -> object:
+    """A small value matching a JSON schema (objects, arrays, strings, numbers)."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {
+            key: _example_input(sub, rng, key)
+            for key, sub in schema.get("properties", {}).items()
+        }
+    if kind == "array":
+        return [_example_input(schema.get("items", {}), rng, name)]
+    if kind in ("number", "integer"):
+        return round(rng.random(), 2)
+    if kind == "boolean":
+        return True
+    return f"Synthetic {name} {' '.join(rng.choice(WORDS) for _ in range(3))}"
+
+
+def _wants_json(params: dict) -> bool:
+    return "JSON" in _text_of(params.get("system", ""))
+
+
+def _cache_prefix(params: dict) -> tuple[str, int, int]:
+    """Return (prefix key, prefix tokens, total input tokens) for prompt caching.
+
+    The prefix runs through the last block carrying ``cache_control``, in
+    system-then-messages order, like the real API.
+    """
+    blocks: list[dict] = []
+    for source in [params.get("system", "")] + [m.get("content", "") for m in params.get("messages", [])]:
+        if isinstance(source, str):
+            blocks.append({"type": "text", "text": source})
+        else:
+            blocks.extend(source)
+
+    total_chars = sum(len(b.get("text", "")) for b in blocks)
+    last_marked = max((i for i, b in enumerate(blocks) if "cache_control" in b), default=-1)
+    if last_marked < 0:
+        return "", 0, total_chars // 4 + 1
+    prefix_text = params.get("model", "") + "".join(b.get("text", "") for b in blocks[: last_marked + 1])
+    prefix_tokens = (len(prefix_text) - len(params.get("model", ""))) // 4
+    return hashlib.sha256(prefix_text.encode("utf-8")).hexdigest(), prefix_tokens, total_chars // 4 + 1
+
+
+def main() -> None:
+    import argparse
+
+    import uvicorn
+
+    from ..config import settings
+
+    parser = argparse.ArgumentParser(description="Run the fake Anthropic Messages API.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    args = parser.parse_args()
+    uvicorn.run(create_fake_app(FakeServerConfig.from_settings(settings)), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
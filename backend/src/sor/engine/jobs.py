@@ -0,0 +1,691 @@
+"""Stage runs as server-side background jobs.
+
+A job runs ``StageOrchestrator.run_stage`` in its own task and appends every
+event to a numbered log, so the run no longer depends on the SSE connection
+that started it: a client that disconnects (a closed tab, a backgrounded
+app) reconnects with ``Last-Event-ID`` and receives the events it missed,
+then the live ones, while the agents keep running.
+
+The log is kept in memory while the job runs and for a while after, and is
+persisted to the database in small batches, so a finished job can still be
+replayed once it has been evicted from memory or the server has restarted.
+At startup, ``recover`` resumes the stage runs a previous process left
+unfinished from their per-agent checkpoints.
+
+With several server processes sharing the database, a stage runs in one of
+them at a time: a job holds the stage's run lock, a lease in the database
+that it renews while it runs. A request for a stage running in another
+process gets that process's job, and follows its log as it is persisted.
+Requests carrying the same idempotency key get the same job, so a retried
+request never starts a second run. Stages run through the Message Batches
+API get jobs too, which hold their run locks until the batch has ended.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import sqlite3
+from collections.abc import AsyncIterator
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING
+
+from ..models import (
+    AgentConfig,
+    JobStatus,
+    Project,
+    SSEEvent,
+    SSEEventType,
+    StageJob,
+    StageResult,
+    StageRunLock,
+    StageStatus,
+    lease_time,
+)
+from ..store.database import Database
+from .broadcast import BroadcastHub, Channel
+from .orchestrator import StageOrchestrator, StagePrefetch
+from .scheduler import Lane, notify_queued, use_lane
+
+if TYPE_CHECKING:
+    from .admission import Reservation
+
+logger = logging.getLogger(__name__)
+
+# Persist the log after this many buffered events (deltas and queue
+# positions are batched; any other event is written immediately). An
+# agent's persisted deltas are dropped once its complete output is, since
+# that event carries the whole text.
+FLUSH_EVERY_EVENTS = 50
+_BATCHED_EVENTS = (SSEEventType.AGENT_DELTA, SSEEventType.AGENT_QUEUED)
+# Keep a finished job's log in memory this long for reconnecting clients
+JOB_RETENTION_SECONDS = 300.0
+# A running job's lease on its stage lasts this long, renewed every third of it
+RUN_LOCK_TTL_SECONDS = 30.0
+# How often a job running in another process is polled for new events
+FOLLOW_POLL_SECONDS = 0.5
+
+
+class StageBusy(Exception):
+    """Raised when a stage can't be started because a job is running it."""
+
+    def __init__(self, job: StageJob) -> None:
+        super().__init__(f"Stage {job.stage_number} of project {job.project_id} is already running")
+        self.job = job
+
+
+def event_id(job_id: str, seq: int) -> str:
+    """The SSE event id of event ``seq`` of a job."""
+    return f"{job_id}:{seq}"
+
+
+def parse_event_id(value: str) -> tuple[str, int] | None:
+    """Split a ``Last-Event-ID`` into (job id, sequence number)."""
+    job_id, _, seq = value.partition(":")
+    if not job_id or not seq.isdigit():
+        return None
+    return job_id, int(seq)
+
+
+class _RunningJob:
+    """A job held in memory: its broadcast channel and the task feeding it."""
+
+    def __init__(self, job: StageJob, channel: Channel) -> None:
+        self.job = job
+        self.channel = channel
+        self.flushed = 0
+        self.task: asyncio.Task | None = None
+        self.lease: asyncio.Task | None = None
+        self.cancel_requested = False
+        self.lock_lost = False
+        self.reservation: Reservation | None = None
+
+    @property
+    def events(self) -> list[SSEEvent]:
+        return self.channel.backlog
+
+    def push(self, event: SSEEvent) -> None:
+        self.channel.publish(event)
+        self.job.event_count = len(self.events)
+
+    def finish(self, status: JobStatus, error: str | None = None) -> None:
+        self.job.status = status
+        self.job.error = error
+        self.job.finished_at = datetime.now(timezone.utc).isoformat()
+
+
+class JobManager:
+    """Starts stage jobs and serves their event logs to subscribers.
+
+    A stage has at most one job running at a time, across every process
+    sharing the database; its events are broadcast through ``hub``, so every
+    viewer of the stage follows the same run.
+    """
+
+    def __init__(
+        self,
+        orchestrator: StageOrchestrator,
+        db: Database,
+        hub: BroadcastHub | None = None,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+        lock_ttl: float = RUN_LOCK_TTL_SECONDS,
+        owner: str | None = None,
+    ) -> None:
+        self._orchestrator = orchestrator
+        self._db = db
+        self._hub = hub or BroadcastHub()
+        self._retention_seconds = retention_seconds
+        self._lock_ttl = lock_ttl
+        # Names this process in the run locks it takes
+        self._owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+        self._jobs: dict[str, _RunningJob] = {}
+        # (project id, stage number) -> the start of a job in progress
+        self._starting: dict[tuple[str, int], asyncio.Task[StageJob]] = {}
+
+    async def start(
+        self,
+        project: Project,
+        stage_number: int,
+        agents: list[AgentConfig],
+        use_cache: bool = True,
+        checkpoint: StageResult | None = None,
+        rerun_agent_ids: set[str] | None = None,
+        prefetched: StagePrefetch | None = None,
+        lane: Lane = Lane.INTERACTIVE,
+        idempotency_key: str | None = None,
+        reservation: Reservation | None = None,
+    ) -> StageJob:
+        """Start running the stage in the background, unless it already is.
+
+        ``checkpoint`` and ``rerun_agent_ids`` resume or partly rerun an
+        existing result, and ``prefetched`` holds inputs already loaded (see
+        ``StageOrchestrator.run_stage``). The agent calls are scheduled in
+        ``lane``. A new job takes over the admission ``reservation``; it is
+        released otherwise. Returns the new job; the job already running
+        the stage, here or in another process; or the job an earlier
+        request with the same ``idempotency_key`` started.
+        """
+        try:
+            if idempotency_key:
+                existing = await self.find(project.id, stage_number, idempotency_key)
+                if existing is not None:
+                    return existing
+            active = self.active(project.id, stage_number)
+            if active is not None:
+                return active
+            # Concurrent requests for the stage all wait on the same start
+            key = (project.id, stage_number)
+            starting = self._starting.get(key)
+            if starting is None:
+                starting = asyncio.create_task(self._start(
+                    project, stage_number, agents,
+                    use_cache=use_cache, checkpoint=checkpoint, rerun_agent_ids=rerun_agent_ids,
+                    prefetched=prefetched, lane=lane, idempotency_key=idempotency_key,
+                    reservation=reservation,
+                ))
+                self._starting[key] = starting
+                starting.add_done_callback(lambda _: self._starting.pop(key, None))
+            return await asyncio.shield(starting)
+        finally:
+            if reservation is not None and reservation.starting:
+                # No new job took it over
+                reservation.release()
+
+    async def _start(
+        self,
+        project: Project,
+        stage_number: int,
+        agents: list[AgentConfig],
+        use_cache: bool,
+        checkpoint: StageResult | None,
+        rerun_agent_ids: set[str] | None,
+        prefetched: StagePrefetch | None,
+        lane: Lane,
+        idempotency_key: str | None,
+        reservation: Reservation | None,
+    ) -> StageJob:
+        job = StageJob(
+            project_id=project.id, stage_number=stage_number, idempotency_key=idempotency_key,
+        )
+        try:
+            await self._db.create_stage_job(job)
+        except sqlite3.IntegrityError:
+            # Another process started a job with the same key meanwhile
+            existing = await self.find(project.id, stage_number, idempotency_key)
+            if existing is None:
+                raise
+            return existing
+
+        lock = await self._acquire_lock(job)
+        if lock.job_id != job.id:
+            await self._db.delete_stage_job(job.id)
+            holder = await self.get(lock.job_id)
+            if holder is None:
+                raise RuntimeError(f"Stage {stage_number} is locked by unknown job {lock.job_id}")
+            return holder
+
+        running = _RunningJob(job, self._hub.open(project.id, stage_number, job.id))
+        self._jobs[job.id] = running
+        if reservation is not None:
+            # Counted among the running jobs from now on
+            reservation.started()
+            running.reservation = reservation
+        running.task = asyncio.create_task(
+            self._run(
+                running, project, stage_number, agents,
+                use_cache=use_cache, checkpoint=checkpoint,
+                rerun_agent_ids=rerun_agent_ids, prefetched=prefetched, lane=lane,
+            )
+        )
+        running.lease = asyncio.create_task(self._hold_lock(running))
+        return job
+
+    async def start_batch(
+        self,
+        runs: list[tuple[Project, int, list[AgentConfig]]],
+        poll_interval: float = 60.0,
+    ) -> list[StageJob]:
+        """Run stages through the Message Batches API (see
+        ``StageOrchestrator.run_stages_batch``) in the background.
+
+        Each stage gets a job holding its run lock for as long as the batch
+        runs, so it can't be run again meanwhile; the jobs only log the
+        start and end of their stage. The batch runs as a whole: losing one
+        stage's lock, or cancelling one of the jobs, stops every stage.
+
+        Raises:
+            StageBusy: If a stage is already running, here or in another
+                process; then none of the stages is started.
+        """
+        batch: list[_RunningJob] = []
+        try:
+            for project, stage_number, _ in runs:
+                job = StageJob(project_id=project.id, stage_number=stage_number)
+                await self._db.create_stage_job(job)
+                lock = await self._acquire_lock(job)
+                if lock.job_id != job.id:
+                    await self._db.delete_stage_job(job.id)
+                    holder = await self.get(lock.job_id)
+                    if holder is None:
+                        raise RuntimeError(
+                            f"Stage {stage_number} is locked by unknown job {lock.job_id}"
+                        )
+                    raise StageBusy(holder)
+                running = _RunningJob(job, self._hub.open(project.id, stage_number, job.id))
+                self._jobs[job.id] = running
+                batch.append(running)
+        except BaseException:
+            for running in batch:
+                self._hub.close(running.channel)
+                del self._jobs[running.job.id]
+                await self._db.release_stage_run_lock(running.job.id)
+                await self._db.delete_stage_job(running.job.id)
+            raise
+
+        task = asyncio.create_task(self._run_batch(batch, runs, poll_interval))
+        for running in batch:
+            running.task = task
+            running.lease = asyncio.create_task(self._hold_lock(running))
+        return [running.job for running in batch]
+
+    def active(self, project_id: str, stage_number: int) -> StageJob | None:
+        """The job currently running the stage in this process, if any."""
+        channel = self._hub.active(project_id, stage_number)
+        return self._jobs[channel.job_id].job if channel is not None else None
+
+    async def find_active(self, project_id: str, stage_number: int) -> StageJob | None:
+        """The job currently running the stage in any process, if any."""
+        active = self.active(project_id, stage_number)
+        if active is not None:
+            return active
+        lock = await self._db.get_stage_run_lock(project_id, stage_number)
+        if lock is None or not self._lock_is_live(lock):
+            return None
+        job = await self._db.get_stage_job(lock.job_id)
+        return job if job is not None and job.status == JobStatus.RUNNING else None
+
+    def is_local(self, job_id: str) -> bool:
+        """Whether the job runs (or ran) in this process."""
+        return job_id in self._jobs
+
+    async def find(
+        self, project_id: str, stage_number: int, idempotency_key: str,
+    ) -> StageJob | None:
+        """The job started for the stage with ``idempotency_key``, if any."""
+        job = await self._db.get_stage_job_by_idempotency_key(
+            project_id, stage_number, idempotency_key,
+        )
+        return await self.get(job.id) if job is not None else None
+
+    async def get(self, job_id: str) -> StageJob | None:
+        """Current state of a job, from memory if it is held there."""
+        running = self._jobs.get(job_id)
+        if running is not None:
+            return running.job
+        return await self._db.get_stage_job(job_id)
+
+    async def latest(self, project_id: str, stage_number: int) -> StageJob | None:
+        """The most recently started job of a stage."""
+        job = await self._db.get_latest_stage_job(project_id, stage_number)
+        if job is None:
+            return None
+        return await self.get(job.id)
+
+    async def events(
+        self, job_id: str, after: int = 0,
+    ) -> AsyncIterator[tuple[int, SSEEvent] | None]:
+        """Yield a job's events after sequence number ``after``.
+
+        Follows the job live while it runs, yielding None as a heartbeat
+        when it is quiet; a job no longer in memory is replayed from its
+        persisted log. A job running in another process is followed by
+        polling its persisted log, so its deltas arrive in batches.
+        """
+        running = self._jobs.get(job_id)
+        if running is not None:
+            async for item in running.channel.subscribe(after, self._hub.heartbeat):
+                yield item
+            return
+
+        idle = 0.0
+        while True:
+            job = await self._db.get_stage_job(job_id)
+            batch = await self._db.list_stage_job_events(job_id, after)
+            for item in batch:
+                after = item[0]
+                yield item
+            if job is None or job.status != JobStatus.RUNNING or not await self._runs_elsewhere(job):
+                return
+            if batch:
+                idle = 0.0
+            elif idle >= self._hub.heartbeat:
+                idle = 0.0
+                yield None
+            await asyncio.sleep(FOLLOW_POLL_SECONDS)
+            idle += FOLLOW_POLL_SECONDS
+
+    async def cancel(self, job_id: str) -> StageJob | None:
+        """Cancel a running job and wait until its partial results are saved.
+
+        Returns the job, or None if it isn't running in this process.
+        """
+        running = self._jobs.get(job_id)
+        if running is None or running.task is None or running.task.done():
+            return None
+        running.cancel_requested = True
+        running.task.cancel()
+        await asyncio.wait({running.task})
+        return running.job
+
+    @property
+    def running_count(self) -> int:
+        """Jobs running in this process."""
+        return sum(1 for r in self._jobs.values() if r.job.status == JobStatus.RUNNING)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running_count,
+            "in_memory": len(self._jobs),
+            **self._hub.stats(),
+        }
+
+    async def shutdown(self) -> None:
+        """Cancel running jobs; their logs so far are persisted."""
+        tasks = [r.task for r in self._jobs.values() if r.task is not None and not r.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def mark_interrupted(self) -> None:
+        """Fail jobs left running by a process that is gone."""
+        for job in await self._db.list_stage_jobs(status=JobStatus.RUNNING):
+            if job.id not in self._jobs and not await self._runs_elsewhere(job):
+                await self._db.update_stage_job(
+                    job.id, status=JobStatus.FAILED, error="Interrupted by a server restart",
+                    finished_at=datetime.now(timezone.utc).isoformat(),
+                )
+
+    async def recover(self) -> list[StageJob]:
+        """Resume the stage runs a previous process left unfinished.
+
+        Every stage result still in RUNNING status, and not being run by
+        another live process, gets a new job that runs only the agents
+        without a completed checkpointed output, then conflict detection.
+        Returns the started jobs.
+        """
+        await self.mark_interrupted()
+        started = []
+        for stage_result in await self._db.list_stage_results(StageStatus.RUNNING):
+            project = await self._db.get_project(stage_result.project_id)
+            if not project:
+                continue
+            agents = await self._db.list_agents(
+                stage=stage_result.stage_number, project_id=project.id,
+            )
+            logger.info(
+                "Resuming stage %d of project %s (%d checkpointed outputs)",
+                stage_result.stage_number, project.id, len(stage_result.agent_outputs),
+            )
+            # Nobody is waiting on a resumed run, so it yields to interactive ones
+            job = await self.start(
+                project, stage_result.stage_number, agents,
+                checkpoint=stage_result, lane=Lane.BATCH,
+            )
+            if self.is_local(job.id):
+                started.append(job)
+        return started
+
+    async def _run(
+        self,
+        running: _RunningJob,
+        project: Project,
+        stage_number: int,
+        agents: list[AgentConfig],
+        use_cache: bool,
+        checkpoint: StageResult | None,
+        rerun_agent_ids: set[str] | None,
+        prefetched: StagePrefetch | None,
+        lane: Lane,
+    ) -> None:
+        job = running.job
+        events = self._orchestrator.run_stage(
+            project, stage_number, agents, use_cache=use_cache,
+            checkpoint=checkpoint, rerun_agent_ids=rerun_agent_ids, prefetched=prefetched,
+            owns_stage=lambda: not running.lock_lost,
+        )
+        try:
+            # Closing the run (also when cancelled between two events) lets
+            # the agents record their partial outputs before we go on.
+            reservation = running.reservation
+            with use_lane(lane), notify_queued(reservation.take_call if reservation else None):
+                async with aclosing(events):
+                    async for event in events:
+                        running.push(event)
+                        if (
+                            event.type not in _BATCHED_EVENTS
+                            or len(running.events) - running.flushed >= FLUSH_EVERY_EVENTS
+                        ):
+                            await self._flush(running)
+            running.finish(JobStatus.COMPLETE)
+        except asyncio.CancelledError:
+            if running.lock_lost:
+                # The stage now belongs to another process: leave its row alone
+                asyncio.current_task().uncancel()
+                self._fail(running, "The stage run was taken over by another server process")
+                return
+            if not running.cancel_requested:
+                # Server shutdown: the stage stays RUNNING and is resumed at startup
+                self._fail(running, "Stage run was interrupted by a server shutdown")
+                raise
+            asyncio.current_task().uncancel()
+            await self._cancelled(running)
+        except Exception as exc:
+            logger.exception("Stage %d job %s for project %s failed", stage_number, job.id, project.id)
+            self._fail(running, f"Stage run failed: {exc}")
+        finally:
+            await asyncio.shield(self._finalize(running))
+
+    async def _run_batch(
+        self,
+        batch: list[_RunningJob],
+        runs: list[tuple[Project, int, list[AgentConfig]]],
+        poll_interval: float,
+    ) -> None:
+        try:
+            for running, (project, stage_number, agents) in zip(batch, runs):
+                running.push(SSEEvent(
+                    type=SSEEventType.STAGE_START,
+                    data={
+                        "project_id": project.id,
+                        "stage_number": stage_number,
+                        "agent_count": sum(1 for a in agents if a.enabled),
+                        "batch": True,
+                    },
+                ))
+                await self._flush(running)
+            results = await self._orchestrator.run_stages_batch(runs, poll_interval=poll_interval)
+            by_stage = {(r.project_id, r.stage_number): r for r in results}
+            for running in batch:
+                job = running.job
+                stage_result = by_stage.get((job.project_id, job.stage_number))
+                data: dict = {
+                    "project_id": job.project_id,
+                    "stage_number": job.stage_number,
+                    "status": "complete",
+                }
+                if stage_result is None:
+                    data["message"] = "No enabled agents for this stage."
+                else:
+                    report = stage_result.conflict_report
+                    data.update(
+                        stage_result_id=stage_result.id,
+                        agent_outputs=len(stage_result.agent_outputs),
+                        agreements=len(report.agreements) if report else 0,
+                        disagreements=len(report.disagreements) if report else 0,
+                    )
+                running.push(SSEEvent(type=SSEEventType.STAGE_COMPLETE, data=data))
+                running.finish(JobStatus.COMPLETE)
+        except asyncio.CancelledError:
+            if not any(r.lock_lost or r.cancel_requested for r in batch):
+                # Server shutdown: the batch's results are not collected
+                for running in batch:
+                    self._fail(running, "Batch run was interrupted by a server shutdown")
+                raise
+            asyncio.current_task().uncancel()
+            taken_over = any(r.lock_lost for r in batch)
+            for running in batch:
+                if running.lock_lost:
+                    self._fail(running, "The stage run was taken over by another server process")
+                elif taken_over:
+                    self._fail(running, "Batch run was stopped: another of its stages was taken over")
+                else:
+                    running.push(SSEEvent(
+                        type=SSEEventType.STAGE_CANCELLED,
+                        data={
+                            "project_id": running.job.project_id,
+                            "stage_number": running.job.stage_number,
+                            "status": StageStatus.CANCELLED,
+                            "completed_agents": 0,
+                            "partial_outputs": [],
+                        },
+                    ))
+                    running.finish(JobStatus.CANCELLED, "Cancelled")
+        except Exception as exc:
+            logger.exception("Batch run of %d stages failed", len(batch))
+            for running in batch:
+                self._fail(running, f"Batch run failed: {exc}")
+        finally:
+            for running in batch:
+                await asyncio.shield(self._finalize(running))
+
+    async def _cancelled(self, running: _RunningJob) -> None:
+        job = running.job
+        stage_result = await self._orchestrator.mark_cancelled(job.project_id, job.stage_number)
+        outputs = stage_result.agent_outputs if stage_result else []
+        running.push(SSEEvent(
+            type=SSEEventType.STAGE_CANCELLED,
+            data={
+                "project_id": job.project_id,
+                "stage_number": job.stage_number,
+                "status": StageStatus.CANCELLED,
+                "completed_agents": sum(1 for o in outputs if o.status == "complete"),
+                "partial_outputs": [
+                    {
+                        "agent_id": o.agent_id,
+                        "agent_name": o.agent_name,
+                        "output_id": o.id,
+                        "content_length": len(o.content),
+                    }
+                    for o in outputs if o.status == "cancelled"
+                ],
+            },
+        ))
+        running.finish(JobStatus.CANCELLED, "Cancelled")
+
+    def _fail(self, running: _RunningJob, error: str) -> None:
+        running.push(SSEEvent(
+            type=SSEEventType.STAGE_ERROR,
+            data={
+                "project_id": running.job.project_id,
+                "stage_number": running.job.stage_number,
+                "error": error,
+            },
+        ))
+        running.finish(JobStatus.FAILED, error)
+
+    async def _finalize(self, running: _RunningJob) -> None:
+        job = running.job
+        if running.reservation is not None:
+            running.reservation.release()
+        self._hub.close(running.channel)
+        if running.lease is not None:
+            running.lease.cancel()
+        try:
+            await self._flush(running)
+            await self._db.update_stage_job(
+                job.id, status=job.status, error=job.error,
+                event_count=job.event_count, finished_at=job.finished_at,
+            )
+            # Released last, so a process that sees the lock gone also sees the outcome
+            await self._db.release_stage_run_lock(job.id)
+        except Exception:
+            logger.exception("Could not persist the end of stage job %s", job.id)
+        asyncio.get_running_loop().call_later(
+            self._retention_seconds, self._jobs.pop, job.id, None,
+        )
+
+    async def _acquire_lock(self, job: StageJob) -> StageRunLock:
+        """Take the stage's run lock for ``job``; returns the lock's holder."""
+        lock = StageRunLock(
+            project_id=job.project_id, stage_number=job.stage_number,
+            job_id=job.id, owner=self._owner, expires_at=self._lease_expiry(),
+        )
+        holder = await self._db.acquire_stage_run_lock(lock)
+        if holder.job_id != job.id and not self._lock_is_live(holder):
+            # Its process is gone (or its job is over) before the lease expired
+            holder = await self._db.acquire_stage_run_lock(lock, replace_job_id=holder.job_id)
+        return holder
+
+    async def _hold_lock(self, running: _RunningJob) -> None:
+        """Renew the job's lease until it finishes; stop the job if the lease is lost."""
+        job = running.job
+        while True:
+            await asyncio.sleep(self._lock_ttl / 3)
+            try:
+                held = await self._db.renew_stage_run_lock(job.id, self._lease_expiry())
+            except Exception:
+                logger.exception("Could not renew the run lock of stage job %s", job.id)
+                continue
+            if not held:
+                logger.error(
+                    "Stage %d job %s for project %s lost its run lock; stopping it",
+                    job.stage_number, job.id, job.project_id,
+                )
+                running.lock_lost = True
+                running.task.cancel()
+                return
+
+    def _lease_expiry(self) -> str:
+        return lease_time(datetime.now(timezone.utc) + timedelta(seconds=self._lock_ttl))
+
+    def _lock_is_live(self, lock: StageRunLock) -> bool:
+        """Whether the lock's job may still be running."""
+        if datetime.fromisoformat(lock.expires_at) <= datetime.now(timezone.utc):
+            return False
+        if lock.owner == self._owner:
+            running = self._jobs.get(lock.job_id)
+            return running is not None and running.job.status == JobStatus.RUNNING
+        host, _, pid = lock.owner.rpartition(":")
+        if host == socket.gethostname() and pid.isdigit():
+            # Another worker on this host: its lease dies with its process
+            try:
+                os.kill(int(pid), 0)
+            except ProcessLookupError:
+                return False
+            except PermissionError:
+                pass
+        return True
+
+    async def _runs_elsewhere(self, job: StageJob) -> bool:
+        """Whether ``job`` holds its stage's lock from another live process."""
+        if job.id in self._jobs:
+            return False
+        lock = await self._db.get_stage_run_lock(job.project_id, job.stage_number)
+        return lock is not None and lock.job_id == job.id and self._lock_is_live(lock)
+
+    async def _flush(self, running: _RunningJob) -> None:
+        """Persist the events buffered since the last flush."""
+        end = len(running.events)
+        if end == running.flushed:
+            return
+        batch = [(seq, running.events[seq - 1]) for seq in range(running.flushed + 1, end + 1)]
+        completed = {e.agent_id for _, e in batch if e.type == SSEEventType.AGENT_COMPLETE}
+        await self._db.append_stage_job_events(running.job.id, [
+            (seq, e) for seq, e in batch
+            if not (e.type == SSEEventType.AGENT_DELTA and e.agent_id in completed)
+        ])
+        running.flushed = end
+        await self._db.delete_stage_job_deltas(running.job.id, sorted(completed))
@@ -0,0 +1,104 @@
+"""Tolerant parsing of possibly truncated or fenced JSON from LLM output.
+
+A response cut off at ``max_tokens`` leaves an unterminated object behind.
+Rather than discarding the whole (often expensive) call, ``parse_partial_json``
+scans the text once, remembers every point where a complete value ended,
+and closes the open strings, arrays and objects at the latest such point,
+so everything the model finished writing is kept.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+
+# How many cut points (latest first) to try before giving up
+MAX_REPAIR_ATTEMPTS = 200
+
+_FENCE = re.compile(r"```(?:json)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def parse_partial_json(text: str) -> object:
+    """Parse JSON, repairing truncation, code fences and surrounding prose.
+
+    Raises:
+        ValueError: If no JSON object or array can be recovered.
+    """
+    body = _extract_body(text)
+    try:
+        return json.loads(body)
+    except json.JSONDecodeError:
+        pass
+
+    for candidate in _repair_candidates(body):
+        try:
+            return json.loads(candidate)
+        except json.JSONDecodeError:
+            continue
+    raise ValueError(f"Could not recover JSON from response: {text[:200]!r}")
+
+
+def _extract_body(text: str) -> str:
+    fence = _FENCE.search(text)
+    if fence:
+        text = fence.group(1)
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    return text[min(starts):].strip() if starts else text.strip()
+
+
+def _repair_candidates(body: str) -> list[str]:
+    """Closed-off prefixes of ``body``, from the longest to the shortest.
+
+    A single scan tracks string/escape state and the stack of open
+    containers. A cut point is recorded after every finished value (string,
+    number, literal, closed container) and after every opening bracket.
+    The first candidate keeps a string that was cut off mid-value.
+    """
+    stack: list[str] = []
+    in_string = False
+    escaped = False
+    string_is_key = False
+    previous = ""  # last significant character outside strings
+    cuts: list[tuple[int, str]] = []
+
+    for i, char in enumerate(body):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+                previous = char
+                if not string_is_key:
+                    cuts.append((i + 1, _closing(stack)))
+            continue
+
+        if char.isspace():
+            continue
+        if char == '"':
+            in_string = True
+            string_is_key = bool(stack) and stack[-1] == "{" and previous in ("{", ",")
+        elif char in _CLOSERS:
+            stack.append(char)
+            cuts.append((i + 1, _closing(stack)))
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            cuts.append((i + 1, _closing(stack)))
+        elif char.isalnum() and (i + 1 == len(body) or not body[i + 1].isalnum() and body[i + 1] != "."):
+            # End of a number or true/false/null
+            cuts.append((i + 1, _closing(stack)))
+        previous = char
+
+    candidates: list[str] = []
+    if in_string and not string_is_key and not escaped:
+        candidates.append(body + '"' + _closing(stack))
+    for end, closing in reversed(cuts[-MAX_REPAIR_ATTEMPTS:]):
+        candidates.append(body[:end].rstrip().rstrip(",") + closing)
+    return candidates
+
+
+def _closing(stack: list[str]) -> str:
+    return "".join(_CLOSERS[opener] for opener in reversed(stack))
@@ -1,49 +1,135 @@
-"""Async Anthropic API client using httpx with retry logic."""
+"""Async Anthropic API client using httpx with retry logic and rate limiting."""
 
 from __future__ import annotations
 
 import asyncio
 import json
-import re
+import logging
+import time
+from collections.abc import AsyncIterator, Callable
 
 import httpx
 
-MAX_RETRIES = 5
-INITIAL_BACKOFF = 2.0  # seconds
+from ..models import CallUsage
+from .connection_pool import PoolConfig, PoolMetrics
+from .context_budget import estimate_tokens
+from .json_repair import parse_partial_json
+from .providers import AnthropicProvider, LLMProvider
+from .rate_limiter import RateLimiter
+from .response_cache import ResponseCache
+from .retry import RETRY_STATUSES, CircuitBreaker, RetryPolicy
+from .single_flight import SingleFlight
+from .usage import record_call
+
+logger = logging.getLogger(__name__)
+
+USAGE_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# Stream error events that mean the same as a 429/529 response
+STREAM_ERROR_STATUSES = {"rate_limit_error": 429, "overloaded_error": 529}
+
+# A system prompt or user turn: plain text, or a list of Messages API content blocks.
+Content = str | list[dict]
+
+
+def cacheable(text: str) -> dict:
+    """Wrap text in a content block marked as an Anthropic prompt-cache breakpoint.
+
+    Everything up to and including this block is cached, so identical
+    prefixes sent by later calls are read from the cache at a fraction of
+    the input price and prefill latency.
+    """
+    return {"type": "text", "text": text, "cache_control": {"type": "ephemeral"}}
 
 
 class LLMClient:
-    """Thin async wrapper around the Anthropic Messages API."""
+    """Thin async wrapper around the Anthropic Messages API.
 
-    def __init__(self, api_key: str, default_model: str = "claude-sonnet-4-20250514"):
+    Requests go to the Messages API of the configured LLMProvider (the
+    Anthropic API by default). Every request passes through a shared
+    RateLimiter, so all callers in the process (stage agents, conflict
+    detection, report generation) draw on the same account budget. When a
+    ResponseCache is supplied, identical requests are answered from it
+    unless the caller passes ``cache=False``. Otherwise identical requests
+    that are in flight at the same time share a single upstream call and
+    split its usage (see ``SingleFlight``). Responses cut off at
+    ``max_tokens`` are continued with up to ``max_continuations`` follow-up
+    calls.
+    Failed requests are retried according to the RetryPolicy, and a shared
+    CircuitBreaker fails calls fast while the upstream is overloaded.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        default_model: str = "claude-sonnet-4-20250514",
+        rate_limiter: RateLimiter | None = None,
+        cache: ResponseCache | None = None,
+        base_url: str = "https://api.anthropic.com",
+        provider: LLMProvider | None = None,
+        pool: PoolConfig | None = None,
+        retry_policy: RetryPolicy | None = None,
+        circuit_breaker: CircuitBreaker | None = None,
+        max_continuations: int = 2,
+    ):
         self._api_key = api_key
         self._default_model = default_model
-        self._client = httpx.AsyncClient(
-            base_url="https://api.anthropic.com",
-            headers={
-                "x-api-key": self._api_key,
-                "anthropic-version": "2023-06-01",
-                "content-type": "application/json",
-            },
-            timeout=httpx.Timeout(120.0, connect=10.0),
-        )
+        self._limiter = rate_limiter or RateLimiter()
+        self._cache = cache
+        self._usage_totals: dict[str, float] = dict.fromkeys(USAGE_FIELDS, 0)
+        self._usage_totals["cost_usd"] = 0.0
+        self._provider = provider or AnthropicProvider(api_key, base_url)
+        self._max_continuations = max(0, max_continuations)
+        self._retry = retry_policy or RetryPolicy()
+        self._breaker = circuit_breaker or CircuitBreaker()
+        self._pool = pool or PoolConfig()
+        self._flights = SingleFlight()
+        self._pool_metrics = PoolMetrics()
+        self._client = self._provider.create_client(httpx.Timeout(120.0, connect=10.0), self._pool)
+
+    def build_payload(
+        self,
+        system_prompt: Content,
+        user_message: Content,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        model: str | None = None,
+    ) -> dict:
+        """Build a single-turn Messages API request body."""
+        return {
+            "model": model or self._default_model,
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "system": system_prompt,
+            "messages": [{"role": "user", "content": user_message}],
+        }
 
     async def complete(
         self,
-        system_prompt: str,
-        user_message: str,
+        system_prompt: Content,
+        user_message: Content,
         temperature: float = 0.7,
         max_tokens: int = 4096,
         model: str | None = None,
+        cache: bool = True,
     ) -> str:
         """Send a single-turn completion request and return the text response.
 
         Args:
-            system_prompt: The system-level instruction for the model.
-            user_message: The user turn content.
+            system_prompt: The system-level instruction for the model, as
+                text or content blocks (see ``cacheable``).
+            user_message: The user turn content, as text or content blocks.
             temperature: Sampling temperature (0.0 - 1.0).
-            max_tokens: Maximum tokens in the response.
+            max_tokens: Maximum tokens per API call; a response cut off at
+                this limit is continued (see ``max_continuations``).
             model: Override the default model for this call.
+            cache: Set to False to bypass the response cache, and any identical
+                call in flight, for this call.
 
         Returns:
             The assistant's text response.
@@ -51,61 +137,74 @@ class LLMClient:
         Raises:
             LLMError: On any API or network error.
         """
-        payload = {
-            "model": model or self._default_model,
-            "max_tokens": max_tokens,
-            "temperature": temperature,
-            "system": system_prompt,
-            "messages": [{"role": "user", "content": user_message}],
-        }
+        payload = self.build_payload(system_prompt, user_message, temperature, max_tokens, model)
+        chunks = self._coalesced(payload, cache, self._complete_once)
+        return "".join([chunk async for chunk in chunks])
 
-        last_error: Exception | None = None
-        for attempt in range(MAX_RETRIES):
-            try:
-                response = await self._client.post("/v1/messages", json=payload)
-                response.raise_for_status()
-                data = response.json()
-                return self._extract_text(data)
-            except httpx.HTTPStatusError as exc:
-                last_error = exc
-                status = exc.response.status_code
-                # Retry on rate limit (429) and overloaded (529)
-                if status in (429, 529) and attempt < MAX_RETRIES - 1:
-                    wait = INITIAL_BACKOFF * (2 ** attempt)
-                    await asyncio.sleep(wait)
-                    continue
-                body = exc.response.text
-                raise LLMError(
-                    f"Anthropic API returned {status}: {body}"
-                ) from exc
-            except httpx.RequestError as exc:
-                last_error = exc
-                if attempt < MAX_RETRIES - 1:
-                    await asyncio.sleep(INITIAL_BACKOFF * (2 ** attempt))
-                    continue
-                raise LLMError(f"Network error calling Anthropic API: {exc}") from exc
+    async def complete_stream(
+        self,
+        system_prompt: Content,
+        user_message: Content,
+        temperature: float = 0.7,
+        max_tokens: int = 4096,
+        model: str | None = None,
+        cache: bool = True,
+    ) -> AsyncIterator[str]:
+        """Send a single-turn completion request and yield text as it streams.
+
+        Uses the Messages API ``stream: true`` mode and yields each
+        ``text_delta`` chunk as soon as it arrives. Rate-limit and overload
+        errors are retried only before the first chunk has been yielded;
+        once text has reached the caller a failure is raised instead, since
+        a restarted response could not be spliced onto the partial one.
+        A cached response is yielded as a single chunk.
 
-        raise LLMError(f"Max retries exceeded: {last_error}")
+        Args:
+            system_prompt: The system-level instruction for the model, as
+                text or content blocks (see ``cacheable``).
+            user_message: The user turn content, as text or content blocks.
+            temperature: Sampling temperature (0.0 - 1.0).
+            max_tokens: Maximum tokens per API call; a response cut off at
+                this limit is continued (see ``max_continuations``).
+            model: Override the default model for this call.
+            cache: Set to False to bypass the response cache, and any identical
+                call in flight, for this call.
+
+        Yields:
+            Text chunks of the assistant's response, in order.
+
+        Raises:
+            LLMError: On any API, network, or mid-stream error.
+        """
+        payload = self.build_payload(system_prompt, user_message, temperature, max_tokens, model)
+        payload["stream"] = True
+        async for chunk in self._coalesced(payload, cache, self._stream_once):
+            yield chunk
 
     async def complete_json(
         self,
-        system_prompt: str,
-        user_message: str,
+        system_prompt: Content,
+        user_message: Content,
         temperature: float = 0.0,
         max_tokens: int = 4096,
         model: str | None = None,
+        cache: bool = True,
     ) -> dict:
         """Send a completion request and parse the response as JSON.
 
-        Handles responses wrapped in ```json ... ``` fences as well as
-        bare JSON objects.
+        Handles responses wrapped in ```json ... ``` fences or surrounded by
+        prose, and salvages truncated objects (see ``parse_partial_json``).
 
         Args:
-            system_prompt: The system-level instruction for the model.
-            user_message: The user turn content.
+            system_prompt: The system-level instruction for the model, as
+                text or content blocks (see ``cacheable``).
+            user_message: The user turn content, as text or content blocks.
             temperature: Sampling temperature (defaults to 0.0 for determinism).
-            max_tokens: Maximum tokens in the response.
+            max_tokens: Maximum tokens per API call; a response cut off at
+                this limit is continued (see ``max_continuations``).
             model: Override the default model for this call.
+            cache: Set to False to bypass the response cache, and any identical
+                call in flight, for this call.
 
         Returns:
             Parsed JSON as a dict.
@@ -119,26 +218,558 @@ class LLMClient:
             temperature=temperature,
             max_tokens=max_tokens,
             model=model,
+            cache=cache,
         )
 
-        text = raw.strip()
+        return _parse_object(raw)
 
-        # Strip ```json ... ``` fences if present
-        fence_match = re.search(r"```(?:json)?\s*\n?(.*?)```", text, re.DOTALL)
-        if fence_match:
-            text = fence_match.group(1).strip()
+    async def complete_tool(
+        self,
+        system_prompt: Content,
+        user_message: Content,
+        tools: list[dict],
+        tool_name: str | None = None,
+        temperature: float = 0.0,
+        max_tokens: int = 4096,
+        model: str | None = None,
+        cache: bool = True,
+    ) -> dict:
+        """Force a call to one tool and return its input as structured output.
 
-        try:
-            return json.loads(text)
-        except json.JSONDecodeError as exc:
-            raise LLMError(
-                f"Failed to parse JSON from LLM response: {exc}\n\nRaw response:\n{raw[:500]}"
-            ) from exc
+        The tool's ``input_schema`` describes the result and ``tool_choice``
+        makes the model call it, so the response is JSON by construction.
+        Tools are part of the prompt-cache prefix, so calls sharing a cached
+        prefix should offer the same ``tools`` and differ in ``tool_name``.
+        The input is streamed as partial JSON and parsed tolerantly, so a
+        call cut off at ``max_tokens`` still yields every field the model
+        finished instead of being discarded.
+
+        Args:
+            system_prompt: The system-level instruction for the model, as
+                text or content blocks (see ``cacheable``).
+            user_message: The user turn content, as text or content blocks.
+            tools: Tool definitions with ``name``, ``description`` and
+                ``input_schema``.
+            tool_name: The tool to call (defaults to the first one).
+            temperature: Sampling temperature (defaults to 0.0 for determinism).
+            max_tokens: Maximum tokens in the response.
+            model: Override the default model for this call.
+            cache: Set to False to bypass the response cache, and any identical
+                call in flight, for this call.
+
+        Returns:
+            The tool input as a dict.
+
+        Raises:
+            LLMError: On API or network errors, or if no object can be recovered.
+        """
+        payload = self.build_payload(system_prompt, user_message, temperature, max_tokens, model)
+        payload.update(
+            stream=True,
+            tools=tools,
+            tool_choice={"type": "tool", "name": tool_name or tools[0]["name"]},
+        )
+        raw = "".join([chunk async for chunk in self._coalesced(payload, cache, self._stream_once)])
+        return _parse_object(raw)
+
+    # --- Message Batches ---
+
+    async def run_batch(
+        self,
+        requests: dict[str, dict],
+        poll_interval: float = 60.0,
+    ) -> dict[str, str | LLMError]:
+        """Run requests through the Message Batches API and wait for the results.
+
+        Batches are billed at half price and have separate, much higher
+        throughput limits, at the cost of completing asynchronously (usually
+        within minutes, at most 24 hours).
+
+        Args:
+            requests: Messages API payloads (see ``build_payload``) keyed by a
+                custom id matching ``[a-zA-Z0-9_-]{1,64}``.
+            poll_interval: Seconds between batch status checks.
+
+        Returns:
+            The response text for each custom id, or an LLMError for requests
+            that errored, expired or were canceled.
+
+        Raises:
+            LLMError: If the batch cannot be submitted, polled or read.
+        """
+        batch = await self.submit_batch(requests)
+        while batch.get("processing_status") != "ended":
+            await asyncio.sleep(poll_interval)
+            batch = await self.get_batch(batch["id"])
+        return await self.get_batch_results(batch)
+
+    async def submit_batch(self, requests: dict[str, dict]) -> dict:
+        """Create a message batch and return the batch object."""
+        body = {
+            "requests": [
+                {"custom_id": custom_id, "params": params}
+                for custom_id, params in requests.items()
+            ],
+        }
+        response = await self._send("POST", "/v1/messages/batches", json=body)
+        return response.json()
+
+    async def get_batch(self, batch_id: str) -> dict:
+        """Fetch the current state of a message batch."""
+        response = await self._send("GET", f"/v1/messages/batches/{batch_id}")
+        return response.json()
+
+    async def get_batch_results(self, batch: dict) -> dict[str, str | LLMError]:
+        """Download and decode the JSONL results of an ended batch."""
+        url = batch.get("results_url") or f"/v1/messages/batches/{batch['id']}/results"
+        response = await self._send("GET", url)
+
+        results: dict[str, str | LLMError] = {}
+        for line in response.text.splitlines():
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            result = entry.get("result", {})
+            if result.get("type") == "succeeded":
+                message = result.get("message", {})
+                self._record_usage(
+                    message.get("model", ""), message.get("usage", {}), None,
+                    stop_reason=message.get("stop_reason"),
+                    batch=True, custom_id=entry["custom_id"],
+                )
+                try:
+                    results[entry["custom_id"]] = self._extract_text(message)
+                except LLMError as exc:
+                    results[entry["custom_id"]] = exc
+            else:
+                error = result.get("error", {}).get("error", result.get("error", {}))
+                detail = error.get("message", "") if isinstance(error, dict) else ""
+                results[entry["custom_id"]] = LLMError(
+                    f"Batch request {result.get('type', 'failed')}: {detail}".rstrip(": ")
+                )
+        return results
+
+    async def _coalesced(
+        self,
+        payload: dict,
+        cache: bool,
+        request: Callable[[dict, dict], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """Answer from the response cache, or join or start the upstream call for ``payload``.
+
+        With ``cache`` False the caller wants an answer of its own, so it
+        never joins a call already in flight either.
+        """
+        if not cache:
+            async for chunk in self._continued(payload, None, request):
+                yield chunk
+            return
+
+        started = time.monotonic()
+        cache_key = self._cache.key(payload) if self._cache else None
+        if cache_key:
+            cached = await self._cache.get(cache_key)
+            if cached is not None:
+                self._record_usage(payload["model"], {}, started, cached=True)
+                yield cached
+                return
+
+        key = cache_key or ResponseCache.key(payload)
+        async for chunk in self._flights.stream(
+            key, lambda: self._continued(payload, cache_key, request),
+        ):
+            yield chunk
+
+    async def _continued(
+        self,
+        payload: dict,
+        cache_key: str | None,
+        request: Callable[[dict, dict], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """Run ``request`` and continue the response while it stops at max_tokens.
+
+        Each continuation re-sends the request with the text so far as a
+        prefilled assistant turn, so the model picks up where it was cut
+        off; at most ``max_continuations`` extra calls are made. The joined
+        text is what gets stored in the response cache.
+        """
+        text = ""
+        for continuation in range(self._max_continuations + 1):
+            outcome: dict = {}
+            # The API rejects a prefill ending in whitespace, so it is trimmed
+            # and the continuation's leading whitespace dropped in its place.
+            trim = text != text.rstrip()
+            async for chunk in request(_continuation_payload(payload, text), outcome):
+                if trim:
+                    chunk = chunk.lstrip()
+                    if not chunk:
+                        continue
+                    trim = False
+                text += chunk
+                yield chunk
+            if outcome.get("stop_reason") != "max_tokens" or not text.strip():
+                break
+            if "tool_choice" in payload:
+                # Tool input cannot be prefilled; the caller salvages what arrived
+                logger.warning(
+                    "Tool input hit max_tokens (%d); using the partial result",
+                    payload["max_tokens"],
+                )
+                break
+            if continuation < self._max_continuations:
+                logger.info(
+                    "Response hit max_tokens (%d); continuing (%d/%d)",
+                    payload["max_tokens"], continuation + 1, self._max_continuations,
+                )
+            else:
+                logger.warning(
+                    "Response still truncated after %d continuation(s)", self._max_continuations,
+                )
+        if cache_key:
+            await self._cache.set(cache_key, payload["model"], text)
+
+    async def _complete_once(self, payload: dict, outcome: dict) -> AsyncIterator[str]:
+        """Make one upstream call for ``complete``; yields the whole text once."""
+        started = time.monotonic()
+        deadline_at = self._retry.deadline_from(started)
+        attempt = 0
+        while True:
+            self._check_breaker()
+            try:
+                async with self._limiter.reserve(
+                    _estimate_input_tokens(payload), payload["max_tokens"],
+                ) as slot:
+                    request = self._client.build_request(
+                        "POST", "/v1/messages", json=payload,
+                        extensions={"trace": self._pool_metrics.trace()},
+                    )
+                    async with asyncio.timeout(self._retry.attempt_timeout_for(deadline_at)):
+                        response = await self._client.send(request, stream=True)
+                        self._pool_metrics.observe_response(response)
+                        try:
+                            first_byte_at = time.monotonic()
+                            await response.aread()
+                        finally:
+                            await response.aclose()
+                    self._observe_response(response)
+                    response.raise_for_status()
+                    data = response.json()
+                    slot.output_tokens_used = data.get("usage", {}).get("output_tokens")
+                self._record_usage(
+                    payload["model"], data.get("usage", {}), started,
+                    first_byte_at=first_byte_at, stop_reason=data.get("stop_reason"),
+                )
+                outcome["stop_reason"] = data.get("stop_reason")
+                if _is_continuation(payload) and not data.get("content"):
+                    return
+                yield self._extract_text(data)
+                return
+            except httpx.HTTPStatusError as exc:
+                delay = self._status_retry_delay(exc, attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(
+                        f"Anthropic API returned {exc.response.status_code}: {exc.response.text}"
+                    ) from exc
+            except (httpx.RequestError, TimeoutError) as exc:
+                delay = self._network_retry_delay(attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(
+                        f"Network error calling Anthropic API: {_describe(exc)}"
+                    ) from exc
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _stream_once(self, payload: dict, outcome: dict) -> AsyncIterator[str]:
+        """Make one upstream streaming call for ``complete_stream``."""
+        started = time.monotonic()
+        deadline_at = self._retry.deadline_from(started)
+        attempt = 0
+        emitted = False
+        emitted_tokens = 0
+        while True:
+            self._check_breaker()
+            usage: dict = {}
+            stop_reason: str | None = None
+            first_token_at: float | None = None
+            try:
+                async with (
+                    self._limiter.reserve(
+                        _estimate_input_tokens(payload), payload["max_tokens"],
+                    ) as slot,
+                    self._client.stream(
+                        "POST", "/v1/messages", json=payload,
+                        # The read timeout bounds each gap between chunks
+                        timeout=httpx.Timeout(
+                            self._retry.attempt_timeout_for(deadline_at), connect=10.0,
+                        ),
+                        extensions={"trace": self._pool_metrics.trace()},
+                    ) as response,
+                ):
+                    try:
+                        self._pool_metrics.observe_response(response)
+                        self._observe_response(response)
+                        if response.is_error:
+                            await response.aread()
+                        response.raise_for_status()
+                        async for event_type, data in self._iter_sse(response):
+                            if time.monotonic() > deadline_at:
+                                raise LLMError(
+                                    "Streamed response exceeded the "
+                                    f"{self._retry.deadline:.0f}s deadline"
+                                )
+                            if event_type == "error":
+                                error = data.get("error", {})
+                                error_type = error.get("type", "unknown")
+                                status = STREAM_ERROR_STATUSES.get(error_type)
+                                if status is not None:
+                                    self._limiter.observe(status, {})
+                                if error_type == "overloaded_error":
+                                    self._breaker.record_failure()
+                                message = (
+                                    f"Anthropic stream error ({error_type}): "
+                                    f"{error.get('message', '')}"
+                                )
+                                if status is None or emitted:
+                                    raise LLMError(message)
+                                raise _RetryableStreamError(message)
+                            if event_type == "content_block_delta":
+                                delta = data.get("delta", {})
+                                # Text, or the JSON input of a forced tool call
+                                piece = delta.get("text") or delta.get("partial_json")
+                                is_output = delta.get("type") in ("text_delta", "input_json_delta")
+                                if is_output and piece:
+                                    if first_token_at is None:
+                                        first_token_at = time.monotonic()
+                                    emitted = True
+                                    emitted_tokens += estimate_tokens(piece)
+                                    yield piece
+                            elif event_type == "message_start":
+                                usage.update(data.get("message", {}).get("usage", {}))
+                            elif event_type == "message_delta":
+                                usage.update(data.get("usage", {}))
+                                stop_reason = (
+                                    data.get("delta", {}).get("stop_reason") or stop_reason
+                                )
+                                slot.output_tokens_used = usage.get("output_tokens")
+                            elif event_type == "message_stop":
+                                break
+                    except asyncio.CancelledError:
+                        # Stopped mid-response (e.g. a cancelled stage): account for
+                        # what was billed and return the unused output reservation.
+                        # message_start only reports a placeholder output count
+                        usage["output_tokens"] = max(
+                            usage.get("output_tokens") or 0, emitted_tokens,
+                        )
+                        slot.output_tokens_used = usage["output_tokens"]
+                        self._record_usage(
+                            payload["model"], usage, started,
+                            first_byte_at=first_token_at, stop_reason="cancelled",
+                        )
+                        raise
+                self._record_usage(
+                    payload["model"], usage, started,
+                    first_byte_at=first_token_at, stop_reason=stop_reason,
+                )
+                outcome["stop_reason"] = stop_reason
+                if not emitted and not _is_continuation(payload):
+                    raise LLMError("No text content in streamed API response.")
+                return
+            except httpx.HTTPStatusError as exc:
+                delay = self._status_retry_delay(exc, attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(
+                        f"Anthropic API returned {exc.response.status_code}: {exc.response.text}"
+                    ) from exc
+            except _RetryableStreamError as exc:
+                # Overloaded or rate limited before any output: retry like a 429/529
+                delay = self._retry.next_delay(attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(str(exc)) from exc
+            except httpx.RequestError as exc:
+                delay = self._network_retry_delay(attempt, deadline_at)
+                if emitted or delay is None:
+                    raise LLMError(
+                        f"Network error calling Anthropic API: {_describe(exc)}"
+                    ) from exc
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send(self, method: str, url: str, **kwargs: object) -> httpx.Response:
+        """Issue a non-message API request, retrying on 429/529 and network errors."""
+        deadline_at = self._retry.deadline_from(time.monotonic())
+        attempt = 0
+        while True:
+            self._check_breaker()
+            try:
+                response = await self._client.request(
+                    method, url,
+                    timeout=httpx.Timeout(
+                        self._retry.attempt_timeout_for(deadline_at), connect=10.0,
+                    ),
+                    extensions={"trace": self._pool_metrics.trace()},
+                    **kwargs,
+                )
+                self._pool_metrics.observe_response(response)
+                self._breaker.observe(response.status_code)
+                response.raise_for_status()
+                return response
+            except httpx.HTTPStatusError as exc:
+                delay = self._status_retry_delay(exc, attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(
+                        f"Anthropic API returned {exc.response.status_code}: {exc.response.text}"
+                    ) from exc
+            except httpx.RequestError as exc:
+                delay = self._network_retry_delay(attempt, deadline_at)
+                if delay is None:
+                    raise LLMError(
+                        f"Network error calling Anthropic API: {_describe(exc)}"
+                    ) from exc
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    def _observe_response(self, response: httpx.Response) -> None:
+        """Feed a Messages API response into the rate limiter and circuit breaker."""
+        self._limiter.observe(response.status_code, response.headers)
+        self._breaker.observe(response.status_code)
+
+    def _check_breaker(self) -> None:
+        if not self._breaker.allow():
+            raise CircuitOpenError(
+                "Anthropic API is overloaded; shedding requests for another "
+                f"{self._breaker.retry_in():.1f}s"
+            )
+
+    def _status_retry_delay(
+        self, exc: httpx.HTTPStatusError, attempt: int, deadline_at: float,
+    ) -> float | None:
+        """Backoff before retrying an error response, or None if it is final."""
+        if exc.response.status_code not in RETRY_STATUSES:
+            return None
+        return self._retry.next_delay(attempt, deadline_at, exc.response.headers)
+
+    def _network_retry_delay(self, attempt: int, deadline_at: float) -> float | None:
+        """Backoff before retrying a network error or timeout, or None to give up."""
+        self._breaker.record_failure()
+        return self._retry.next_delay(attempt, deadline_at)
+
+    async def warm_up(self, connections: int = 1, timeout: float = 5.0) -> None:
+        """Open pooled connections ahead of the first real request.
+
+        Issues ``connections`` concurrent lightweight ``GET /v1/models``
+        requests so DNS, TCP and TLS setup happen at startup rather than on
+        the first stage run. Any response, even an auth error, leaves a
+        usable keep-alive connection behind; failures are only logged.
+        """
+        if self._pool.use_http2:
+            connections = 1  # one HTTP/2 connection multiplexes every request
+
+        async def ping() -> None:
+            response = await self._client.get(
+                "/v1/models",
+                params={"limit": 1},
+                timeout=timeout,
+                extensions={"trace": self._pool_metrics.trace()},
+            )
+            self._pool_metrics.observe_response(response)
+
+        started = time.monotonic()
+        results = await asyncio.gather(
+            *(ping() for _ in range(max(1, connections))), return_exceptions=True,
+        )
+        failures = [r for r in results if isinstance(r, Exception)]
+        if failures:
+            logger.warning("LLM connection warm-up failed: %s", failures[0])
+        else:
+            logger.info(
+                "Warmed %d LLM connection(s) in %.0f ms",
+                len(results), (time.monotonic() - started) * 1000,
+            )
+
+    def stats(self) -> dict:
+        """Return rate limiter, connection pool, response cache and usage counters."""
+        return {
+            "provider": self._provider.name,
+            "rate_limiter": self._limiter.stats(),
+            "circuit_breaker": self._breaker.stats(),
+            "single_flight": self._flights.stats(),
+            "connection_pool": {
+                "max_connections": self._pool.max_connections,
+                "max_keepalive_connections": self._pool.max_keepalive_connections,
+                "keepalive_expiry": self._pool.keepalive_expiry,
+                "http2": self._pool.http2,
+                **self._pool_metrics.stats(self._client),
+            },
+            "cache": self._cache.stats() if self._cache else None,
+            "usage": dict(self._usage_totals),
+        }
 
     async def close(self) -> None:
         """Close the underlying httpx client."""
         await self._client.aclose()
 
+    def _record_usage(
+        self,
+        model: str,
+        usage: dict,
+        started: float | None,
+        first_byte_at: float | None = None,
+        stop_reason: str | None = None,
+        cached: bool = False,
+        batch: bool = False,
+        custom_id: str | None = None,
+    ) -> CallUsage:
+        """Account for one finished call: tokens (including prompt-cache reads
+        and writes), stop reason, wall-clock and time to first byte/token."""
+        now = time.monotonic()
+        call = record_call(CallUsage(
+            model=model,
+            **{field: usage.get(field) or 0 for field in USAGE_FIELDS},
+            stop_reason=stop_reason,
+            latency_ms=int((now - started) * 1000) if started is not None else 0,
+            ttfb_ms=int((first_byte_at - started) * 1000)
+            if started is not None and first_byte_at is not None else None,
+            cached=cached,
+            batch=batch,
+            custom_id=custom_id,
+        ))
+        for field in USAGE_FIELDS:
+            self._usage_totals[field] += getattr(call, field)
+        self._usage_totals["cost_usd"] = round(self._usage_totals["cost_usd"] + call.cost_usd, 6)
+        logger.debug(
+            "LLM call on %s (%s): %d input, %d output, %d cache write, %d cache read tokens, "
+            "%d ms, stop=%s",
+            model, call.purpose or "untracked", call.input_tokens, call.output_tokens,
+            call.cache_creation_input_tokens, call.cache_read_input_tokens,
+            call.latency_ms, stop_reason,
+        )
+        return call
+
+    @staticmethod
+    async def _iter_sse(response: httpx.Response) -> AsyncIterator[tuple[str, dict]]:
+        """Parse a server-sent event stream into (event type, JSON data) pairs."""
+        event_type = ""
+        data_lines: list[str] = []
+
+        async def lines() -> AsyncIterator[str]:
+            async for line in response.aiter_lines():
+                yield line
+            yield ""  # flush a final event not followed by a blank line
+
+        async for line in lines():
+            if line.startswith("event:"):
+                event_type = line[6:].strip()
+            elif line.startswith("data:"):
+                data_lines.append(line[5:].strip())
+            elif not line and data_lines:
+                try:
+                    data = json.loads("\n".join(data_lines))
+                except json.JSONDecodeError:
+                    data = {}
+                yield event_type or data.get("type", ""), data
+                event_type = ""
+                data_lines = []
+
     @staticmethod
     def _extract_text(data: dict) -> str:
         """Pull the assistant text out of an Anthropic Messages API response."""
@@ -155,5 +786,56 @@ class LLMClient:
         return "\n".join(texts)
 
 
+def _parse_object(raw: str) -> dict:
+    try:
+        data = parse_partial_json(raw)
+    except ValueError as exc:
+        raise LLMError(f"Failed to parse JSON from LLM response: {exc}") from exc
+    if not isinstance(data, dict):
+        raise LLMError(f"Expected a JSON object from LLM response, got: {raw[:500]}")
+    return data
+
+
+def _continuation_payload(payload: dict, text: str) -> dict:
+    """The request continuing ``payload`` from ``text`` (``payload`` itself if no text yet)."""
+    if not text.strip():
+        return payload
+    return {
+        **payload,
+        "messages": [*payload["messages"], {"role": "assistant", "content": text.rstrip()}],
+    }
+
+
+def _is_continuation(payload: dict) -> bool:
+    return payload["messages"][-1]["role"] == "assistant"
+
+
+def _estimate_input_tokens(payload: dict) -> int:
+    """Rough input token count for rate limiting (about 4 characters per token)."""
+    chars = _content_length(payload.get("system", "")) + sum(
+        _content_length(m["content"]) for m in payload.get("messages", [])
+    )
+    return chars // 4 + 1
+
+
+def _content_length(content: Content) -> int:
+    if isinstance(content, str):
+        return len(content)
+    return sum(len(block.get("text", "")) for block in content)
+
+
+def _describe(exc: BaseException) -> str:
+    # Timeouts often carry an empty message
+    return str(exc) or type(exc).__name__
+
+
 class LLMError(Exception):
     """Raised when the LLM client encounters an error."""
+
+
+class CircuitOpenError(LLMError):
+    """Raised without calling the API while the circuit breaker is open."""
+
+
+class _RetryableStreamError(Exception):
+    """A rate-limit or overload error event received before any output."""
@@ -2,17 +2,28 @@
 
 Runs all agents for a given stage in parallel, detects conflicts between
 their outputs, and yields SSE events throughout the process.
+
+With a quorum below all agents, conflict detection doesn't wait for the
+slowest ones: it starts once the quorum has completed, and outputs arriving
+later are folded into the report incrementally. Past the stage deadline,
+agents still running are stopped, quorum or not, which bounds how long one
+straggler (say, retrying through 429s) can hold up the stage.
 """
 
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import logging
-from collections.abc import AsyncGenerator
+import math
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
 
 from ..models import (
     AgentConfig,
     AgentOutput,
+    CallUsage,
     ConflictReport,
     Project,
     SSEEvent,
@@ -21,37 +32,137 @@ from ..models import (
     StageStatus,
 )
 from ..store.database import Database
-from .conflict_detector import detect_conflicts
-from .llm_client import LLMClient, LLMError
+from .conflict_detector import detect_conflicts, update_conflicts
+from .context_budget import ContextSection, pack_sections, prompt_budget
+from .llm_client import LLMClient, LLMError, cacheable
+from .scheduler import StageScheduler, current_lane
+from .stage_digest import build_stage_digest, digest_fingerprint, has_fresh_digest
+from .usage import combine_usage, track_usage
 
 logger = logging.getLogger(__name__)
 
+# Error of the outputs of agents stopped past the stage deadline
+STRAGGLER_STOPPED = "Stopped at the stage deadline"
+
+TASK_INSTRUCTIONS = (
+    "# Your Task"
+    "\nProvide your analysis based on your assigned role and perspective. "
+    "Be thorough, cite evidence where possible, and clearly state your "
+    "confidence level in key claims."
+    "\n\n**Quality Gates:**"
+    "\n- Every claim must be traceable to specific evidence. Mark unsourced claims."
+    "\n- Every insight must be specific to this project's context. Flag generic observations."
+    "\n- Every recommendation must state what decision it enables. Omit decision-inert findings."
+)
+
+
+@dataclass
+class StagePrefetch:
+    """Inputs of a stage's run loaded ahead of time (see ``StageOrchestrator.prefetch``)."""
+
+    agents: list[AgentConfig]
+    documents_text: str
+
+
+@dataclass
+class _EarlyConflicts:
+    """Conflict detection done while some of a stage's agents were still running."""
+
+    report: ConflictReport | None = None
+    # The completed outputs ``report`` covers
+    analyzed: list[AgentOutput] = field(default_factory=list)
+    calls: list[CallUsage] = field(default_factory=list)
+
+    def late(self, outputs: list[AgentOutput]) -> list[AgentOutput]:
+        """The completed outputs ``report`` doesn't cover yet."""
+        analyzed_ids = {o.id for o in self.analyzed}
+        return [o for o in outputs if o.status == "complete" and o.id not in analyzed_ids]
+
 
 class StageOrchestrator:
     """Orchestrates a single research stage: runs agents, detects conflicts,
     persists results, and streams SSE events."""
 
-    def __init__(self, llm_client: LLMClient, db: Database):
+    def __init__(
+        self,
+        llm_client: LLMClient,
+        db: Database,
+        context_budget_tokens: int | None = None,
+        scheduler: StageScheduler | None = None,
+        quorum: float = 1.0,
+        stage_deadline: float | None = None,
+    ):
         self._llm = llm_client
         self._db = db
+        # Optional cap below the model-derived context budget
+        self._context_budget_tokens = context_budget_tokens
+        # Queues agent calls across projects; without one they start at once
+        self._scheduler = scheduler
+        # Share of a stage's agents whose completed outputs start conflict
+        # detection, and seconds after which agents still running are stopped
+        self._quorum = min(1.0, max(0.0, quorum))
+        self._stage_deadline = stage_deadline
+        # Digests being built in the background, by (project, stage), with
+        # the fingerprint of the content each one is built from
+        self._compactions: dict[tuple[str, int], tuple[str, asyncio.Task[str | None]]] = {}
 
     async def run_stage(
         self,
         project: Project,
         stage_number: int,
         agents: list[AgentConfig],
+        use_cache: bool = True,
+        checkpoint: StageResult | None = None,
+        rerun_agent_ids: set[str] | None = None,
+        prefetched: StagePrefetch | None = None,
+        owns_stage: Callable[[], bool] | None = None,
     ) -> AsyncGenerator[SSEEvent, None]:
         """Run all enabled agents for a stage and stream progress events.
 
+        The stage is saved in RUNNING status up front and each agent's
+        output is written as soon as it finishes. Passing an existing
+        result as ``checkpoint`` (an interrupted run, or a finished stage
+        being partly rerun) keeps its completed outputs and runs only the
+        agents without one, plus those in ``rerun_agent_ids``. Conflict
+        detection is skipped when the set of successful outputs ends up
+        unchanged and the checkpoint already has a report.
+
         Args:
             project: The project this stage belongs to.
             stage_number: Which stage to run (1-6).
             agents: Agent configurations for this stage.
+            use_cache: Set to False to bypass the LLM response cache.
+            checkpoint: The stage result to resume or partly rerun.
+            rerun_agent_ids: Agents whose output in ``checkpoint`` is
+                discarded and produced again.
+            prefetched: Inputs already loaded by ``prefetch``.
+            owns_stage: Optional check made before each agent checkpoint;
+                once it returns False (the stage was taken over by another
+                process) outputs are no longer written.
 
         Yields:
             SSEEvent instances tracking progress through the stage.
         """
+        rerun_agent_ids = rerun_agent_ids or set()
         enabled_agents = [a for a in agents if a.enabled]
+        recovered = [
+            o for o in (checkpoint.agent_outputs if checkpoint else [])
+            if o.status == "complete" and o.agent_id not in rerun_agent_ids
+        ]
+        recovered_ids = {o.agent_id for o in recovered}
+        pending_agents = [a for a in enabled_agents if a.id not in recovered_ids]
+
+        previous_report, previous_inputs = None, None
+        if checkpoint:
+            previous_report = checkpoint.conflict_report
+            previous_inputs = self._conflict_inputs(checkpoint.agent_outputs)
+
+        shared_context, context_budget = "", None
+        if pending_agents:
+            shared_context, context_budget = await self._load_shared_context(
+                project, stage_number, pending_agents,
+                documents_text=prefetched.documents_text if prefetched else None,
+            )
 
         # --- STAGE_START ---
         yield SSEEvent(
@@ -59,11 +170,13 @@ class StageOrchestrator:
             data={
                 "project_id": project.id,
                 "stage_number": stage_number,
-                "agent_count": len(enabled_agents),
+                "agent_count": len(pending_agents) + len(recovered),
+                "recovered_agents": len(recovered),
+                "context_budget": context_budget,
             },
         )
 
-        if not enabled_agents:
+        if not pending_agents and not recovered:
             yield SSEEvent(
                 type=SSEEventType.STAGE_COMPLETE,
                 data={
@@ -75,17 +188,20 @@ class StageOrchestrator:
             )
             return
 
-        # Build context from prior approved stages
-        prior_context = self._build_prior_context(project, stage_number)
-
-        # Fetch uploaded documents text
-        documents_text = await self._db.get_documents_text(project.id)
+        # Only the kept outputs remain in the RUNNING result, so a resume
+        # after a crash reruns the rest and redoes conflict detection.
+        stage_result = checkpoint or StageResult(project_id=project.id, stage_number=stage_number)
+        stage_result.status = StageStatus.RUNNING
+        stage_result.agent_outputs = list(recovered)
+        stage_result.conflict_report = None
+        await self._db.save_stage_result(stage_result)
 
-        # Build the user message combining research question + context + prior stages + documents
-        user_message = self._build_user_message(project, prior_context, documents_text)
+        # --- Replay outputs recovered from the checkpoint ---
+        for output in recovered:
+            yield self._agent_result_event(output)
 
         # --- Yield AGENT_START for each agent ---
-        for agent in enabled_agents:
+        for agent in pending_agents:
             yield SSEEvent(
                 type=SSEEventType.AGENT_START,
                 agent_id=agent.id,
@@ -93,40 +209,27 @@ class StageOrchestrator:
                 data={"stage": stage_number},
             )
 
-        # --- Run agents with staggered starts to avoid rate limits ---
-        async def _staggered_run(agent: AgentConfig, delay: float) -> AgentOutput:
-            if delay > 0:
-                await asyncio.sleep(delay)
-            return await self._run_single_agent(agent, user_message, project.id)
+        # --- Run agents, streaming deltas and completions as they happen
+        # (and early conflict detection once a quorum has completed) ---
+        agent_outputs: list[AgentOutput] = list(recovered)
+        early = _EarlyConflicts()
+        agent_events = self._run_agents_with_quorum(
+            pending_agents, shared_context, project.id, stage_number, agent_outputs,
+            early, use_cache=use_cache, stage_result_id=stage_result.id, owns_stage=owns_stage,
+        )
+        # Closed even if this run is closed between two events, so the
+        # agents still record their partial outputs
+        async with contextlib.aclosing(agent_events):
+            async for event in agent_events:
+                yield event
 
-        tasks = [
-            _staggered_run(agent, i * 5.0)  # 5 second stagger between agents
-            for i, agent in enumerate(enabled_agents)
-        ]
-        agent_outputs: list[AgentOutput] = await asyncio.gather(*tasks)
-
-        # --- Yield AGENT_COMPLETE / AGENT_ERROR for each ---
-        for output in agent_outputs:
-            if output.status == "error":
-                yield SSEEvent(
-                    type=SSEEventType.AGENT_ERROR,
-                    agent_id=output.agent_id,
-                    agent_name=output.agent_name,
-                    data={
-                        "stage": stage_number,
-                        "error": output.error or "Unknown error",
-                    },
-                )
-            else:
-                yield SSEEvent(
-                    type=SSEEventType.AGENT_COMPLETE,
-                    agent_id=output.agent_id,
-                    agent_name=output.agent_name,
-                    data={
-                        "stage": stage_number,
-                        "content_length": len(output.content),
-                    },
-                )
+        reused_report = None
+        if (
+            early.report is None
+            and previous_report is not None
+            and self._conflict_inputs(agent_outputs) == previous_inputs
+        ):
+            reused_report = previous_report
 
         # --- CONFLICT_START ---
         yield SSEEvent(
@@ -135,16 +238,17 @@ class StageOrchestrator:
                 "project_id": project.id,
                 "stage_number": stage_number,
                 "agent_count": len(agent_outputs),
+                "reused_report": reused_report is not None,
+                "late_agents": len(early.late(agent_outputs)) if early.report else None,
             },
         )
 
-        # --- Run conflict detection ---
-        successful_outputs = [o for o in agent_outputs if o.status == "complete"]
-        conflict_report = await detect_conflicts(
-            agent_outputs=successful_outputs,
-            llm_client=self._llm,
-            stage=stage_number,
+        # --- Run conflict detection and persist the stage result ---
+        stage_result = await self._detect_and_save(
+            project, stage_number, agent_outputs,
+            stage_result=stage_result, conflict_report=reused_report, early=early,
         )
+        conflict_report = stage_result.conflict_report
 
         # --- CONFLICT_COMPLETE ---
         yield SSEEvent(
@@ -155,19 +259,10 @@ class StageOrchestrator:
                 "agreements": len(conflict_report.agreements),
                 "disagreements": len(conflict_report.disagreements),
                 "synthesis": conflict_report.synthesis,
+                "conflict_report": conflict_report.model_dump(),
             },
         )
 
-        # --- Persist the stage result ---
-        stage_result = StageResult(
-            project_id=project.id,
-            stage_number=stage_number,
-            status=StageStatus.COMPLETE,
-            agent_outputs=agent_outputs,
-            conflict_report=conflict_report,
-        )
-        await self._db.save_stage_result(stage_result)
-
         # --- STAGE_COMPLETE ---
         yield SSEEvent(
             type=SSEEventType.STAGE_COMPLETE,
@@ -182,75 +277,740 @@ class StageOrchestrator:
             },
         )
 
+    async def run_stages_batch(
+        self,
+        runs: list[tuple[Project, int, list[AgentConfig]]],
+        poll_interval: float = 60.0,
+    ) -> list[StageResult]:
+        """Run one or more stages through the Message Batches API.
+
+        Every enabled agent of every requested stage is submitted as a single
+        batch (half price, non-interactive). Once the batch ends, each stage
+        gets conflict detection and is persisted exactly as ``run_stage``
+        would do. Stages with no enabled agents are skipped.
+
+        Args:
+            runs: (project, stage number, agent configurations) per stage.
+            poll_interval: Seconds between batch status checks.
+
+        Returns:
+            The saved StageResult of each stage that had enabled agents.
+
+        Raises:
+            LLMError: If the batch itself cannot be submitted or read.
+        """
+        requests: dict[str, dict] = {}
+        plan: list[tuple[Project, int, list[tuple[str, AgentConfig]]]] = []
+        for project, stage_number, agents in runs:
+            enabled_agents = [a for a in agents if a.enabled]
+            if not enabled_agents:
+                continue
+            shared_context, _ = await self._load_shared_context(project, stage_number, enabled_agents)
+            entries: list[tuple[str, AgentConfig]] = []
+            for agent in enabled_agents:
+                custom_id = f"req-{len(requests)}"
+                requests[custom_id] = self._llm.build_payload(
+                    system_prompt=self._agent_system_prompt(agent, shared_context),
+                    user_message=TASK_INSTRUCTIONS,
+                    temperature=agent.temperature,
+                    max_tokens=agent.max_tokens,
+                    model=agent.model,
+                )
+                entries.append((custom_id, agent))
+            plan.append((project, stage_number, entries))
+
+        if not plan:
+            return []
+
+        with track_usage("agent") as calls:
+            results = await self._llm.run_batch(requests, poll_interval=poll_interval)
+        usage_by_id = {call.custom_id: call for call in calls}
+
+        async def _finish(
+            project: Project, stage_number: int, entries: list[tuple[str, AgentConfig]],
+        ) -> StageResult:
+            agent_outputs = []
+            for custom_id, agent in entries:
+                result = results.get(custom_id, LLMError("Missing from batch results"))
+                if isinstance(result, LLMError):
+                    logger.error("Agent %s failed in batch: %s", agent.name, result)
+                    agent_outputs.append(self._agent_output(agent, project.id, error=str(result)))
+                else:
+                    output = self._agent_output(agent, project.id, content=result)
+                    output.usage = usage_by_id.get(custom_id)
+                    agent_outputs.append(output)
+            await self._record_agent_usage(project.id, stage_number, agent_outputs)
+            return await self._detect_and_save(project, stage_number, agent_outputs)
+
+        return list(await asyncio.gather(*(_finish(*entry) for entry in plan)))
+
+    async def mark_cancelled(self, project_id: str, stage_number: int) -> StageResult | None:
+        """Close a stage whose run was cancelled.
+
+        The outputs checkpointed so far, including the partial ones of the
+        agents that were interrupted, are kept; the stage can be finished
+        later by rerunning the agents without a completed output.
+        """
+        stage_result = await self._db.get_stage_result(project_id, stage_number)
+        if stage_result and stage_result.status == StageStatus.RUNNING:
+            stage_result.status = StageStatus.CANCELLED
+            await self._db.update_stage_result(project_id, stage_number, status=StageStatus.CANCELLED)
+        return stage_result
+
+    async def approve_stage(self, project_id: str, stage_number: int) -> int | None:
+        """Approve a finished stage and advance the project.
+
+        The stage's digest is built in the background rather than on every
+        later stage run; until it is ready, later stages get the full stage
+        text. Returns the next stage, or None once the final stage is approved.
+        """
+        now = datetime.now(timezone.utc).isoformat()
+        await self._db.update_stage_result(
+            project_id, stage_number, status=StageStatus.APPROVED, approved_at=now,
+        )
+        await self.compact_stage(project_id, stage_number)
+
+        if stage_number >= 6:
+            await self._db.update_project(project_id, state="complete", current_stage=6)
+            return None
+        await self._db.update_project(project_id, current_stage=stage_number + 1)
+        return stage_number + 1
+
+    async def prefetch(self, project: Project, stage_number: int) -> StagePrefetch:
+        """Load what a run of ``stage_number`` needs before it can start.
+
+        Meant to overlap with the end of the previous stage: the agents and
+        uploaded documents are read, and stale digests of the stages
+        approved so far start rebuilding in the background.
+        """
+        self._compact_stale(project, stage_number)
+        agents, documents_text = await asyncio.gather(
+            self._db.list_agents(stage=stage_number, project_id=project.id),
+            self._db.get_documents_text(project.id),
+        )
+        return StagePrefetch(agents=agents, documents_text=documents_text)
+
+    async def compact_stage(
+        self, project_id: str, stage_number: int,
+    ) -> asyncio.Task[str | None] | None:
+        """Start building the digest later stages receive for this stage.
+
+        Called when a stage is approved or overridden; returns without
+        waiting for the digest. Returns the task building it, or None if the
+        stage has no result or its digest is already up to date.
+        """
+        stage_result = await self._db.get_stage_result(project_id, stage_number)
+        if not stage_result:
+            return None
+        return self.compact_in_background(stage_result)
+
+    def compact_in_background(self, stage_result: StageResult) -> asyncio.Task[str | None] | None:
+        """Build the digest of ``stage_result`` in a background task.
+
+        A build already under way for the same content is reused, and one
+        for older content (the stage was overridden since) is cancelled.
+        Returns None if the digest is already up to date. If the build
+        fails, later stages fall back to the full stage text.
+        """
+        if has_fresh_digest(stage_result):
+            return None
+        key = (stage_result.project_id, stage_result.stage_number)
+        fingerprint = digest_fingerprint(stage_result)
+        building = self._compactions.get(key)
+        if building is not None:
+            if building[0] == fingerprint:
+                return building[1]
+            building[1].cancel()
+
+        task = asyncio.create_task(self._compact_logged(stage_result))
+        self._compactions[key] = (fingerprint, task)
+
+        def _forget(done: asyncio.Task[str | None]) -> None:
+            if self._compactions.get(key, (None, None))[1] is done:
+                del self._compactions[key]
+
+        task.add_done_callback(_forget)
+        return task
+
+    def _compact_stale(self, project: Project, stage_number: int) -> None:
+        """Start rebuilding stale digests of the stages approved before ``stage_number``."""
+        for sr in project.stage_results:
+            if sr.status == StageStatus.APPROVED and sr.stage_number < stage_number:
+                self.compact_in_background(sr)
+
+    async def shutdown(self) -> None:
+        """Cancel digests still being built; they are rebuilt when next needed."""
+        tasks = [task for _, task in self._compactions.values()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _compact_logged(self, stage_result: StageResult) -> str | None:
+        """``_compact`` for a background task: errors are logged, not raised."""
+        try:
+            return await self._compact(stage_result)
+        except Exception:
+            logger.exception(
+                "Digest of stage %d of project %s failed",
+                stage_result.stage_number, stage_result.project_id,
+            )
+            return None
+
+    async def _compact(self, stage_result: StageResult) -> str | None:
+        """Build, persist and attach the digest of ``stage_result``."""
+        with track_usage("digest") as calls:
+            try:
+                digest = await build_stage_digest(stage_result, self._llm)
+            except LLMError as exc:
+                logger.warning(
+                    "Could not build digest for stage %d of project %s: %s",
+                    stage_result.stage_number, stage_result.project_id, exc,
+                )
+                digest = None
+        await self._db.record_llm_calls(stage_result.project_id, stage_result.stage_number, calls)
+        if digest is None:
+            return None
+
+        stage_result.digest = digest
+        stage_result.digest_fingerprint = digest_fingerprint(stage_result)
+        await self._db.update_stage_result(
+            stage_result.project_id, stage_result.stage_number,
+            digest=stage_result.digest, digest_fingerprint=stage_result.digest_fingerprint,
+        )
+        return digest
+
+    async def _load_shared_context(
+        self,
+        project: Project,
+        stage_number: int,
+        agents: list[AgentConfig],
+        documents_text: str | None = None,
+    ) -> tuple[str, dict]:
+        """Build the context shared by every agent: research question +
+        context + prior stages + documents. It is sent as a prompt-cache
+        prefix so only the first agent pays full input price for it.
+        ``documents_text`` is the documents' text if already loaded.
+
+        The context is packed into the smallest budget among ``agents``, so
+        it fits every agent's model; returns the text and the packing report.
+        Approved stages without an up-to-date digest (still being built,
+        approved before digests existed, or whose compaction failed) go in
+        as their full text, and their digests start rebuilding for next time.
+        """
+        self._compact_stale(project, stage_number)
+        prior_sections = self._prior_stage_sections(project, stage_number)
+        if documents_text is None:
+            documents_text = await self._db.get_documents_text(project.id)
+        return self._build_shared_context(
+            project, prior_sections, documents_text, self._context_budget(agents),
+        )
+
+    def _context_budget(self, agents: list[AgentConfig]) -> int:
+        """Tokens available for shared context: the tightest budget once
+        each agent's output and own instructions are set aside."""
+        budget = min(
+            prompt_budget(agent.max_tokens, agent.system_prompt + TASK_INSTRUCTIONS)
+            for agent in agents
+        )
+        if self._context_budget_tokens:
+            budget = min(budget, self._context_budget_tokens)
+        return budget
+
+    async def _detect_and_save(
+        self,
+        project: Project,
+        stage_number: int,
+        agent_outputs: list[AgentOutput],
+        stage_result: StageResult | None = None,
+        conflict_report: ConflictReport | None = None,
+        early: _EarlyConflicts | None = None,
+    ) -> StageResult:
+        """Run conflict detection over the successful outputs and persist the
+        stage, along with the usage of the conflict-detection calls.
+
+        ``stage_result`` is the RUNNING result checkpointed during the run,
+        if any; it is completed in place rather than replaced. Passing
+        ``conflict_report`` reuses it instead of running detection; with
+        ``early`` holding a report, only the outputs it doesn't cover are
+        folded into it.
+        """
+        conflict_calls = []
+        if conflict_report is None:
+            with track_usage("conflict") as conflict_calls:
+                if early is not None and early.report is not None:
+                    conflict_report = await update_conflicts(
+                        early.report, early.analyzed, early.late(agent_outputs),
+                        llm_client=self._llm, stage=stage_number,
+                    )
+                else:
+                    conflict_report = await detect_conflicts(
+                        agent_outputs=[o for o in agent_outputs if o.status == "complete"],
+                        llm_client=self._llm,
+                        stage=stage_number,
+                    )
+        if early is not None:
+            conflict_calls = early.calls + conflict_calls
+        stage_result = stage_result or StageResult(project_id=project.id, stage_number=stage_number)
+        stage_result.status = StageStatus.COMPLETE
+        stage_result.agent_outputs = agent_outputs
+        stage_result.conflict_report = conflict_report
+        await self._db.save_stage_result(stage_result)
+        await self._db.record_llm_calls(project.id, stage_number, conflict_calls)
+        return stage_result
+
+    async def _record_agent_usage(
+        self, project_id: str, stage_number: int, outputs: list[AgentOutput],
+    ) -> None:
+        for output in outputs:
+            if output.usage:
+                await self._db.record_llm_calls(
+                    project_id, stage_number, [output.usage],
+                    agent_output_id=output.id, agent_name=output.agent_name,
+                )
+
+    @staticmethod
+    def _conflict_inputs(outputs: list[AgentOutput]) -> list[tuple[str, str]]:
+        """What conflict detection depends on: each successful agent and its text."""
+        return sorted((o.agent_id, o.content) for o in outputs if o.status == "complete")
+
+    def _quorum_size(self, agent_count: int) -> int:
+        """Completed outputs needed before conflict detection may start."""
+        return min(agent_count, max(1, math.ceil(self._quorum * agent_count)))
+
+    async def _run_agents_with_quorum(
+        self,
+        agents: list[AgentConfig],
+        shared_context: str,
+        project_id: str,
+        stage_number: int,
+        outputs: list[AgentOutput],
+        early: _EarlyConflicts,
+        use_cache: bool = True,
+        stage_result_id: str | None = None,
+        owns_stage: Callable[[], bool] | None = None,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Run agents like ``_run_agents``, detecting conflicts once a quorum is done.
+
+        The quorum counts the completed outputs already in ``outputs`` (kept
+        from a checkpoint) and those of ``agents``. Once it is met, conflict
+        detection runs on the completed outputs while the other agents keep
+        going, and outputs completed meanwhile are folded in by further
+        incremental passes; ``early`` holds the latest report. Past the
+        stage deadline, agents still running are stopped, whether or not
+        the quorum was met.
+
+        Yields:
+            The agent events, and CONFLICT_START / CONFLICT_COMPLETE events
+            marked ``partial`` for each early pass.
+        """
+        agent_count = len(outputs) + len(agents)
+        quorum = self._quorum_size(agent_count)
+        # Outputs count towards the quorum once their event has been sent,
+        # so a partial report never covers an agent clients haven't seen finish
+        finished: dict[str, AgentOutput] = {}
+        completed = [o for o in outputs if o.status == "complete"]
+
+        def _on_output(output: AgentOutput) -> None:
+            finished[output.id] = output
+
+        stop = asyncio.Event()
+        agent_events = self._run_agents(
+            agents, shared_context, project_id, stage_number, outputs,
+            use_cache=use_cache, stage_result_id=stage_result_id, owns_stage=owns_stage,
+            on_output=_on_output, stop=stop,
+        )
+        early_detection = quorum < agent_count
+        if not early_detection and not self._stage_deadline:
+            # Every agent is needed, so there is nothing to start early
+            async with contextlib.aclosing(agent_events):
+                async for event in agent_events:
+                    yield event
+            return
+
+        loop = asyncio.get_running_loop()
+        deadline_at = loop.time() + self._stage_deadline if self._stage_deadline else None
+        next_event: asyncio.Future | None = None
+        detection: asyncio.Task | None = None
+        try:
+            while True:
+                if next_event is None:
+                    next_event = asyncio.ensure_future(anext(agent_events, None))
+                timeout = None
+                if deadline_at is not None and not stop.is_set():
+                    timeout = max(0.0, deadline_at - loop.time())
+                waiters = {next_event} if detection is None else {next_event, detection}
+                await asyncio.wait(waiters, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if detection is not None and detection.done():
+                    early.report, early.analyzed = detection.result()
+                    detection = None
+                    yield self._partial_conflict_event(project_id, stage_number, early)
+                if next_event.done():
+                    event = next_event.result()
+                    next_event = None
+                    if event is None:
+                        break
+                    if event.type == SSEEventType.AGENT_COMPLETE:
+                        completed.append(finished[event.data["output_id"]])
+                    yield event
+
+                if deadline_at is not None and not stop.is_set() and loop.time() >= deadline_at:
+                    logger.info(
+                        "Stage %d deadline passed with %d of %d agents complete; "
+                        "stopping the others", stage_number, len(completed), agent_count,
+                    )
+                    stop.set()
+                if not early_detection or len(completed) < quorum:
+                    continue
+                late = early.late(completed)
+                if detection is None and late:
+                    yield SSEEvent(
+                        type=SSEEventType.CONFLICT_START,
+                        data={
+                            "project_id": project_id,
+                            "stage_number": stage_number,
+                            "agent_count": len(completed),
+                            "partial": True,
+                            "late_agents": len(late) if early.report else None,
+                        },
+                    )
+                    detection = asyncio.create_task(self._fold_in(stage_number, early, late))
+
+            # Agents are done: let a pass in progress finish before the final one
+            if detection is not None:
+                early.report, early.analyzed = await detection
+                detection = None
+        finally:
+            for task in (next_event, detection):
+                if task is not None and not task.done():
+                    task.cancel()
+                    await asyncio.wait({task})
+            await agent_events.aclose()
+
+    async def _fold_in(
+        self, stage_number: int, early: _EarlyConflicts, late: list[AgentOutput],
+    ) -> tuple[ConflictReport, list[AgentOutput]]:
+        """Detect conflicts among ``late`` outputs, or fold them into the early report."""
+        with track_usage("conflict") as calls:
+            if early.report is None:
+                report = await detect_conflicts(late, self._llm, stage_number)
+            else:
+                report = await update_conflicts(
+                    early.report, early.analyzed, late, self._llm, stage_number,
+                )
+        early.calls.extend(calls)
+        return report, early.analyzed + late
+
+    @staticmethod
+    def _partial_conflict_event(
+        project_id: str, stage_number: int, early: _EarlyConflicts,
+    ) -> SSEEvent:
+        report = early.report
+        return SSEEvent(
+            type=SSEEventType.CONFLICT_COMPLETE,
+            data={
+                "project_id": project_id,
+                "stage_number": stage_number,
+                "partial": True,
+                "analyzed_agents": [o.agent_name for o in early.analyzed],
+                "agreements": len(report.agreements),
+                "disagreements": len(report.disagreements),
+                "synthesis": report.synthesis,
+                "conflict_report": report.model_dump(),
+            },
+        )
+
+    async def _run_agents(
+        self,
+        agents: list[AgentConfig],
+        shared_context: str,
+        project_id: str,
+        stage_number: int,
+        outputs: list[AgentOutput],
+        use_cache: bool = True,
+        stage_result_id: str | None = None,
+        on_output: Callable[[AgentOutput], None] | None = None,
+        stop: asyncio.Event | None = None,
+        owns_stage: Callable[[], bool] | None = None,
+    ) -> AsyncGenerator[SSEEvent, None]:
+        """Run agents concurrently and yield their events in arrival order.
+
+        Each agent pushes AGENT_QUEUED events while it waits for the
+        scheduler, AGENT_DELTA events while streaming and a final
+        AGENT_COMPLETE / AGENT_ERROR event onto a shared queue, so a fast
+        agent's result is delivered without waiting for slower ones. With
+        ``stage_result_id``, each output is checkpointed into that stage
+        result before its final event is sent.
+
+        Args:
+            agents: The agents to run.
+            shared_context: The assembled context shared by all agents.
+            project_id: The project this run belongs to.
+            stage_number: The stage being run.
+            outputs: Filled with each AgentOutput, in the order of ``agents``.
+            use_cache: Set to False to bypass the LLM response cache.
+            stage_result_id: The RUNNING stage result to checkpoint into.
+            on_output: Optional callback invoked with each output as soon
+                as its agent finishes (and is checkpointed).
+            stop: When set, agents still running are stopped; what they
+                streamed so far is kept as a "cancelled" output.
+            owns_stage: Checked before each checkpoint; outputs are not
+                written once it returns False.
+
+        Yields:
+            AGENT_QUEUED, AGENT_DELTA, AGENT_COMPLETE and AGENT_ERROR events.
+        """
+        events: asyncio.Queue[SSEEvent] = asyncio.Queue()
+
+        # The shared-context prompt cache entry only exists once a response
+        # has started, so the first agent goes alone and the rest are
+        # released on its first token (or when it finishes, if it fails).
+        prefix_cached = asyncio.Event()
+
+        def _delta_sink(agent: AgentConfig) -> Callable[[str], None]:
+            def _push(text: str) -> None:
+                prefix_cached.set()
+                events.put_nowait(SSEEvent(
+                    type=SSEEventType.AGENT_DELTA,
+                    agent_id=agent.id,
+                    agent_name=agent.name,
+                    data={"stage": stage_number, "text": text},
+                ))
+            return _push
+
+        lane = current_lane()
+
+        def _queued_sink(agent: AgentConfig) -> Callable[[int], None]:
+            def _push(position: int) -> None:
+                events.put_nowait(SSEEvent(
+                    type=SSEEventType.AGENT_QUEUED,
+                    agent_id=agent.id,
+                    agent_name=agent.name,
+                    data={"stage": stage_number, "position": position, "lane": lane},
+                ))
+            return _push
+
+        # Calls in progress, so ``stop`` can end them without ending the
+        # agent's task, which still records the partial output
+        calls: set[asyncio.Task] = set()
+
+        async def _run(agent: AgentConfig, primes_cache: bool) -> AgentOutput:
+            if not primes_cache:
+                await prefix_cached.wait()
+            if stop is not None and stop.is_set():
+                output = self._agent_output(
+                    agent, project_id, error=STRAGGLER_STOPPED, cancelled=True,
+                )
+            else:
+                call = asyncio.ensure_future(self._run_single_agent(
+                    agent, shared_context, project_id,
+                    on_delta=_delta_sink(agent), use_cache=use_cache,
+                    on_queued=_queued_sink(agent),
+                ))
+                calls.add(call)
+                try:
+                    output = await call
+                finally:
+                    calls.discard(call)
+                    prefix_cached.set()
+                if stop is not None and stop.is_set() and output.status == "cancelled":
+                    output.error = STRAGGLER_STOPPED
+            if stage_result_id and (owns_stage is None or owns_stage()):
+                await self._checkpoint(stage_result_id, output)
+            if on_output:
+                on_output(output)
+            events.put_nowait(self._agent_result_event(output))
+            return output
+
+        # Beyond that, pacing is left to the scheduler, which shares the
+        # account's capacity between projects, and the LLM client's rate
+        # limiter.
+        runs = [asyncio.ensure_future(_run(agent, i == 0)) for i, agent in enumerate(agents)]
+        gathered = asyncio.gather(*runs)
+        stopping = asyncio.ensure_future(stop.wait()) if stop is not None else None
+        try:
+            while not gathered.done() or not events.empty():
+                getter = asyncio.ensure_future(events.get())
+                waiters = {getter, gathered}
+                if stopping is not None:
+                    waiters.add(stopping)
+                await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+                if stopping is not None and stopping.done():
+                    stopping = None
+                    for call in calls:
+                        call.cancel()
+                if getter.done():
+                    yield getter.result()
+                else:
+                    getter.cancel()
+        finally:
+            if stopping is not None:
+                stopping.cancel()
+            # On cancellation, stop the agents and wait for them to record
+            # their partial outputs before unwinding. The gather itself ends
+            # as soon as one agent is cancelled, so wait on each of them.
+            if not gathered.done():
+                gathered.cancel()
+                await asyncio.wait(runs)
+                if not gathered.cancelled():
+                    gathered.exception()  # retrieved, so it isn't logged as unhandled
+        outputs.extend(gathered.result())
+
+    async def _checkpoint(self, stage_result_id: str, output: AgentOutput) -> None:
+        """Persist a finished agent's output and usage; a failed write only
+        costs resumability."""
+        try:
+            await self._db.save_agent_output(stage_result_id, output)
+            await self._record_agent_usage(output.project_id, output.stage, [output])
+        except Exception:
+            logger.exception("Could not checkpoint output of agent %s", output.agent_name)
+
+    @staticmethod
+    def _agent_result_event(output: AgentOutput) -> SSEEvent:
+        """Build the AGENT_COMPLETE or AGENT_ERROR event for a finished agent."""
+        if output.status in ("error", "cancelled"):
+            return SSEEvent(
+                type=SSEEventType.AGENT_ERROR,
+                agent_id=output.agent_id,
+                agent_name=output.agent_name,
+                data={
+                    "stage": output.stage,
+                    "output_id": output.id,
+                    "error": output.error or "Unknown error",
+                    "cancelled": output.status == "cancelled",
+                },
+            )
+        return SSEEvent(
+            type=SSEEventType.AGENT_COMPLETE,
+            agent_id=output.agent_id,
+            agent_name=output.agent_name,
+            data={
+                "stage": output.stage,
+                "output_id": output.id,
+                "content": output.content,
+                "content_length": len(output.content),
+                "claims": [c.model_dump() for c in output.claims],
+            },
+        )
+
     async def _run_single_agent(
         self,
         agent: AgentConfig,
-        user_message: str,
+        shared_context: str,
         project_id: str,
+        on_delta: Callable[[str], None] | None = None,
+        use_cache: bool = True,
+        on_queued: Callable[[int], None] | None = None,
     ) -> AgentOutput:
         """Run a single agent and return its output.
 
+        The system prompt is sent as two blocks: the shared context, marked
+        as a prompt-cache breakpoint so every agent in the stage reuses it,
+        followed by the agent's own instructions. The response is streamed;
+        each text chunk is passed to ``on_delta`` as it arrives and the
+        concatenated text becomes the output content. The call first waits
+        for its turn in the scheduler, if there is one.
+
         Args:
             agent: The agent configuration to run.
-            user_message: The assembled user message with question and context.
+            shared_context: The assembled research question and context.
             project_id: The project this run belongs to.
+            on_delta: Optional callback invoked with each streamed text chunk.
+            use_cache: Set to False to bypass the LLM response cache.
+            on_queued: Optional callback invoked with the agent's position
+                in the scheduler queue each time it changes.
 
         Returns:
-            AgentOutput with status "complete" on success or "error" on failure.
+            AgentOutput with status "complete" on success, "error" on
+            failure or "cancelled" (with the text streamed so far) when the
+            run is cancelled, with the token usage and timing of its LLM call.
         """
-        try:
-            content = await self._llm.complete(
-                system_prompt=agent.system_prompt,
-                user_message=user_message,
-                temperature=agent.temperature,
-                model=agent.model,
-            )
-            return AgentOutput(
-                agent_id=agent.id,
-                agent_name=agent.name,
-                stage=agent.stage,
-                project_id=project_id,
-                content=content,
-                status="complete",
-            )
-        except LLMError as exc:
-            logger.error("Agent %s failed: %s", agent.name, exc)
-            return AgentOutput(
-                agent_id=agent.id,
-                agent_name=agent.name,
-                stage=agent.stage,
-                project_id=project_id,
-                content="",
-                status="error",
-                error=str(exc),
-            )
-        except Exception as exc:
-            logger.exception("Unexpected error running agent %s", agent.name)
-            return AgentOutput(
-                agent_id=agent.id,
-                agent_name=agent.name,
-                stage=agent.stage,
-                project_id=project_id,
-                content="",
-                status="error",
-                error=f"Unexpected error: {exc}",
-            )
+        with track_usage("agent") as calls:
+            try:
+                chunks: list[str] = []
+                async with self._agent_slot(project_id, on_queued):
+                    async for chunk in self._llm.complete_stream(
+                        system_prompt=self._agent_system_prompt(agent, shared_context),
+                        user_message=TASK_INSTRUCTIONS,
+                        temperature=agent.temperature,
+                        max_tokens=agent.max_tokens,
+                        model=agent.model,
+                        cache=use_cache,
+                    ):
+                        chunks.append(chunk)
+                        if on_delta:
+                            on_delta(chunk)
+                output = self._agent_output(agent, project_id, content="".join(chunks))
+            except LLMError as exc:
+                logger.error("Agent %s failed: %s", agent.name, exc)
+                output = self._agent_output(agent, project_id, error=str(exc))
+            except Exception as exc:
+                logger.exception("Unexpected error running agent %s", agent.name)
+                output = self._agent_output(agent, project_id, error=f"Unexpected error: {exc}")
+            except asyncio.CancelledError:
+                # Return the partial output so it can be checkpointed; the
+                # stage's own cancellation still propagates through run_stage.
+                asyncio.current_task().uncancel()
+                output = self._agent_output(
+                    agent, project_id, content="".join(chunks), error="Cancelled", cancelled=True,
+                )
+        output.usage = combine_usage(calls)
+        return output
 
-    def _build_prior_context(self, project: Project, current_stage: int) -> str:
-        """Build context from previously approved stage results.
+    def _agent_slot(
+        self, project_id: str, on_queued: Callable[[int], None] | None,
+    ) -> contextlib.AbstractAsyncContextManager:
+        if self._scheduler is None:
+            return contextlib.nullcontext()
+        return self._scheduler.slot(project_id, on_position=on_queued)
 
-        For each approved stage, uses the human_override text if present,
-        otherwise concatenates the agent outputs.
+    @staticmethod
+    def _agent_system_prompt(agent: AgentConfig, shared_context: str) -> list[dict]:
+        """The shared context as a prompt-cache prefix, then the agent's own instructions."""
+        return [
+            cacheable(shared_context),
+            {"type": "text", "text": agent.system_prompt},
+        ]
+
+    @staticmethod
+    def _agent_output(
+        agent: AgentConfig,
+        project_id: str,
+        content: str = "",
+        error: str | None = None,
+        cancelled: bool = False,
+    ) -> AgentOutput:
+        """Build a complete AgentOutput, or an errored (or cancelled) one when ``error`` is set."""
+        status = "complete"
+        if error:
+            status = "cancelled" if cancelled else "error"
+        return AgentOutput(
+            agent_id=agent.id,
+            agent_name=agent.name,
+            stage=agent.stage,
+            project_id=project_id,
+            content=content,
+            status=status,
+            error=error,
+        )
+
+    @staticmethod
+    def _prior_stage_sections(project: Project, current_stage: int) -> list[ContextSection]:
+        """Build one context section per previously approved stage.
+
+        Each section is the stage's digest when it is up to date. Otherwise
+        it is the human_override text if present, or the agent outputs,
+        followed by the conflict synthesis. The synthesis alone is the
+        fallback when the context budget is tight. Later stages get higher
+        priority, since they build on the earlier ones.
 
         Args:
             project: The project containing stage results.
             current_stage: The stage about to run (prior stages are < this).
 
         Returns:
-            Formatted string of prior stage context, or empty string if none.
+            Sections in stage order; empty if no stage has been approved.
         """
-        parts: list[str] = []
-
         approved_results = sorted(
             [
                 sr
@@ -260,76 +1020,117 @@ class StageOrchestrator:
             key=lambda sr: sr.stage_number,
         )
 
+        sections: list[ContextSection] = []
         for sr in approved_results:
-            parts.append(f"## Stage {sr.stage_number} (Approved)")
+            synthesis = ""
+            if sr.conflict_report and sr.conflict_report.synthesis:
+                synthesis = f"\n**Synthesis:** {sr.conflict_report.synthesis}"
+            fallback = (
+                f"## Stage {sr.stage_number} (Approved, summarised)\n{synthesis}\n"
+                if synthesis else ""
+            )
 
-            if sr.human_override:
-                parts.append(sr.human_override)
+            if has_fresh_digest(sr):
+                text = sr.digest
             else:
-                for output in sr.agent_outputs:
-                    if output.status == "complete" and output.content:
-                        parts.append(f"### {output.agent_name}")
-                        parts.append(output.content)
+                parts: list[str] = [f"## Stage {sr.stage_number} (Approved)"]
+                if sr.human_override:
+                    parts.append(sr.human_override)
+                else:
+                    for output in sr.agent_outputs:
+                        if output.status == "complete" and output.content:
+                            parts.append(f"### {output.agent_name}")
+                            parts.append(output.content)
+                if synthesis:
+                    parts.append(synthesis)
+                parts.append("")  # blank line separator
+                text = "\n".join(parts)
 
-            if sr.conflict_report and sr.conflict_report.synthesis:
-                parts.append(f"\n**Synthesis:** {sr.conflict_report.synthesis}")
-
-            parts.append("")  # blank line separator
+            sections.append(ContextSection(
+                key=f"stage_{sr.stage_number}",
+                text=text,
+                priority=10 + current_stage - sr.stage_number,
+                fallback=fallback,
+            ))
 
-        return "\n".join(parts)
+        return sections
 
     @staticmethod
-    def _build_user_message(project: Project, prior_context: str, documents_text: str = "") -> str:
-        """Assemble the full user message sent to each agent.
+    def _build_shared_context(
+        project: Project,
+        prior_sections: list[ContextSection],
+        documents_text: str,
+        budget: int,
+    ) -> tuple[str, dict]:
+        """Assemble the research context shared by every agent in a stage.
 
-        Combines the research question, structured context components, and
-        the accumulated context from prior approved stages.
+        Combines the research question, structured context components, the
+        accumulated context from prior approved stages, and uploaded
+        documents. The agent-specific instructions and TASK_INSTRUCTIONS
+        follow it, so this text is an identical prefix for every agent.
 
         The structured context ensures every agent receives consistent framing
         about what is being researched, why, and for whom — preventing generic
         or context-free analysis.
-        """
-        sections: list[str] = []
-
-        sections.append("# Research Question")
-        sections.append(project.research_question)
 
+        Everything is packed into ``budget`` tokens in priority order:
+        research question, structured context, prior stages (latest first),
+        then documents. Returns the text and the packing report.
+        """
+        candidates = [
+            ContextSection(
+                key="research_question",
+                text=f"# Research Question\n{project.research_question}",
+                priority=0,
+                trimmable=False,
+            ),
+            *prior_sections,
+        ]
         if project.context:
-            sections.append("\n# Structured Context")
-            sections.append(
-                "Use the following context to ground ALL of your analysis. "
-                "Every claim, theme, and recommendation you produce must be "
-                "specific to this context — not generic advice that could apply "
-                "to any organization.\n"
-            )
-            sections.append(project.context)
-            sections.append(
-                "\n**Grounding Rule:** Before finalizing any insight, check: "
-                "'Would this insight change if the company, product, or audience were different?' "
-                "If the answer is no, make it more specific to the context above."
-            )
+            candidates.append(ContextSection(
+                key="context",
+                text="\n".join([
+                    "\n# Structured Context",
+                    "Use the following context to ground ALL of your analysis. "
+                    "Every claim, theme, and recommendation you produce must be "
+                    "specific to this context — not generic advice that could apply "
+                    "to any organization.\n",
+                    project.context,
+                    "\n**Grounding Rule:** Before finalizing any insight, check: "
+                    "'Would this insight change if the company, product, or audience were different?' "
+                    "If the answer is no, make it more specific to the context above.",
+                ]),
+                priority=1,
+            ))
+        if documents_text:
+            candidates.append(ContextSection(
+                key="documents",
+                text="\n".join([
+                    "\n# Uploaded Documents",
+                    "The researcher has uploaded the following documents as evidence. "
+                    "Reference and cite these materials in your analysis where relevant.\n",
+                    documents_text,
+                ]),
+                priority=100,
+            ))
+
+        packed = pack_sections(candidates, budget)
+        sections: list[str] = [packed.texts["research_question"]]
+        if "context" in packed.texts:
+            sections.append(packed.texts["context"])
 
-        if prior_context:
+        prior = [packed.texts[s.key] for s in prior_sections if s.key in packed.texts]
+        if prior:
             sections.append("\n# Prior Stage Results")
-            sections.append(prior_context)
+            sections.append("\n".join(prior))
 
-        if documents_text:
-            sections.append("\n# Uploaded Documents")
-            sections.append(
-                "The researcher has uploaded the following documents as evidence. "
-                "Reference and cite these materials in your analysis where relevant.\n"
-            )
-            sections.append(documents_text)
-
-        sections.append(
-            "\n# Your Task"
-            "\nProvide your analysis based on your assigned role and perspective. "
-            "Be thorough, cite evidence where possible, and clearly state your "
-            "confidence level in key claims."
-            "\n\n**Quality Gates:**"
-            "\n- Every claim must be traceable to specific evidence. Mark unsourced claims."
-            "\n- Every insight must be specific to this project's context. Flag generic observations."
-            "\n- Every recommendation must state what decision it enables. Omit decision-inert findings."
-        )
+        if "documents" in packed.texts:
+            sections.append(packed.texts["documents"])
 
-        return "\n".join(sections)
+        report = packed.report()
+        if any(decision != "full" for decision in report["sections"].values()):
+            logger.info(
+                "Packed context for project %s into %d/%d tokens: %s",
+                project.id, report["estimated_tokens"], report["budget_tokens"], report["sections"],
+            )
+        return "\n".join(sections), report
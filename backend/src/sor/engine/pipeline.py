@@ -0,0 +1,428 @@
+"""Unattended runs of a project's stages, one after the other.
+
+A pipeline runs each stage as an ordinary stage job, so the stage pages
+follow it as usual, then decides by itself whether to approve the stage
+according to an ``ApprovalPolicy``. A stage the policy won't approve
+pauses the pipeline; once a human has approved it, starting the pipeline
+again picks up at the first unapproved stage.
+
+Every event of every stage job is forwarded to the pipeline's own feed,
+between the pipeline's events, so one subscription follows the whole run.
+
+While a stage's conflict detection runs, the next stage's inputs (its
+agents, the uploaded documents) are loaded in the background. Once its
+conflict report exists, the stage's digest starts building while the policy
+decides on it; approval reuses that build, and the next stage starts once
+the digest is ready, so it gets the digest rather than the full stage text.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING
+
+from ..models import (
+    AgentConfig,
+    ApprovalMode,
+    ApprovalPolicy,
+    JobStatus,
+    PipelineRun,
+    PipelineStatus,
+    Project,
+    SSEEvent,
+    SSEEventType,
+    StageResult,
+    StageStatus,
+)
+from ..store.database import Database
+from .broadcast import BroadcastHub, Channel
+from .jobs import JOB_RETENTION_SECONDS, JobManager
+from .orchestrator import StageOrchestrator, StagePrefetch
+from .scheduler import Lane
+
+if TYPE_CHECKING:
+    from .admission import Reservation
+
+logger = logging.getLogger(__name__)
+
+LAST_STAGE = 6
+# Hub slot of a project's pipeline feed (stages use 1-6)
+PIPELINE_FEED = 0
+
+
+def first_unapproved_stage(project: Project, end_stage: int = LAST_STAGE) -> int | None:
+    """The stage a pipeline over ``project`` starts at, or None if all are approved."""
+    approved = {
+        sr.stage_number for sr in project.stage_results if sr.status == StageStatus.APPROVED
+    }
+    for stage_number in range(1, end_stage + 1):
+        if stage_number not in approved:
+            return stage_number
+    return None
+
+
+def approval_blockers(
+    policy: ApprovalPolicy,
+    stage_result: StageResult,
+    agents: list[AgentConfig],
+) -> list[str]:
+    """Why ``policy`` leaves a finished stage for a human to approve.
+
+    Returns an empty list when the stage can be approved automatically.
+    """
+    if policy.mode == ApprovalMode.MANUAL:
+        return ["The approval policy is manual"]
+
+    completed = {o.agent_id for o in stage_result.agent_outputs if o.status == "complete"}
+    if not completed:
+        return ["No agent produced an output"]
+    if policy.mode == ApprovalMode.ALWAYS:
+        return []
+
+    blockers = []
+    missing = {a.id for a in agents if a.enabled} - completed
+    if policy.require_all_agents and missing:
+        blockers.append(f"{len(missing)} agent(s) have no complete output")
+
+    report = stage_result.conflict_report
+    if len(completed) > 1 and not (report and (report.agreements or report.disagreements)):
+        blockers.append("Conflict detection produced no comparison of the outputs")
+    elif report:
+        confident = [
+            d.topic for d in report.disagreements
+            if sum(p.confidence >= policy.confidence_threshold for p in d.positions) >= 2
+        ]
+        if len(confident) > policy.max_confident_disagreements:
+            blockers.append(
+                f"{len(confident)} disagreement(s) held with confidence >= "
+                f"{policy.confidence_threshold:g}: {', '.join(confident)}"
+            )
+    return blockers
+
+
+class _RunningPipeline:
+    """A pipeline held in memory: its feed channel and the task driving it."""
+
+    def __init__(self, run: PipelineRun, channel: Channel) -> None:
+        self.run = run
+        self.channel = channel
+        self.task: asyncio.Task | None = None
+        self.cancel_requested = False
+
+    def push(self, event_type: SSEEventType, **data: object) -> None:
+        self.channel.publish(SSEEvent(
+            type=event_type,
+            data={"project_id": self.run.project_id, "pipeline_id": self.run.id, **data},
+        ))
+
+    def finish(self, status: PipelineStatus, error: str | None = None) -> None:
+        self.run.status = status
+        self.run.error = error
+        self.run.finished_at = datetime.now(timezone.utc).isoformat()
+
+
+class PipelineRunner:
+    """Starts pipelines and serves their combined feeds.
+
+    A project has at most one pipeline running at a time.
+    """
+
+    def __init__(
+        self,
+        orchestrator: StageOrchestrator,
+        jobs: JobManager,
+        db: Database,
+        hub: BroadcastHub,
+        retention_seconds: float = JOB_RETENTION_SECONDS,
+    ) -> None:
+        self._orchestrator = orchestrator
+        self._jobs = jobs
+        self._db = db
+        self._hub = hub
+        self._retention_seconds = retention_seconds
+        self._runs: dict[str, _RunningPipeline] = {}
+
+    async def start(
+        self,
+        project: Project,
+        start_stage: int,
+        policy: ApprovalPolicy | None = None,
+        end_stage: int = LAST_STAGE,
+        use_cache: bool = True,
+        reservation: Reservation | None = None,
+    ) -> PipelineRun:
+        """Run stages ``start_stage`` to ``end_stage`` in the background.
+
+        The job of the first stage takes over the admission ``reservation``.
+        Returns the new pipeline, or the one already running the project.
+        """
+        active = self.active(project.id)
+        if active is not None:
+            if reservation is not None:
+                reservation.release()
+            return active
+        run = PipelineRun(
+            project_id=project.id,
+            policy=policy or ApprovalPolicy(),
+            start_stage=start_stage,
+            end_stage=end_stage,
+            current_stage=start_stage,
+        )
+        running = _RunningPipeline(run, self._hub.open(project.id, PIPELINE_FEED, run.id))
+        self._runs[run.id] = running
+        try:
+            await self._db.save_pipeline_run(run)
+        except BaseException:
+            self._hub.close(running.channel)
+            del self._runs[run.id]
+            if reservation is not None:
+                reservation.release()
+            raise
+        running.task = asyncio.create_task(self._run(running, use_cache, reservation))
+        return run
+
+    def active(self, project_id: str) -> PipelineRun | None:
+        """The pipeline currently running the project, if any."""
+        channel = self._hub.active(project_id, PIPELINE_FEED)
+        return self._runs[channel.job_id].run if channel is not None else None
+
+    async def get(self, run_id: str) -> PipelineRun | None:
+        running = self._runs.get(run_id)
+        if running is not None:
+            return running.run
+        return await self._db.get_pipeline_run(run_id)
+
+    async def latest(self, project_id: str) -> PipelineRun | None:
+        run = await self._db.get_latest_pipeline_run(project_id)
+        if run is None:
+            return None
+        return await self.get(run.id)
+
+    async def events(
+        self, run_id: str, after: int = 0,
+    ) -> AsyncIterator[tuple[int, SSEEvent] | None]:
+        """Yield a pipeline's feed after sequence number ``after``.
+
+        The feed is kept in memory only; the stage jobs' own logs remain
+        available once it has been evicted.
+        """
+        running = self._runs.get(run_id)
+        if running is None:
+            return
+        async for item in running.channel.subscribe(after, self._hub.heartbeat):
+            yield item
+
+    async def cancel(self, run_id: str) -> PipelineRun | None:
+        """Stop a pipeline and the stage it is running.
+
+        Returns the pipeline, or None if it isn't running in this process.
+        """
+        running = self._runs.get(run_id)
+        if running is None or running.task is None or running.task.done():
+            return None
+        running.cancel_requested = True
+        job = self._jobs.active(running.run.project_id, running.run.current_stage)
+        if job is not None:
+            # The pipeline then ends by itself, once it has forwarded the
+            # stage's last events
+            await self._jobs.cancel(job.id)
+        else:
+            running.task.cancel()
+        await asyncio.wait({running.task})
+        return running.run
+
+    async def shutdown(self) -> None:
+        """Stop running pipelines; they stay RUNNING so ``recover`` restarts them."""
+        tasks = [r.task for r in self._runs.values() if r.task is not None and not r.task.done()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def mark_interrupted(self) -> list[PipelineRun]:
+        """Fail pipelines left running by a previous process and return them."""
+        interrupted = []
+        for run in await self._db.list_pipeline_runs(status=PipelineStatus.RUNNING):
+            if run.id in self._runs:
+                continue
+            run.status = PipelineStatus.FAILED
+            run.error = "Interrupted by a server restart"
+            run.finished_at = datetime.now(timezone.utc).isoformat()
+            await self._db.save_pipeline_run(run)
+            interrupted.append(run)
+        return interrupted
+
+    async def recover(self) -> list[PipelineRun]:
+        """Restart the pipelines a previous process left running.
+
+        Call after ``JobManager.recover``: a restarted pipeline joins the
+        resumed job of the stage it was on.
+        """
+        started = []
+        for run in await self.mark_interrupted():
+            project = await self._db.get_project(run.project_id)
+            start_stage = first_unapproved_stage(project, run.end_stage) if project else None
+            if start_stage is None:
+                continue
+            logger.info("Restarting pipeline of project %s at stage %d", project.id, start_stage)
+            started.append(await self.start(
+                project, start_stage, policy=run.policy, end_stage=run.end_stage,
+            ))
+        return started
+
+    async def _run(
+        self, running: _RunningPipeline, use_cache: bool, reservation: Reservation | None = None,
+    ) -> None:
+        run = running.run
+        running.push(
+            SSEEventType.PIPELINE_START,
+            start_stage=run.start_stage,
+            end_stage=run.end_stage,
+            policy=run.policy.model_dump(),
+        )
+        next_prefetch: asyncio.Task[StagePrefetch] | None = None
+        digest: asyncio.Task[str | None] | None = None
+        try:
+            for stage_number in range(run.start_stage, run.end_stage + 1):
+                if digest is not None:
+                    # Shielded: a cancelled pipeline leaves the digest to finish
+                    await asyncio.shield(digest)
+                project = await self._db.get_project(run.project_id)
+                if project is None:
+                    raise RuntimeError("Project was deleted")
+                run.current_stage = stage_number
+                if next_prefetch is not None:
+                    prefetched = await next_prefetch
+                else:
+                    prefetched = await self._orchestrator.prefetch(project, stage_number)
+
+                stage_result, next_prefetch = await self._run_stage(
+                    running, project, stage_number, prefetched, use_cache, reservation,
+                )
+                # Only the first stage's run was admitted
+                reservation = None
+                if stage_result is None:
+                    return
+
+                # Built while the policy decides; approving reuses this build
+                digest = self._orchestrator.compact_in_background(stage_result)
+                blockers = approval_blockers(run.policy, stage_result, prefetched.agents)
+                if blockers:
+                    run.blockers = blockers
+                    running.push(
+                        SSEEventType.PIPELINE_PAUSED, stage_number=stage_number, blockers=blockers,
+                    )
+                    running.finish(PipelineStatus.AWAITING_APPROVAL)
+                    return
+                next_stage = await self._orchestrator.approve_stage(run.project_id, stage_number)
+                run.auto_approved.append(stage_number)
+                running.push(
+                    SSEEventType.STAGE_APPROVED, stage_number=stage_number, next_stage=next_stage,
+                )
+                await self._db.save_pipeline_run(run)
+
+            running.push(SSEEventType.PIPELINE_COMPLETE, auto_approved=run.auto_approved)
+            running.finish(PipelineStatus.COMPLETE)
+        except asyncio.CancelledError:
+            if not running.cancel_requested:
+                # Server shutdown: left RUNNING, restarted at startup
+                raise
+            asyncio.current_task().uncancel()
+            if run.status == PipelineStatus.RUNNING:
+                running.push(SSEEventType.PIPELINE_CANCELLED, stage_number=run.current_stage)
+                running.finish(PipelineStatus.CANCELLED, "Cancelled")
+        except Exception as exc:
+            logger.exception("Pipeline %s for project %s failed", run.id, run.project_id)
+            running.push(SSEEventType.PIPELINE_ERROR, stage_number=run.current_stage, error=str(exc))
+            running.finish(PipelineStatus.FAILED, f"Pipeline failed: {exc}")
+        finally:
+            if next_prefetch is not None and not next_prefetch.done():
+                next_prefetch.cancel()
+            if reservation is not None:
+                reservation.release()
+            await asyncio.shield(self._finalize(running))
+
+    async def _run_stage(
+        self,
+        running: _RunningPipeline,
+        project: Project,
+        stage_number: int,
+        prefetched: StagePrefetch,
+        use_cache: bool,
+        reservation: Reservation | None = None,
+    ) -> tuple[StageResult | None, asyncio.Task[StagePrefetch] | None]:
+        """Run one stage, forwarding its events to the pipeline's feed.
+
+        Returns the finished stage result (None if the run failed or was
+        cancelled, which ends the pipeline) and the task prefetching the
+        next stage's inputs, started once conflict detection begins.
+        """
+        run = running.run
+        next_prefetch = None
+
+        def _prefetch_next() -> asyncio.Task[StagePrefetch] | None:
+            if stage_number >= run.end_stage:
+                return None
+            return asyncio.create_task(self._orchestrator.prefetch(project, stage_number + 1))
+
+        stage_result = await self._db.get_stage_result(project.id, stage_number)
+        if stage_result and stage_result.status == StageStatus.COMPLETE:
+            # Finished earlier but not approved: only the decision is left
+            if reservation is not None:
+                reservation.release()
+            running.push(SSEEventType.PIPELINE_STAGE, stage_number=stage_number, job_id=None)
+            return stage_result, _prefetch_next()
+
+        # An interrupted or cancelled run is finished rather than redone
+        checkpoint = stage_result if stage_result and stage_result.status in (
+            StageStatus.RUNNING, StageStatus.CANCELLED,
+        ) else None
+        await self._db.update_project(project.id, state="in_progress", current_stage=stage_number)
+        job = await self._jobs.start(
+            project, stage_number, prefetched.agents,
+            use_cache=use_cache, checkpoint=checkpoint, prefetched=prefetched,
+            lane=Lane.BATCH, reservation=reservation,
+        )
+        run.stage_jobs[stage_number] = job.id
+        await self._db.save_pipeline_run(run)
+        running.push(SSEEventType.PIPELINE_STAGE, stage_number=stage_number, job_id=job.id)
+
+        async for item in self._jobs.events(job.id):
+            if item is None:
+                continue
+            event = item[1]
+            running.channel.publish(event)
+            if event.type == SSEEventType.CONFLICT_START and next_prefetch is None:
+                next_prefetch = _prefetch_next()
+
+        job = await self._jobs.get(job.id)
+        stage_result = await self._db.get_stage_result(project.id, stage_number)
+        if job.status == JobStatus.COMPLETE and stage_result and stage_result.status == StageStatus.COMPLETE:
+            return stage_result, next_prefetch
+
+        if next_prefetch is not None:
+            next_prefetch.cancel()
+        if job.status == JobStatus.COMPLETE:
+            # run_stage finishes without a result when no agent is enabled
+            running.push(SSEEventType.PIPELINE_ERROR, stage_number=stage_number, error="No result")
+            running.finish(PipelineStatus.FAILED, f"Stage {stage_number} has no enabled agents")
+        elif job.status == JobStatus.CANCELLED:
+            running.push(SSEEventType.PIPELINE_CANCELLED, stage_number=stage_number)
+            running.finish(PipelineStatus.CANCELLED, f"Stage {stage_number} was cancelled")
+        else:
+            running.push(SSEEventType.PIPELINE_ERROR, stage_number=stage_number, error=job.error)
+            running.finish(PipelineStatus.FAILED, f"Stage {stage_number} failed: {job.error}")
+        return None, None
+
+    async def _finalize(self, running: _RunningPipeline) -> None:
+        run = running.run
+        self._hub.close(running.channel)
+        try:
+            await self._db.save_pipeline_run(run)
+        except Exception:
+            logger.exception("Could not persist the end of pipeline %s", run.id)
+        asyncio.get_running_loop().call_later(
+            self._retention_seconds, self._runs.pop, run.id, None,
+        )
@@ -0,0 +1,105 @@
+"""LLM provider backends.
+
+A provider decides where LLMClient's Messages API traffic goes: the real
+Anthropic API, or the bundled fake server (see ``fake_server``) for
+offline load tests and CI. LLMClient itself is unchanged either way.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING
+
+import httpx
+
+from .connection_pool import PoolConfig
+
+if TYPE_CHECKING:
+    from ..config import Settings
+    from .fake_server import FakeServerConfig
+
+ANTHROPIC_VERSION = "2023-06-01"
+
+
+class LLMProvider(ABC):
+    """Creates the HTTP client LLMClient uses to reach a Messages API."""
+
+    name: str = ""
+
+    @abstractmethod
+    def create_client(self, timeout: httpx.Timeout, pool: PoolConfig | None = None) -> httpx.AsyncClient:
+        """Return a new client whose base URL serves ``/v1/messages``."""
+
+
+class AnthropicProvider(LLMProvider):
+    """The Anthropic API (or any compatible endpoint at ``base_url``)."""
+
+    name = "anthropic"
+
+    def __init__(self, api_key: str, base_url: str = "https://api.anthropic.com"):
+        self._api_key = api_key
+        self._base_url = base_url
+
+    def create_client(self, timeout: httpx.Timeout, pool: PoolConfig | None = None) -> httpx.AsyncClient:
+        pool = pool or PoolConfig()
+        return httpx.AsyncClient(
+            base_url=self._base_url,
+            headers={
+                "x-api-key": self._api_key,
+                "anthropic-version": ANTHROPIC_VERSION,
+                "content-type": "application/json",
+            },
+            timeout=timeout,
+            limits=pool.limits,
+            http2=pool.use_http2,
+        )
+
+
+class FakeProvider(LLMProvider):
+    """The bundled fake Messages API server.
+
+    With a ``url`` the provider talks HTTP to a standalone fake server
+    (``python -m sor.engine.fake_server``), which preserves real streaming
+    timing for benchmarks. Without one, the fake app is mounted in-process
+    through an ASGI transport; responses then arrive whole, which is fine
+    for functional tests.
+    """
+
+    name = "fake"
+
+    def __init__(self, url: str = "", config: FakeServerConfig | None = None):
+        self._url = url
+        self._config = config
+
+    def create_client(self, timeout: httpx.Timeout, pool: PoolConfig | None = None) -> httpx.AsyncClient:
+        headers = {"anthropic-version": ANTHROPIC_VERSION, "content-type": "application/json"}
+        if self._url:
+            pool = pool or PoolConfig()
+            return httpx.AsyncClient(
+                base_url=self._url,
+                headers=headers,
+                timeout=timeout,
+                limits=pool.limits,
+                http2=pool.use_http2,
+            )
+
+        from .fake_server import FakeServerConfig, create_fake_app
+
+        app = create_fake_app(self._config or FakeServerConfig())
+        return httpx.AsyncClient(
+            base_url="http://fake-anthropic",
+            headers=headers,
+            timeout=timeout,
+            transport=httpx.ASGITransport(app=app),
+        )
+
+
+def provider_from_settings(settings: Settings) -> LLMProvider:
+    """Build the provider selected by ``settings.llm_provider``."""
+    if settings.llm_provider == "fake":
+        from .fake_server import FakeServerConfig
+
+        return FakeProvider(url=settings.fake_llm_url, config=FakeServerConfig.from_settings(settings))
+    if settings.llm_provider == "anthropic":
+        return AnthropicProvider(settings.anthropic_api_key, settings.anthropic_base_url)
+    raise ValueError(f"Unknown LLM provider: {settings.llm_provider!r}")
@@ -0,0 +1,203 @@
+"""Adaptive rate limiter shared by every caller of the LLM client.
+
+Paces requests with token buckets for requests, input tokens and output
+tokens per minute. The bucket limits are corrected from the
+``anthropic-ratelimit-*`` response headers, and the number of concurrent
+requests follows an AIMD policy: it starts at the configured maximum,
+halves on 429 (rate limited) or 529 (overloaded) responses and grows
+slowly back on success.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from collections.abc import AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+
+THROTTLE_STATUSES = (429, 529)
+
+# Header prefix -> bucket name
+_HEADER_BUCKETS = {
+    "anthropic-ratelimit-requests": "requests",
+    "anthropic-ratelimit-input-tokens": "input_tokens",
+    "anthropic-ratelimit-output-tokens": "output_tokens",
+}
+
+
+class _TokenBucket:
+    """Continuously refilling bucket holding up to one minute of capacity."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.tokens = float(per_minute)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.capacity / 60.0)
+        self._updated = now
+
+    def delay_for(self, amount: float) -> float:
+        """Seconds until ``amount`` can be taken (0 if it can be taken now).
+
+        Requests larger than the whole bucket only wait for a full bucket and
+        then drive it negative, so they are slowed down but never starved.
+        """
+        self._refill()
+        needed = min(amount, self.capacity)
+        if self.tokens >= needed:
+            return 0.0
+        return (needed - self.tokens) * 60.0 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def give(self, amount: float) -> None:
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+    def sync(self, limit: float | None, remaining: float | None) -> None:
+        """Adopt the limit and remaining capacity reported by the server."""
+        self._refill()
+        if limit and limit > 0:
+            self.capacity = float(limit)
+            self.tokens = min(self.tokens, self.capacity)
+        if remaining is not None:
+            self.tokens = min(self.tokens, float(remaining))
+
+
+@dataclass
+class Reservation:
+    """Capacity held by one in-flight request.
+
+    Set ``output_tokens_used`` once the response usage is known so unused
+    output-token capacity is returned to the bucket on release.
+    """
+
+    input_tokens: int
+    output_tokens: int
+    output_tokens_used: int | None = None
+
+
+class RateLimiter:
+    """Process-wide limiter for Anthropic API calls.
+
+    Args:
+        requests_per_minute: Initial requests-per-minute budget.
+        input_tokens_per_minute: Initial input-tokens-per-minute budget.
+        output_tokens_per_minute: Initial output-tokens-per-minute budget.
+        max_concurrency: Simultaneous in-flight requests allowed at first and
+            at most; lowered while the API pushes back.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 1000,
+        input_tokens_per_minute: int = 450_000,
+        output_tokens_per_minute: int = 90_000,
+        max_concurrency: int = 8,
+    ):
+        self._buckets = {
+            "requests": _TokenBucket(requests_per_minute),
+            "input_tokens": _TokenBucket(input_tokens_per_minute),
+            "output_tokens": _TokenBucket(output_tokens_per_minute),
+        }
+        self._max_concurrency = max(1, max_concurrency)
+        self._concurrency = float(self._max_concurrency)
+        self._in_flight = 0
+        self._throttled = 0
+        self._cond = asyncio.Condition()
+
+    @property
+    def concurrency_limit(self) -> int:
+        """The number of requests currently allowed in flight."""
+        return int(self._concurrency)
+
+    @asynccontextmanager
+    async def reserve(self, input_tokens: int, output_tokens: int) -> AsyncIterator[Reservation]:
+        """Wait for capacity, hold it for the duration of the block, then release it."""
+        reservation = await self._acquire(input_tokens, output_tokens)
+        try:
+            yield reservation
+        finally:
+            await self._release(reservation)
+
+    def observe(self, status_code: int, headers: Mapping[str, str]) -> None:
+        """Feed a response's status and rate-limit headers back into the limiter."""
+        for prefix, name in _HEADER_BUCKETS.items():
+            limit = _parse_number(headers.get(f"{prefix}-limit"))
+            remaining = _parse_number(headers.get(f"{prefix}-remaining"))
+            if limit is not None or remaining is not None:
+                self._buckets[name].sync(limit, remaining)
+
+        if status_code in THROTTLE_STATUSES:
+            # Multiplicative decrease
+            self._throttled += 1
+            self._concurrency = max(1.0, self._concurrency / 2)
+        elif status_code < 400:
+            # Additive increase: roughly +1 slot per full window of successes
+            self._concurrency = min(
+                float(self._max_concurrency), self._concurrency + 1.0 / self._concurrency,
+            )
+
+    def stats(self) -> dict:
+        """Return a snapshot of the limiter state."""
+        for bucket in self._buckets.values():
+            bucket._refill()
+        return {
+            "in_flight": self._in_flight,
+            "concurrency_limit": self.concurrency_limit,
+            "max_concurrency": self._max_concurrency,
+            "throttled_responses": self._throttled,
+            "buckets": {
+                name: {"limit": round(b.capacity), "available": round(b.tokens)}
+                for name, b in self._buckets.items()
+            },
+        }
+
+    async def _acquire(self, input_tokens: int, output_tokens: int) -> Reservation:
+        async with self._cond:
+            while True:
+                delay = max(
+                    self._buckets["requests"].delay_for(1),
+                    self._buckets["input_tokens"].delay_for(input_tokens),
+                    self._buckets["output_tokens"].delay_for(output_tokens),
+                )
+                if delay <= 0 and self._in_flight < int(self._concurrency):
+                    break
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=delay if delay > 0 else None)
+                except TimeoutError:
+                    pass
+
+            self._buckets["requests"].take(1)
+            self._buckets["input_tokens"].take(input_tokens)
+            self._buckets["output_tokens"].take(output_tokens)
+            self._in_flight += 1
+            return Reservation(input_tokens=input_tokens, output_tokens=output_tokens)
+
+    async def _release(self, reservation: Reservation) -> None:
+        # The capacity is returned before any await, so a request cancelled
+        # mid-release (e.g. a cancelled stage) still frees its slot, and the
+        # wake-up of waiting requests is shielded from that cancellation.
+        self._in_flight -= 1
+        used = reservation.output_tokens_used
+        if used is not None and used < reservation.output_tokens:
+            self._buckets["output_tokens"].give(reservation.output_tokens - used)
+        await asyncio.shield(self._notify())
+
+    async def _notify(self) -> None:
+        async with self._cond:
+            self._cond.notify_all()
+
+
+def _parse_number(value: str | None) -> float | None:
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
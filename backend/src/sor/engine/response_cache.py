@@ -0,0 +1,95 @@
+"""Two-tier cache for LLM responses.
+
+A bounded in-process LRU sits in front of the ``llm_cache`` table in the
+SQLite database, so identical requests (same model, prompts, temperature
+and max_tokens) are served without re-billing, across restarts too.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+
+from ..store.database import Database
+
+# Request fields that determine the response; anything else is transport detail.
+KEY_FIELDS = ("model", "system", "messages", "temperature", "max_tokens")
+# Also part of the key, but only when present, so plain-text keys stay stable.
+OPTIONAL_KEY_FIELDS = ("tools", "tool_choice")
+
+
+class ResponseCache:
+    """LRU + SQLite cache for completed LLM responses.
+
+    Args:
+        db: Database holding the persistent ``llm_cache`` table.
+        ttl_seconds: How long an entry stays valid in either tier.
+        memory_entries: Maximum entries held in the in-process LRU.
+        max_rows: Maximum rows kept in the persistent table.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        ttl_seconds: int = 7 * 24 * 3600,
+        memory_entries: int = 256,
+        max_rows: int = 5000,
+    ):
+        self._db = db
+        self._ttl = ttl_seconds
+        self._memory_entries = memory_entries
+        self._max_rows = max_rows
+        self._memory: OrderedDict[str, tuple[float, str]] = OrderedDict()
+        self._counters = {"memory_hits": 0, "db_hits": 0, "misses": 0, "writes": 0}
+
+    @staticmethod
+    def key(payload: dict) -> str:
+        """Hash the response-determining fields of a Messages API payload."""
+        material = {field: payload.get(field) for field in KEY_FIELDS}
+        material.update({field: payload[field] for field in OPTIONAL_KEY_FIELDS if field in payload})
+        encoded = json.dumps(material, sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+    async def get(self, key: str) -> str | None:
+        """Look a response up in memory, then in SQLite."""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires_at, response = entry
+            if expires_at > time.monotonic():
+                self._memory.move_to_end(key)
+                self._counters["memory_hits"] += 1
+                return response
+            del self._memory[key]
+
+        response = await self._db.get_cached_response(key, self._ttl)
+        if response is not None:
+            self._remember(key, response)
+            self._counters["db_hits"] += 1
+            return response
+
+        self._counters["misses"] += 1
+        return None
+
+    async def set(self, key: str, model: str, response: str) -> None:
+        """Store a response in both tiers."""
+        self._remember(key, response)
+        await self._db.put_cached_response(key, model, response, self._ttl, self._max_rows)
+        self._counters["writes"] += 1
+
+    def stats(self) -> dict:
+        """Return hit/miss counters and the current in-memory size."""
+        lookups = self._counters["memory_hits"] + self._counters["db_hits"] + self._counters["misses"]
+        hits = lookups - self._counters["misses"]
+        return {
+            **self._counters,
+            "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+    def _remember(self, key: str, response: str) -> None:
+        self._memory[key] = (time.monotonic() + self._ttl, response)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self._memory_entries:
+            self._memory.popitem(last=False)
@@ -0,0 +1,164 @@
+"""Retry policy and circuit breaker for LLM API calls.
+
+Retries use full-jitter exponential backoff so concurrent agents that hit
+the same 429/529 spread out instead of retrying in lock-step, and never
+come back sooner than the server's ``retry-after``. Every call also has a
+per-attempt timeout and an overall deadline covering all attempts and
+backoff sleeps.
+
+The circuit breaker is shared by every caller of one LLMClient. After a
+run of consecutive upstream failures (5xx/529, timeouts, network errors)
+it opens and new calls fail immediately for a cooldown period; then a
+single probe call is let through to test whether the upstream recovered.
+"""
+
+from __future__ import annotations
+
+import random
+import time
+from collections.abc import Mapping
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+
+RETRY_STATUSES = (429, 529)
+
+
+@dataclass
+class RetryPolicy:
+    """How often and how long to retry one LLM call.
+
+    Args:
+        max_attempts: Attempts per call, including the first.
+        base_delay: Backoff cap for the first retry, in seconds; doubles per retry.
+        max_delay: Upper bound on the backoff cap, in seconds.
+        attempt_timeout: Longest a single attempt may take, in seconds.
+        deadline: Longest a call may take across all attempts, in seconds.
+    """
+
+    max_attempts: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+    attempt_timeout: float = 120.0
+    deadline: float = 300.0
+
+    def deadline_from(self, started: float) -> float:
+        """Monotonic time by which a call started at ``started`` must finish."""
+        return started + self.deadline
+
+    def attempt_timeout_for(self, deadline_at: float) -> float:
+        """Timeout for the next attempt: the per-attempt limit, cut short by the deadline."""
+        return max(0.0, min(self.attempt_timeout, deadline_at - time.monotonic()))
+
+    def backoff(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter delay before retry number ``attempt + 1``, at least ``retry_after``."""
+        delay = random.uniform(0.0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    def next_delay(
+        self,
+        attempt: int,
+        deadline_at: float,
+        headers: Mapping[str, str] | None = None,
+    ) -> float | None:
+        """Seconds to sleep before retrying, or None if the call should give up."""
+        if attempt >= self.max_attempts - 1:
+            return None
+        delay = self.backoff(attempt, parse_retry_after(headers))
+        if time.monotonic() + delay >= deadline_at:
+            return None
+        return delay
+
+
+class CircuitBreaker:
+    """Shared breaker that sheds LLM calls while the upstream is failing.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker.
+        cooldown: Seconds the breaker stays open before letting a probe through.
+    """
+
+    def __init__(self, failure_threshold: int = 5, cooldown: float = 30.0):
+        self._threshold = max(1, failure_threshold)
+        self._cooldown = cooldown
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probe_started: float | None = None
+        self._trips = 0
+        self._shed = 0
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self._cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_in(self) -> float:
+        """Seconds until the breaker lets a probe through (0 if not open)."""
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self._opened_at + self._cooldown - time.monotonic())
+
+    def allow(self) -> bool:
+        """Whether a call may proceed now. Counts the call as shed if not."""
+        state = self.state
+        if state == "closed":
+            return True
+        now = time.monotonic()
+        # Half-open: one probe at a time; a probe that never reported back
+        # (cancelled, non-HTTP error) is replaced after another cooldown.
+        if state == "half_open" and (
+            self._probe_started is None or now - self._probe_started >= self._cooldown
+        ):
+            self._probe_started = now
+            return True
+        self._shed += 1
+        return False
+
+    def record_success(self) -> None:
+        self._failures = 0
+        self._opened_at = None
+        self._probe_started = None
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._probe_started is not None or (
+            self._opened_at is None and self._failures >= self._threshold
+        ):
+            self._opened_at = time.monotonic()
+            self._probe_started = None
+            self._trips += 1
+
+    def observe(self, status_code: int) -> None:
+        """Count an HTTP response: 5xx (incl. 529 overloaded) fails, anything else succeeds."""
+        if status_code >= 500:
+            self.record_failure()
+        else:
+            self.record_success()
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "trips": self._trips,
+            "shed_calls": self._shed,
+            "retry_in_seconds": round(self.retry_in(), 1),
+        }
+
+
+def parse_retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Read a ``retry-after`` header given in seconds or as an HTTP date."""
+    value = headers.get("retry-after") if headers else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
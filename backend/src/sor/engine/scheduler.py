@@ -0,0 +1,263 @@
+"""Admission of agent calls from every project.
+
+Without it each stage run starts all of its agents at once and they queue
+in the rate limiter in arrival order, so one project's large stage holds
+every slot while a user waiting on a small interactive stage gets none.
+The scheduler sits in front of the limiter and decides which waiting agent
+call runs next:
+
+- at most ``max_concurrency`` agent calls run at a time, and never more than
+  the rate limiter's current (adaptive) concurrency allows;
+- calls are in one of two lanes: interactive runs (a user started the stage
+  and is watching it) go before batch runs (pipelines, resumed stages), but
+  while both lanes wait, one grant in every ``batch_every`` goes to the
+  batch lane so it is never starved;
+- within a lane, the project with the fewest running calls goes next (fair
+  share), then the call that has waited longest.
+
+A queued call is told its position whenever it changes, so the run can
+report it to its clients.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import time
+from collections.abc import AsyncIterator, Callable, Iterator
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from enum import StrEnum
+
+# Assumed length of an agent call until one has been timed
+DEFAULT_CALL_SECONDS = 30.0
+# Weight of the latest call in the average call length
+_CALL_SECONDS_SMOOTHING = 0.2
+
+
+class Lane(StrEnum):
+    INTERACTIVE = "interactive"
+    BATCH = "batch"
+
+
+# Lane of the agent calls made in the current context
+_lane: ContextVar[Lane] = ContextVar("scheduler_lane", default=Lane.INTERACTIVE)
+# Called each time an agent call made in the current context is queued
+_on_queued: ContextVar[Callable[[], None] | None] = ContextVar(
+    "scheduler_on_queued", default=None,
+)
+
+
+@contextmanager
+def use_lane(lane: Lane) -> Iterator[None]:
+    """Schedule the agent calls made inside the block, including in tasks
+    started from it, in ``lane``."""
+    token = _lane.set(lane)
+    try:
+        yield
+    finally:
+        _lane.reset(token)
+
+
+def current_lane() -> Lane:
+    return _lane.get()
+
+
+@contextmanager
+def notify_queued(callback: Callable[[], None] | None) -> Iterator[None]:
+    """Call ``callback`` each time an agent call made inside the block,
+    including in tasks started from it, enters the scheduler."""
+    token = _on_queued.set(callback)
+    try:
+        yield
+    finally:
+        _on_queued.reset(token)
+
+
+@dataclass(eq=False)
+class _Ticket:
+    project_id: str
+    lane: Lane
+    seq: int
+    granted: asyncio.Future = field(repr=False)
+    on_position: Callable[[int], None] | None = None
+    position: int | None = None
+
+
+class StageScheduler:
+    """Process-wide queue of agent calls with fair share and priority lanes.
+
+    Args:
+        max_concurrency: Ceiling on agent calls running at once.
+        batch_every: While both lanes wait, every n-th grant goes to the
+            batch lane.
+        capacity: Optional callable returning the current concurrency the
+            LLM client allows (the rate limiter's AIMD limit); the ceiling
+            follows it down when the API pushes back.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 8,
+        batch_every: int = 4,
+        capacity: Callable[[], int] | None = None,
+    ) -> None:
+        self._max_concurrency = max(1, max_concurrency)
+        self._batch_every = max(1, batch_every)
+        self._capacity = capacity
+        self._waiting: list[_Ticket] = []
+        self._running: dict[str, int] = {}
+        self._running_total = 0
+        # Interactive grants in a row while the batch lane was waiting
+        self._interactive_streak = 0
+        self._seq = itertools.count()
+        self._granted = 0
+        self._queued = 0
+        self._call_seconds: float | None = None
+
+    @property
+    def ceiling(self) -> int:
+        """The number of agent calls allowed to run right now."""
+        if self._capacity is None:
+            return self._max_concurrency
+        return max(1, min(self._max_concurrency, self._capacity()))
+
+    @property
+    def queued(self) -> int:
+        """Agent calls waiting for a turn, in both lanes."""
+        return len(self._waiting)
+
+    def estimated_wait(self, calls: int = 0) -> float:
+        """Seconds until the queue, plus ``calls`` more, is likely drained."""
+        call_seconds = self._call_seconds or DEFAULT_CALL_SECONDS
+        return (self.queued + calls) * call_seconds / self.ceiling
+
+    @asynccontextmanager
+    async def slot(
+        self,
+        project_id: str,
+        lane: Lane | None = None,
+        on_position: Callable[[int], None] | None = None,
+    ) -> AsyncIterator[None]:
+        """Wait for a turn to run an agent call, and hold it during the block.
+
+        ``lane`` defaults to the lane of the current context (``use_lane``).
+        While queued, ``on_position`` is called with the call's 1-based
+        position in the queue each time it changes.
+        """
+        ticket = _Ticket(
+            project_id=project_id,
+            lane=lane or current_lane(),
+            seq=next(self._seq),
+            granted=asyncio.get_running_loop().create_future(),
+            on_position=on_position,
+        )
+        self._waiting.append(ticket)
+        on_queued = _on_queued.get()
+        if on_queued is not None:
+            on_queued()
+        self._dispatch()
+        if not ticket.granted.done():
+            self._queued += 1
+            try:
+                await ticket.granted
+            except asyncio.CancelledError:
+                if ticket.granted.cancelled():
+                    if ticket in self._waiting:
+                        self._waiting.remove(ticket)
+                        self._dispatch()
+                else:
+                    # Granted, but cancelled before it could run
+                    self._release(ticket)
+                raise
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self._observe_call(time.monotonic() - started)
+            self._release(ticket)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running_total,
+            "ceiling": self.ceiling,
+            "max_concurrency": self._max_concurrency,
+            "waiting": {
+                lane.value: sum(1 for t in self._waiting if t.lane == lane) for lane in Lane
+            },
+            "running_by_project": dict(self._running),
+            "granted": self._granted,
+            "queued": self._queued,
+            "avg_call_seconds": round(self._call_seconds, 1) if self._call_seconds else None,
+            "estimated_wait_seconds": round(self.estimated_wait(), 1),
+        }
+
+    def _observe_call(self, seconds: float) -> None:
+        if self._call_seconds is None:
+            self._call_seconds = seconds
+        else:
+            self._call_seconds += _CALL_SECONDS_SMOOTHING * (seconds - self._call_seconds)
+
+    def _release(self, ticket: _Ticket) -> None:
+        # Synchronous, so a call cancelled while finishing still frees its slot
+        self._running_total -= 1
+        remaining = self._running[ticket.project_id] - 1
+        if remaining:
+            self._running[ticket.project_id] = remaining
+        else:
+            del self._running[ticket.project_id]
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        """Grant slots while there is room, then update queue positions."""
+        # A cancelled waiter may not have removed itself yet
+        self._waiting = [t for t in self._waiting if not t.granted.cancelled()]
+        ceiling = self.ceiling
+        while self._waiting and self._running_total < ceiling:
+            ticket, self._interactive_streak = self._pick(
+                self._waiting, self._running, self._interactive_streak,
+            )
+            self._waiting.remove(ticket)
+            self._running[ticket.project_id] = self._running.get(ticket.project_id, 0) + 1
+            self._running_total += 1
+            self._granted += 1
+            ticket.granted.set_result(None)
+        self._report_positions()
+
+    def _pick(
+        self,
+        waiting: list[_Ticket],
+        running: dict[str, int],
+        interactive_streak: int,
+    ) -> tuple[_Ticket, int]:
+        """The next ticket to grant, and the interactive streak after it."""
+        interactive = [t for t in waiting if t.lane == Lane.INTERACTIVE]
+        batch = [t for t in waiting if t.lane == Lane.BATCH]
+        if batch and (not interactive or interactive_streak >= self._batch_every - 1):
+            candidates, interactive_streak = batch, 0
+        else:
+            candidates = interactive
+            interactive_streak = interactive_streak + 1 if batch else 0
+        ticket = min(candidates, key=lambda t: (running.get(t.project_id, 0), t.seq))
+        return ticket, interactive_streak
+
+    def _report_positions(self) -> None:
+        """Replay the grant order of the queue and notify changed positions.
+
+        Positions assume the running calls hold their slots, so they shift
+        as other projects' calls are queued ahead by fair share.
+        """
+        waiting = list(self._waiting)
+        running = dict(self._running)
+        streak = self._interactive_streak
+        position = 0
+        while waiting:
+            ticket, streak = self._pick(waiting, running, streak)
+            waiting.remove(ticket)
+            running[ticket.project_id] = running.get(ticket.project_id, 0) + 1
+            position += 1
+            if ticket.position != position:
+                ticket.position = position
+                if ticket.on_position is not None:
+                    ticket.on_position(position)
@@ -0,0 +1,128 @@
+"""Single-flight coalescing of identical in-flight LLM requests.
+
+When a request is already in flight for the same payload hash (two browser
+tabs running the same stage, a client retrying ``POST /report``), later
+callers join it instead of making another upstream call. The upstream
+call runs in its own task and its text chunks are buffered, so a caller
+that joins late still receives the whole response from the start, and the
+call keeps running as long as at least one caller is still waiting. Its
+token usage is split evenly between the callers that saw it finish, each
+share recorded in that caller's own ``track_usage`` scopes.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections.abc import AsyncIterator, Callable
+
+from ..models import CallUsage
+from .usage import detached_usage, record_call, share_of
+
+
+class _Flight:
+    """One upstream call and the text it has produced so far."""
+
+    def __init__(self) -> None:
+        self.chunks: list[str] = []
+        self.error: BaseException | None = None
+        self.done = False
+        self.followers = 0
+        # Callers still following when the call finished, and shares charged so far
+        self.sharers = 0
+        self.charged = 0
+        self.usage: list[CallUsage] = []
+        self.task: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def push(self, chunk: str) -> None:
+        self.chunks.append(chunk)
+        self._changed.set()
+
+    def finish(self, error: BaseException | None = None) -> None:
+        self.error = error
+        self.done = True
+        self.sharers = self.followers
+        self._changed.set()
+
+    def charge(self) -> None:
+        """Record the next caller's share of the call's usage."""
+        index = self.charged
+        self.charged += 1
+        for call in self.usage:
+            record_call(share_of(call, self.sharers, index))
+
+    async def follow(self) -> AsyncIterator[str]:
+        """Yield every chunk from the start, then raise the call's error, if any."""
+        sent = 0
+        while True:
+            while sent < len(self.chunks):
+                sent += 1
+                yield self.chunks[sent - 1]
+            if self.done:
+                break
+            self._changed.clear()
+            await self._changed.wait()
+        if self.error is not None:
+            raise self.error
+
+
+class SingleFlight:
+    """Registry of in-flight calls keyed by request hash."""
+
+    def __init__(self) -> None:
+        self._flights: dict[str, _Flight] = {}
+        self._counters = {"upstream_calls": 0, "deduplicated": 0}
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._flights
+
+    async def stream(
+        self,
+        key: str,
+        produce: Callable[[], AsyncIterator[str]],
+    ) -> AsyncIterator[str]:
+        """Yield the text of the call for ``key``, starting ``produce()`` if none is in flight.
+
+        The upstream call is cancelled once every caller has stopped
+        listening before it finished, and the last caller waits for it to
+        unwind (close its connection, record its usage) and is charged for it.
+        """
+        flight = self._flights.get(key)
+        if flight is None:
+            flight = _Flight()
+            self._flights[key] = flight
+            flight.task = asyncio.create_task(self._run(key, flight, produce()))
+            self._counters["upstream_calls"] += 1
+        else:
+            self._counters["deduplicated"] += 1
+
+        flight.followers += 1
+        try:
+            async for chunk in flight.follow():
+                yield chunk
+        finally:
+            if flight.followers == 1 and not flight.done and flight.task is not None:
+                flight.task.cancel()
+                await asyncio.wait({flight.task})
+            flight.followers -= 1
+            if flight.done and flight.charged < flight.sharers:
+                flight.charge()
+
+    def stats(self) -> dict:
+        """Return upstream/deduplicated call counters and the number in flight."""
+        return {**self._counters, "in_flight": len(self._flights)}
+
+    async def _run(self, key: str, flight: _Flight, chunks: AsyncIterator[str]) -> None:
+        try:
+            with detached_usage() as flight.usage:
+                async for chunk in chunks:
+                    flight.push(chunk)
+            flight.finish()
+        except asyncio.CancelledError as exc:
+            flight.finish(exc)
+            raise
+        except Exception as exc:
+            flight.finish(exc)
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
@@ -0,0 +1,141 @@
+"""Compacted digests of approved stages.
+
+Later stages don't need the raw text of every earlier agent; they need what
+the stage concluded. When a stage is approved or overridden, a digest is
+built once, in the background, and persisted with the stage result:
+
+- a human override is used as is, or condensed by the LLM if it is long;
+- otherwise the conflict report (synthesis, agreements, disagreements,
+  open tensions) is rendered directly, with no LLM call;
+- when there is no usable report (a single agent, or detection failed),
+  the agent outputs are condensed by the LLM.
+
+The digest is stored with a fingerprint of the content it was built from,
+so a rerun or a new override invalidates it.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+
+from ..models import ConflictReport, StageResult
+from ..models.stage import STAGE_NAMES
+from .context_budget import estimate_tokens
+from .llm_client import LLMClient
+
+# Bump to invalidate every stored digest when the format changes
+DIGEST_VERSION = 1
+# Text up to this size is kept verbatim instead of being condensed
+DIGEST_TARGET_TOKENS = 1500
+DIGEST_MAX_TOKENS = 2048
+
+DIGEST_SYSTEM_PROMPT = f"""\
+You are condensing the results of one stage of a multi-agent research pipeline \
+so that later stages can build on them.
+
+Write a digest of at most {DIGEST_TARGET_TOKENS * 3 // 4} words in Markdown that keeps:
+- The conclusions and key findings, with the evidence or source they rest on
+- Points where agents disagreed, and who held which position
+- Open questions and caveats, including unsourced or weakly supported claims
+- Agent names when attributing a claim
+
+Drop restatements of the research question, methodology narration and \
+repetition. Do not add anything that is not in the input.\
+"""
+
+
+def digest_fingerprint(stage_result: StageResult) -> str:
+    """Hash of everything a stage's digest is built from."""
+    report = stage_result.conflict_report
+    source = {
+        "version": DIGEST_VERSION,
+        "human_override": stage_result.human_override,
+        "outputs": [
+            [output.id, output.content]
+            for output in stage_result.agent_outputs
+            if output.status == "complete"
+        ],
+        "conflict_report": report.model_dump() if report else None,
+    }
+    return hashlib.sha256(json.dumps(source, sort_keys=True).encode()).hexdigest()
+
+
+def has_fresh_digest(stage_result: StageResult) -> bool:
+    """Whether the stored digest still matches the stage's content."""
+    return bool(stage_result.digest) and (
+        stage_result.digest_fingerprint == digest_fingerprint(stage_result)
+    )
+
+
+async def build_stage_digest(stage_result: StageResult, llm_client: LLMClient) -> str:
+    """Build the digest of an approved stage.
+
+    Raises:
+        LLMError: If the text had to be condensed and the call failed.
+    """
+    header = _header(stage_result.stage_number)
+    report = stage_result.conflict_report
+
+    if stage_result.human_override:
+        return f"{header}\n{await _condense(stage_result.human_override, llm_client)}\n"
+
+    if report and (report.agreements or report.disagreements):
+        return f"{header}\n{_report_digest(report)}\n"
+
+    outputs = "\n\n".join(
+        f"### {output.agent_name}\n{output.content}"
+        for output in stage_result.agent_outputs
+        if output.status == "complete" and output.content
+    )
+    parts = [header, await _condense(outputs, llm_client)]
+    if report and report.synthesis:
+        parts.append(f"\n**Synthesis:** {report.synthesis}")
+    return "\n".join(parts) + "\n"
+
+
+def _header(stage_number: int) -> str:
+    name = STAGE_NAMES.get(stage_number, f"Stage {stage_number}")
+    return f"## Stage {stage_number}: {name} (Approved, digest)"
+
+
+async def _condense(text: str, llm_client: LLMClient) -> str:
+    if estimate_tokens(text) <= DIGEST_TARGET_TOKENS:
+        return text
+    return await llm_client.complete(
+        system_prompt=DIGEST_SYSTEM_PROMPT,
+        user_message=text,
+        temperature=0.0,
+        max_tokens=DIGEST_MAX_TOKENS,
+    )
+
+
+def _report_digest(report: ConflictReport) -> str:
+    """Render a conflict report as a compact Markdown digest."""
+    parts: list[str] = []
+    if report.synthesis:
+        parts.append(f"**Synthesis:** {report.synthesis}")
+
+    if report.agreements:
+        parts.append("\n**Agreed:**")
+        for point in report.agreements:
+            agents = f" ({', '.join(point.supporting_agents)})" if point.supporting_agents else ""
+            parts.append(f"- **{point.topic}**{agents}: {point.summary}")
+
+    if report.disagreements:
+        parts.append("\n**Disputed:**")
+        for point in report.disagreements:
+            parts.append(f"- **{point.topic}**: {point.summary}")
+            for position in point.positions:
+                parts.append(f"  - {position.agent_name}: {position.position}")
+
+    if report.unresolved_tensions:
+        parts.append("\n**Open tensions:**")
+        parts.extend(f"- {tension}" for tension in report.unresolved_tensions)
+
+    integrity = report.within_agent_contradictions + report.evidence_chain_breaks
+    if integrity:
+        parts.append("\n**Integrity flags:**")
+        parts.extend(f"- {flag}" for flag in integrity)
+
+    return "\n".join(parts)
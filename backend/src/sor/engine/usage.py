@@ -0,0 +1,143 @@
+"""Per-call token, latency and cost accounting for LLM calls.
+
+LLMClient reports every call it makes to ``record_call``. Callers that want
+to attribute those calls (to an agent output, a conflict detection pass,
+a report) open a ``track_usage`` scope around the work; every call made
+inside the scope, including in tasks started from it, is collected into
+the scope's list. A call made on behalf of several callers (see
+``SingleFlight``) runs in a ``detached_usage`` scope instead, and each
+caller records its ``share_of`` the call.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from ..models import CallUsage
+
+# USD per million tokens: (input, output). Matched by longest model-name prefix.
+MODEL_PRICES: dict[str, tuple[float, float]] = {
+    "claude-opus-4": (15.0, 75.0),
+    "claude-sonnet-4": (3.0, 15.0),
+    "claude-3-7-sonnet": (3.0, 15.0),
+    "claude-3-5-sonnet": (3.0, 15.0),
+    "claude-haiku-4": (1.0, 5.0),
+    "claude-3-5-haiku": (0.8, 4.0),
+    "claude-3-haiku": (0.25, 1.25),
+}
+DEFAULT_PRICES = MODEL_PRICES["claude-sonnet-4"]
+
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.1
+BATCH_DISCOUNT = 0.5
+
+TOKEN_FIELDS = (
+    "input_tokens",
+    "output_tokens",
+    "cache_creation_input_tokens",
+    "cache_read_input_tokens",
+)
+
+# Active scopes, innermost last: (purpose, collected calls)
+_scopes: ContextVar[tuple[tuple[str, list[CallUsage]], ...]] = ContextVar(
+    "llm_usage_scopes", default=(),
+)
+
+
+@contextmanager
+def track_usage(purpose: str) -> Iterator[list[CallUsage]]:
+    """Collect the usage of every LLM call made inside the block.
+
+    Calls are labelled with the innermost scope's ``purpose`` and appended to
+    every enclosing scope, so an outer scope sees the calls of nested ones.
+    """
+    calls: list[CallUsage] = []
+    token = _scopes.set(_scopes.get() + ((purpose, calls),))
+    try:
+        yield calls
+    finally:
+        _scopes.reset(token)
+
+
+@contextmanager
+def detached_usage() -> Iterator[list[CallUsage]]:
+    """Collect the usage of the calls made inside the block, hiding it from the enclosing scopes."""
+    calls: list[CallUsage] = []
+    token = _scopes.set((("", calls),))
+    try:
+        yield calls
+    finally:
+        _scopes.reset(token)
+
+
+def share_of(usage: CallUsage, parts: int, index: int) -> CallUsage:
+    """Share ``index`` of a call split evenly between ``parts`` callers.
+
+    The token counts of all the shares add up to the call's. The share is
+    unpriced and unlabelled, ready for ``record_call``.
+    """
+    counts = {}
+    for field in TOKEN_FIELDS:
+        value = getattr(usage, field)
+        counts[field] = value // parts + (1 if index < value % parts else 0)
+    return usage.model_copy(update={**counts, "purpose": "", "cost_usd": 0.0})
+
+
+def record_call(usage: CallUsage) -> CallUsage:
+    """Price a call, label it with the current scope and hand it to every active scope."""
+    scopes = _scopes.get()
+    if scopes and not usage.purpose:
+        usage.purpose = scopes[-1][0]
+    usage.cost_usd = estimate_cost(usage)
+    for _, calls in scopes:
+        calls.append(usage)
+    return usage
+
+
+def estimate_cost(usage: CallUsage) -> float:
+    """Estimate the USD cost of a call from its token counts."""
+    if usage.cached:
+        return 0.0
+    input_price, output_price = _prices_for(usage.model)
+    cost = (
+        usage.input_tokens * input_price
+        + usage.cache_creation_input_tokens * input_price * CACHE_WRITE_MULTIPLIER
+        + usage.cache_read_input_tokens * input_price * CACHE_READ_MULTIPLIER
+        + usage.output_tokens * output_price
+    ) / 1_000_000
+    if usage.batch:
+        cost *= BATCH_DISCOUNT
+    return round(cost, 6)
+
+
+def combine_usage(calls: list[CallUsage]) -> CallUsage | None:
+    """Sum several calls into one record (e.g. an agent output that needed retries)."""
+    if not calls:
+        return None
+    if len(calls) == 1:
+        return calls[0]
+    first, last = calls[0], calls[-1]
+    return CallUsage(
+        purpose=first.purpose,
+        model=last.model,
+        input_tokens=sum(c.input_tokens for c in calls),
+        output_tokens=sum(c.output_tokens for c in calls),
+        cache_creation_input_tokens=sum(c.cache_creation_input_tokens for c in calls),
+        cache_read_input_tokens=sum(c.cache_read_input_tokens for c in calls),
+        stop_reason=last.stop_reason,
+        latency_ms=sum(c.latency_ms for c in calls),
+        ttfb_ms=first.ttfb_ms,
+        cost_usd=round(sum(c.cost_usd for c in calls), 6),
+        cached=all(c.cached for c in calls),
+        batch=all(c.batch for c in calls),
+        calls=sum(c.calls for c in calls),
+    )
+
+
+def _prices_for(model: str) -> tuple[float, float]:
+    matches = [prefix for prefix in MODEL_PRICES if model.startswith(prefix)]
+    if not matches:
+        return DEFAULT_PRICES
+    return MODEL_PRICES[max(matches, key=len)]
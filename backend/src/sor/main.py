@@ -7,10 +7,20 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .config import settings
+from .engine.admission import AdmissionController
+from .engine.broadcast import BroadcastHub
+from .engine.connection_pool import PoolConfig
+from .engine.jobs import JobManager
 from .engine.llm_client import LLMClient
 from .engine.orchestrator import StageOrchestrator
+from .engine.pipeline import PipelineRunner
+from .engine.providers import provider_from_settings
+from .engine.rate_limiter import RateLimiter
+from .engine.response_cache import ResponseCache
+from .engine.retry import CircuitBreaker, RetryPolicy
+from .engine.scheduler import StageScheduler
 from .store.database import Database
-from .routes import projects, stages, agents, documents
+from .routes import projects, stages, agents, documents, llm
 
 # Module-level state accessible to routes
 app_state: dict = {}
@@ -22,12 +32,90 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
     db = Database(settings.database_path)
     await db.initialize()
 
-    llm_client = LLMClient(api_key=settings.anthropic_api_key, default_model=settings.default_model)
-    orchestrator = StageOrchestrator(llm_client=llm_client, db=db)
+    rate_limiter = RateLimiter(
+        requests_per_minute=settings.llm_requests_per_minute,
+        input_tokens_per_minute=settings.llm_input_tokens_per_minute,
+        output_tokens_per_minute=settings.llm_output_tokens_per_minute,
+        max_concurrency=settings.llm_max_concurrency,
+    )
+    response_cache = None
+    if settings.llm_cache_enabled:
+        response_cache = ResponseCache(
+            db,
+            ttl_seconds=settings.llm_cache_ttl_seconds,
+            memory_entries=settings.llm_cache_memory_entries,
+            max_rows=settings.llm_cache_max_rows,
+        )
+    circuit_breaker = CircuitBreaker(
+        failure_threshold=settings.llm_breaker_failure_threshold,
+        cooldown=settings.llm_breaker_cooldown_seconds,
+    )
+    llm_client = LLMClient(
+        api_key=settings.anthropic_api_key,
+        default_model=settings.default_model,
+        provider=provider_from_settings(settings),
+        rate_limiter=rate_limiter,
+        cache=response_cache,
+        max_continuations=settings.llm_max_continuations,
+        retry_policy=RetryPolicy(
+            max_attempts=settings.llm_max_attempts,
+            base_delay=settings.llm_backoff_base_seconds,
+            max_delay=settings.llm_backoff_max_seconds,
+            attempt_timeout=settings.llm_attempt_timeout_seconds,
+            deadline=settings.llm_call_deadline_seconds,
+        ),
+        circuit_breaker=circuit_breaker,
+        pool=PoolConfig(
+            max_connections=settings.llm_pool_max_connections,
+            max_keepalive_connections=settings.llm_pool_max_keepalive,
+            keepalive_expiry=settings.llm_pool_keepalive_expiry_seconds,
+            http2=settings.llm_http2,
+        ),
+    )
+    if settings.llm_warmup_connections > 0:
+        await llm_client.warm_up(settings.llm_warmup_connections)
+    scheduler = StageScheduler(
+        max_concurrency=settings.scheduler_max_concurrency,
+        batch_every=settings.scheduler_batch_every,
+        capacity=lambda: rate_limiter.concurrency_limit,
+    )
+    orchestrator = StageOrchestrator(
+        llm_client=llm_client,
+        db=db,
+        context_budget_tokens=settings.context_budget_tokens or None,
+        scheduler=scheduler,
+        quorum=settings.stage_quorum,
+        stage_deadline=settings.stage_deadline_seconds or None,
+    )
+
+    hub = BroadcastHub(
+        queue_size=settings.sse_subscriber_queue_size,
+        heartbeat=settings.sse_heartbeat_seconds,
+    )
+    jobs = JobManager(orchestrator, db, hub=hub, lock_ttl=settings.stage_run_lock_ttl_seconds)
+    pipelines = PipelineRunner(orchestrator, jobs, db, hub)
+    admission = AdmissionController(
+        scheduler, jobs, circuit_breaker,
+        max_queued_calls=settings.admission_max_queued_calls,
+        max_running_stages=settings.admission_max_running_stages,
+        queue_timeout=settings.admission_queue_timeout_seconds,
+        max_retry_after=settings.admission_max_retry_after_seconds,
+    )
+    if settings.recover_interrupted_stages:
+        await jobs.recover()
+        await pipelines.recover()
+    else:
+        await jobs.mark_interrupted()
+        await pipelines.mark_interrupted()
+    await db.prune_stage_jobs(settings.stage_job_retention_hours)
 
     app_state["db"] = db
     app_state["llm_client"] = llm_client
+    app_state["scheduler"] = scheduler
     app_state["orchestrator"] = orchestrator
+    app_state["jobs"] = jobs
+    app_state["pipelines"] = pipelines
+    app_state["admission"] = admission
 
     # Seed default agents if none exist
     existing = await db.list_agents(project_id=None)
@@ -38,7 +126,10 @@ async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
 
     yield
 
-    # Shutdown
+    # Shutdown (pipelines first, so they don't see their stage fail)
+    await pipelines.shutdown()
+    await jobs.shutdown()
+    await orchestrator.shutdown()
     await llm_client.close()
 
 
@@ -60,10 +151,17 @@ app.add_middleware(
 app.include_router(projects.router)
 app.include_router(stages.router)
 app.include_router(stages.report_router)
+app.include_router(stages.batch_router)
+app.include_router(stages.pipeline_router)
 app.include_router(agents.router)
 app.include_router(documents.router)
+app.include_router(llm.router)
 
 
 @app.get("/api/health")
 async def health():
-    return {"status": "ok", "has_api_key": bool(settings.anthropic_api_key)}
+    return {
+        "status": "ok",
+        "has_api_key": bool(settings.anthropic_api_key),
+        "llm_provider": settings.llm_provider,
+    }
@@ -3,6 +3,9 @@ from .stage import StageDefinition, StageResult, StageStatus
 from .project import Project, ProjectState
 from .conflict import ConflictReport, AgreementPoint, DisagreementPoint, AgentPosition
 from .events import SSEEvent, SSEEventType
+from .job import JobStatus, StageJob, StageRunLock, lease_time
+from .pipeline import ApprovalMode, ApprovalPolicy, PipelineRun, PipelineStatus
+from .usage import CallUsage
 
 __all__ = [
     "AgentConfig", "AgentOutput", "Claim",
@@ -10,4 +13,7 @@ __all__ = [
     "Project", "ProjectState",
     "ConflictReport", "AgreementPoint", "DisagreementPoint", "AgentPosition",
     "SSEEvent", "SSEEventType",
+    "JobStatus", "StageJob", "StageRunLock", "lease_time",
+    "ApprovalMode", "ApprovalPolicy", "PipelineRun", "PipelineStatus",
+    "CallUsage",
 ]
@@ -5,6 +5,8 @@ from uuid import uuid4
 
 from pydantic import BaseModel, Field
 
+from .usage import CallUsage
+
 
 def _new_id() -> str:
     return uuid4().hex[:12]
@@ -29,6 +31,7 @@ class AgentConfig(BaseModel):
     system_prompt: str
     stage: int
     temperature: float = 0.7
+    max_tokens: int = 4096
     model: str = "claude-sonnet-4-20250514"
     conflict_partners: list[str] = Field(default_factory=list)
     enabled: bool = True
@@ -45,4 +48,5 @@ class AgentOutput(BaseModel):
     claims: list[Claim] = Field(default_factory=list)
     status: str = "pending"
     error: str | None = None
+    usage: CallUsage | None = None
     created_at: str = Field(default_factory=_now_iso)
@@ -13,11 +13,22 @@ def _now_iso() -> str:
 class SSEEventType(StrEnum):
     STAGE_START = "stage_start"
     AGENT_START = "agent_start"
+    AGENT_QUEUED = "agent_queued"
+    AGENT_DELTA = "agent_delta"
     AGENT_COMPLETE = "agent_complete"
     AGENT_ERROR = "agent_error"
     CONFLICT_START = "conflict_start"
     CONFLICT_COMPLETE = "conflict_complete"
     STAGE_COMPLETE = "stage_complete"
+    STAGE_ERROR = "stage_error"
+    STAGE_CANCELLED = "stage_cancelled"
+    PIPELINE_START = "pipeline_start"
+    PIPELINE_STAGE = "pipeline_stage"
+    STAGE_APPROVED = "stage_approved"
+    PIPELINE_PAUSED = "pipeline_paused"
+    PIPELINE_COMPLETE = "pipeline_complete"
+    PIPELINE_ERROR = "pipeline_error"
+    PIPELINE_CANCELLED = "pipeline_cancelled"
 
 
 class SSEEvent(BaseModel):
@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from enum import StrEnum
+from uuid import uuid4
+
+from pydantic import BaseModel, Field
+
+
+def _new_id() -> str:
+    return uuid4().hex[:12]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def lease_time(moment: datetime | None = None) -> str:
+    """A run-lock timestamp: UTC with fixed-width microseconds.
+
+    ``isoformat()`` drops the fraction when it is zero, which would break
+    comparing lease times as text.
+    """
+    moment = moment or datetime.now(timezone.utc)
+    return moment.astimezone(timezone.utc).isoformat(timespec="microseconds")
+
+
+class JobStatus(StrEnum):
+    RUNNING = "running"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class StageJob(BaseModel):
+    id: str = Field(default_factory=_new_id)
+    project_id: str
+    stage_number: int
+    status: JobStatus = JobStatus.RUNNING
+    error: str | None = None
+    event_count: int = 0
+    # Client-chosen key; a request repeating it gets this job instead of a new run
+    idempotency_key: str | None = None
+    created_at: str = Field(default_factory=_now_iso)
+    finished_at: str | None = None
+
+
+class StageRunLock(BaseModel):
+    """Lease on running a stage, held by one job of one server process.
+
+    The job renews it while it runs; a lease past ``expires_at`` is
+    abandoned and may be taken over.
+    """
+
+    project_id: str
+    stage_number: int
+    job_id: str
+    # "<hostname>:<pid>" of the process running the job
+    owner: str
+    acquired_at: str = Field(default_factory=lease_time)
+    expires_at: str
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from datetime import datetime, timezone
+from enum import StrEnum
+from uuid import uuid4
+
+from pydantic import BaseModel, Field
+
+
+def _new_id() -> str:
+    return uuid4().hex[:12]
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PipelineStatus(StrEnum):
+    RUNNING = "running"
+    AWAITING_APPROVAL = "awaiting_approval"
+    COMPLETE = "complete"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class ApprovalMode(StrEnum):
+    MANUAL = "manual"          # stop after every stage for a human decision
+    ALWAYS = "always"          # approve every stage that produced output
+    CONFIDENCE = "confidence"  # approve unless agents confidently disagree
+
+
+class ApprovalPolicy(BaseModel):
+    """When an unattended pipeline approves a finished stage by itself."""
+
+    mode: ApprovalMode = ApprovalMode.CONFIDENCE
+    # A disagreement is confident when at least two of its positions are
+    # held with this confidence or more
+    confidence_threshold: float = Field(default=0.7, ge=0.0, le=1.0)
+    # Confident disagreements tolerated before approval is left to a human
+    max_confident_disagreements: int = Field(default=0, ge=0)
+    # Leave the stage to a human if any enabled agent has no complete output
+    require_all_agents: bool = True
+
+
+class PipelineRun(BaseModel):
+    id: str = Field(default_factory=_new_id)
+    project_id: str
+    status: PipelineStatus = PipelineStatus.RUNNING
+    policy: ApprovalPolicy = Field(default_factory=ApprovalPolicy)
+    start_stage: int = 1
+    end_stage: int = 6
+    current_stage: int = 1
+    # Stage number -> id of the job that ran it
+    stage_jobs: dict[int, str] = Field(default_factory=dict)
+    auto_approved: list[int] = Field(default_factory=list)
+    # Why the current stage was left for a human to approve
+    blockers: list[str] = Field(default_factory=list)
+    error: str | None = None
+    created_at: str = Field(default_factory=_now_iso)
+    finished_at: str | None = None
@@ -23,6 +23,7 @@ class StageStatus(StrEnum):
     RUNNING = "running"
     COMPLETE = "complete"
     APPROVED = "approved"
+    CANCELLED = "cancelled"
     SKIPPED = "skipped"
 
 
@@ -62,4 +63,6 @@ class StageResult(BaseModel):
     human_override: str | None = None
     human_notes: str = ""
     approved_at: str | None = None
+    digest: str | None = None
+    digest_fingerprint: str | None = None
     created_at: str = Field(default_factory=_now_iso)
@@ -0,0 +1,22 @@
+from __future__ import annotations
+
+from pydantic import BaseModel
+
+
+class CallUsage(BaseModel):
+    """Token usage, timing and cost of one LLM call (or several, when combined)."""
+
+    purpose: str = ""
+    model: str = ""
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_creation_input_tokens: int = 0
+    cache_read_input_tokens: int = 0
+    stop_reason: str | None = None
+    latency_ms: int = 0
+    ttfb_ms: int | None = None
+    cost_usd: float = 0.0
+    cached: bool = False
+    batch: bool = False
+    custom_id: str | None = None
+    calls: int = 1
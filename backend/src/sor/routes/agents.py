@@ -16,6 +16,7 @@ class CreateAgentRequest(BaseModel):
     system_prompt: str
     stage: int
     temperature: float = 0.7
+    max_tokens: int = 4096
     model: str = "claude-sonnet-4-20250514"
     conflict_partners: list[str] = []
     enabled: bool = True
@@ -28,6 +29,7 @@ class UpdateAgentRequest(BaseModel):
     perspective: str | None = None
     system_prompt: str | None = None
     temperature: float | None = None
+    max_tokens: int | None = None
     model: str | None = None
     conflict_partners: list[str] | None = None
     enabled: bool | None = None
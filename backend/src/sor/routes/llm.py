@@ -0,0 +1,49 @@
+"""LLM client diagnostics."""
+
+from __future__ import annotations
+
+from fastapi import APIRouter
+
+from ..engine.admission import AdmissionController
+from ..engine.llm_client import LLMClient
+from ..engine.scheduler import StageScheduler
+
+router = APIRouter(prefix="/api/llm", tags=["llm"])
+
+
+def get_llm() -> LLMClient:
+    from ..main import app_state
+    return app_state["llm_client"]
+
+
+def get_scheduler() -> StageScheduler:
+    from ..main import app_state
+    return app_state["scheduler"]
+
+
+def get_admission() -> AdmissionController:
+    from ..main import app_state
+    return app_state["admission"]
+
+
+@router.get("/stats", response_model=dict)
+async def llm_stats() -> dict:
+    """Rate limiter state and response cache hit/miss counters."""
+    return get_llm().stats()
+
+
+@router.get("/scheduler", response_model=dict)
+async def scheduler_stats() -> dict:
+    """Agent calls running and queued per lane, and the current ceiling."""
+    return get_scheduler().stats()
+
+
+@router.get("/load", response_model=dict)
+async def load_status() -> dict:
+    """Current load and whether new stage runs are being admitted.
+
+    ``state`` is "ok", "busy" (agent calls are queued), "overloaded" (new
+    runs are refused with 429) or "unavailable" (refused with 503 while the
+    LLM provider is failing).
+    """
+    return get_admission().status()
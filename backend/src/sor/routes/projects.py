@@ -53,6 +53,16 @@ async def get_project(project_id: str) -> Project:
     return project
 
 
+@router.get("/{project_id}/usage", response_model=dict)
+async def get_project_usage(project_id: str) -> dict:
+    """Token, latency and cost totals for a project, broken down by stage and call purpose."""
+    db = get_db()
+    project = await db.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    return await db.get_usage_summary(project_id)
+
+
 @router.put("/{project_id}", response_model=dict)
 async def update_project(project_id: str, req: UpdateProjectRequest) -> dict:
     db = get_db()
@@ -1,17 +1,27 @@
 from __future__ import annotations
 
 import json
-from datetime import datetime, timezone
+import logging
 
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel, Field
 from sse_starlette.sse import EventSourceResponse
 
-from ..models import StageResult, StageStatus, Project
+from ..config import settings
+from ..models import (
+    AgentConfig, ApprovalPolicy, PipelineRun, SSEEvent, StageJob, StageResult, StageStatus, Project,
+)
+from ..engine.admission import AdmissionController, AdmissionRefused, Reservation
+from ..engine.jobs import JobManager, StageBusy, event_id, parse_event_id
+from ..engine.pipeline import LAST_STAGE, PipelineRunner, first_unapproved_stage
 from ..engine.orchestrator import StageOrchestrator
 from ..engine.llm_client import LLMClient
+from ..engine.scheduler import Lane
+from ..engine.usage import track_usage
 from ..store.database import Database
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/api/projects/{project_id}/stages", tags=["stages"])
 
 
@@ -20,6 +30,12 @@ class OverrideRequest(BaseModel):
     notes: str = ""
 
 
+class RerunRequest(BaseModel):
+    # None reruns the agents that failed (or have no output)
+    agent_ids: list[str] | None = None
+    fresh: bool = True
+
+
 def get_db() -> Database:
     from ..main import app_state
     return app_state["db"]
@@ -30,11 +46,26 @@ def get_orchestrator() -> StageOrchestrator:
     return app_state["orchestrator"]
 
 
+def get_jobs() -> JobManager:
+    from ..main import app_state
+    return app_state["jobs"]
+
+
+def get_pipelines() -> PipelineRunner:
+    from ..main import app_state
+    return app_state["pipelines"]
+
+
 def get_llm() -> LLMClient:
     from ..main import app_state
     return app_state["llm_client"]
 
 
+def get_admission() -> AdmissionController:
+    from ..main import app_state
+    return app_state["admission"]
+
+
 @router.get("", response_model=list[StageResult])
 async def list_stage_results(project_id: str) -> list[StageResult]:
     db = get_db()
@@ -50,11 +81,10 @@ async def get_stage_result(project_id: str, stage_number: int) -> StageResult |
     return await db.get_stage_result(project_id, stage_number)
 
 
-@router.get("/{stage_number}/run")
-async def run_stage(project_id: str, stage_number: int):
-    db = get_db()
-    orchestrator = get_orchestrator()
-
+async def _prepare_stage_run(
+    db: Database, project_id: str, stage_number: int,
+) -> tuple[Project, list[AgentConfig]]:
+    """Validate that a stage can run and return its project and agents."""
     project = await db.get_project(project_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
@@ -77,24 +107,192 @@ async def run_stage(project_id: str, stage_number: int):
     if not agents:
         raise HTTPException(status_code=400, detail=f"No agents configured for stage {stage_number}")
 
-    # Update project state
-    await db.update_project(project_id, state="in_progress", current_stage=stage_number)
+    return project, agents
+
+
+async def _admit(agent_count: int, lane: Lane = Lane.INTERACTIVE) -> Reservation:
+    """Refuse to start a run while the server is overloaded (429/503 with Retry-After).
+
+    Returns the run's reservation, to hand to the job that runs it.
+    """
+    try:
+        return await get_admission().admit(agent_count, lane)
+    except AdmissionRefused as exc:
+        refusal = exc.refusal
+        raise HTTPException(
+            status_code=refusal.status_code,
+            detail=refusal.reason,
+            headers={"Retry-After": str(refusal.retry_after)},
+        )
+
+
+@router.get("/{stage_number}/usage", response_model=dict)
+async def get_stage_usage(project_id: str, stage_number: int) -> dict:
+    """Token, latency and cost totals for a stage, broken down by agent and call purpose."""
+    db = get_db()
+    return await db.get_usage_summary(project_id, stage_number)
+
+
+@router.get("/{stage_number}/run")
+async def run_stage(
+    project_id: str,
+    stage_number: int,
+    request: Request,
+    fresh: bool = False,
+    job_id: str | None = None,
+    idempotency_key: str | None = None,
+):
+    """Start the stage as a background job and stream its events.
+
+    The run doesn't depend on this connection. If the stage is already
+    running (in any server process), this subscribes to that run from its
+    first event instead of starting another one. A client reconnecting
+    with ``Last-Event-ID``, or passing ``job_id``, subscribes to that job
+    and first receives the events it missed. A request repeating an
+    ``Idempotency-Key`` header (or ``idempotency_key``, for EventSource
+    clients) subscribes to the job the first one started. Starting a run
+    is refused with 429 or 503 and a ``Retry-After`` header while the
+    server is overloaded.
+    """
+    jobs = get_jobs()
+    after = 0
+    idempotency_key = request.headers.get("idempotency-key") or idempotency_key
+    resume = parse_event_id(request.headers.get("last-event-id", ""))
+    if resume:
+        job_id, after = resume
+    elif not job_id:
+        existing = None
+        if idempotency_key:
+            existing = await jobs.find(project_id, stage_number, idempotency_key)
+        existing = existing or await jobs.find_active(project_id, stage_number)
+        job_id = existing.id if existing else None
+
+    if job_id:
+        job = await jobs.get(job_id)
+        if not job or job.project_id != project_id or job.stage_number != stage_number:
+            raise HTTPException(status_code=404, detail="Stage job not found")
+    else:
+        db = get_db()
+        project, agents = await _prepare_stage_run(db, project_id, stage_number)
+        reservation = await _admit(sum(1 for a in agents if a.enabled))
+        job = await jobs.start(
+            project, stage_number, agents, use_cache=not fresh,
+            idempotency_key=idempotency_key, reservation=reservation,
+        )
+
+        # Update project state
+        await db.update_project(project_id, state="in_progress", current_stage=stage_number)
 
     async def event_generator():
-        async for event in orchestrator.run_stage(project, stage_number, agents):
-            yield {
-                "event": event.type.value,
-                "data": json.dumps({
-                    "agent_id": event.agent_id,
-                    "agent_name": event.agent_name,
-                    "timestamp": event.timestamp,
-                    **event.data,
-                }),
-            }
+        async for item in jobs.events(job.id, after):
+            if item is None:
+                yield {"comment": "heartbeat"}
+            else:
+                yield _sse_message(job.id, *item)
 
     return EventSourceResponse(event_generator())
 
 
+@router.post("/{stage_number}/rerun", response_model=dict)
+async def rerun_agents(
+    project_id: str, stage_number: int, req: RerunRequest, request: Request,
+) -> dict:
+    """Rerun some agents of a finished stage, keeping the other outputs.
+
+    Starts a background job (follow it with ``GET /run?job_id=...``).
+    Conflict detection is repeated only if the successful outputs change.
+    By default the response cache is bypassed, since rerunning an agent
+    is meant to produce a new answer. A request repeating an
+    ``Idempotency-Key`` header gets the job the first one started. An
+    approved stage is refused with 409, since later stages build on it.
+    """
+    db = get_db()
+    jobs = get_jobs()
+    idempotency_key = request.headers.get("idempotency-key")
+    if idempotency_key:
+        existing = await jobs.find(project_id, stage_number, idempotency_key)
+        if existing:
+            return {"ok": True, "job_id": existing.id, "agent_ids": None}
+    project, agents = await _prepare_stage_run(db, project_id, stage_number)
+
+    if await jobs.find_active(project_id, stage_number):
+        raise HTTPException(status_code=409, detail="Stage is already running")
+    stage_result = await db.get_stage_result(project_id, stage_number)
+    if not stage_result or stage_result.status == StageStatus.RUNNING:
+        raise HTTPException(status_code=400, detail="Stage has no finished result to rerun")
+    if stage_result.status == StageStatus.APPROVED:
+        raise HTTPException(status_code=409, detail="Stage is approved and can no longer be rerun")
+
+    agents_by_id = {a.id: a for a in agents if a.enabled}
+    if req.agent_ids is None:
+        completed = {o.agent_id for o in stage_result.agent_outputs if o.status == "complete"}
+        rerun_ids = set(agents_by_id) - completed
+    else:
+        unknown = set(req.agent_ids) - set(agents_by_id)
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Not enabled agents of stage {stage_number}: {', '.join(sorted(unknown))}",
+            )
+        rerun_ids = set(req.agent_ids)
+    if not rerun_ids:
+        raise HTTPException(status_code=400, detail="No agents to rerun")
+    reservation = await _admit(len(rerun_ids))
+    job = await jobs.start(
+        project, stage_number, agents, use_cache=not req.fresh,
+        checkpoint=stage_result, rerun_agent_ids=rerun_ids, idempotency_key=idempotency_key,
+        reservation=reservation,
+    )
+    await db.update_project(project_id, state="in_progress", current_stage=stage_number)
+    return {"ok": True, "job_id": job.id, "agent_ids": sorted(rerun_ids)}
+
+
+@router.post("/{stage_number}/cancel", response_model=dict)
+async def cancel_stage(project_id: str, stage_number: int) -> dict:
+    """Stop a running stage.
+
+    In-flight LLM requests are aborted; what each interrupted agent had
+    streamed is kept as a partial output, and subscribers receive a
+    ``stage_cancelled`` event. Finish the stage later with ``/rerun``.
+    """
+    jobs = get_jobs()
+    active = await jobs.find_active(project_id, stage_number)
+    if active and not jobs.is_local(active.id):
+        raise HTTPException(status_code=409, detail="Stage is running in another server process")
+    if active:
+        await jobs.cancel(active.id)
+        return {"ok": True, "job_id": active.id}
+
+    # A run interrupted without recovery leaves the stage RUNNING with no job
+    stage_result = await get_db().get_stage_result(project_id, stage_number)
+    if not stage_result or stage_result.status != StageStatus.RUNNING:
+        raise HTTPException(status_code=409, detail="Stage is not running")
+    await get_orchestrator().mark_cancelled(project_id, stage_number)
+    return {"ok": True, "job_id": None}
+
+
+@router.get("/{stage_number}/job", response_model=StageJob)
+async def get_stage_job(project_id: str, stage_number: int) -> StageJob:
+    """Status of the stage's most recent run job."""
+    job = await get_jobs().latest(project_id, stage_number)
+    if not job:
+        raise HTTPException(status_code=404, detail="No run job for this stage")
+    return job
+
+
+def _sse_message(job_id: str, seq: int, event: SSEEvent) -> dict:
+    return {
+        "id": event_id(job_id, seq),
+        "event": event.type.value,
+        "data": json.dumps({
+            "agent_id": event.agent_id,
+            "agent_name": event.agent_name,
+            "timestamp": event.timestamp,
+            **event.data,
+        }),
+    }
+
+
 @router.post("/{stage_number}/approve", response_model=dict)
 async def approve_stage(project_id: str, stage_number: int) -> dict:
     db = get_db()
@@ -104,17 +302,10 @@ async def approve_stage(project_id: str, stage_number: int) -> dict:
     if result.status not in (StageStatus.COMPLETE, StageStatus.APPROVED):
         raise HTTPException(status_code=400, detail="Stage must be complete before approving")
 
-    now = datetime.now(timezone.utc).isoformat()
-    await db.update_stage_result(project_id, stage_number, status="approved", approved_at=now)
-
-    if stage_number >= 6:
-        # Final stage — mark project complete
-        await db.update_project(project_id, state="complete", current_stage=6)
+    next_stage = await get_orchestrator().approve_stage(project_id, stage_number)
+    if next_stage is None:
+        # Final stage — project is complete
         return {"ok": True, "complete": True}
-
-    # Advance project current_stage
-    next_stage = stage_number + 1
-    await db.update_project(project_id, current_stage=next_stage)
     return {"ok": True, "next_stage": next_stage}
 
 
@@ -129,9 +320,152 @@ async def save_override(project_id: str, stage_number: int, req: OverrideRequest
         project_id, stage_number,
         human_override=req.content, human_notes=req.notes,
     )
+    # The override replaces the stage's content, so its digest is rebuilt
+    # (in the background; later stages get the full text meanwhile)
+    await get_orchestrator().compact_stage(project_id, stage_number)
     return {"ok": True}
 
 
+# --- Batch runs (non-interactive, via the Message Batches API) ---
+
+batch_router = APIRouter(prefix="/api/batches", tags=["batches"])
+
+
+class BatchStageRef(BaseModel):
+    project_id: str
+    stage_number: int
+
+
+class BatchRunRequest(BaseModel):
+    runs: list[BatchStageRef]
+
+
+@batch_router.post("", response_model=dict)
+async def submit_batch_run(req: BatchRunRequest) -> dict:
+    """Queue stages from one or more projects as a single message batch.
+
+    Returns immediately; results are persisted as each stage's batch
+    output arrives and can be read back through the usual stage endpoints.
+    Each stage gets a run job (follow it with ``GET /run?job_id=...``)
+    holding the stage until the batch ends; if any stage is already
+    running, none is started and the request fails with 409. Like any
+    batch-lane run, it is refused with 429 or 503 while the server is
+    overloaded.
+    """
+    db = get_db()
+
+    if not req.runs:
+        raise HTTPException(status_code=400, detail="No stages to run")
+
+    runs = []
+    for ref in req.runs:
+        project, agents = await _prepare_stage_run(db, ref.project_id, ref.stage_number)
+        runs.append((project, ref.stage_number, agents))
+    reservation = await _admit(
+        sum(1 for _, _, agents in runs for a in agents if a.enabled), Lane.BATCH,
+    )
+    try:
+        jobs = await get_jobs().start_batch(runs, poll_interval=settings.llm_batch_poll_seconds)
+    except StageBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    finally:
+        # Batch calls don't go through the scheduler; the jobs count from here
+        reservation.release()
+    for project, stage_number, _ in runs:
+        await db.update_project(project.id, state="in_progress", current_stage=stage_number)
+    return {"ok": True, "stages": len(runs), "job_ids": [job.id for job in jobs]}
+
+
+# --- Unattended pipeline runs (stages 1-6 back to back) ---
+
+pipeline_router = APIRouter(prefix="/api/projects/{project_id}/pipeline", tags=["pipeline"])
+
+
+class PipelineRequest(BaseModel):
+    policy: ApprovalPolicy = Field(default_factory=ApprovalPolicy)
+    end_stage: int = Field(default=LAST_STAGE, ge=1, le=LAST_STAGE)
+    fresh: bool = False
+
+
+@pipeline_router.post("", response_model=PipelineRun)
+async def start_pipeline(project_id: str, req: PipelineRequest) -> PipelineRun:
+    """Run the project's unapproved stages, up to ``end_stage``, unattended.
+
+    Each stage is approved automatically when ``policy`` allows it;
+    otherwise the pipeline stops, awaiting approval, and can be started
+    again once the stage is approved. Follow it with ``GET /events``.
+    Returns the pipeline already running the project, if any.
+    """
+    db = get_db()
+    pipelines = get_pipelines()
+    project = await db.get_project(project_id)
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    active = pipelines.active(project_id)
+    if active:
+        return active
+
+    start_stage = first_unapproved_stage(project, req.end_stage)
+    if start_stage is None:
+        raise HTTPException(status_code=400, detail=f"Stages 1-{req.end_stage} are already approved")
+    agents = await db.list_agents(stage=start_stage, project_id=project_id)
+    reservation = await _admit(sum(1 for a in agents if a.enabled), Lane.BATCH)
+    return await pipelines.start(
+        project, start_stage, policy=req.policy, end_stage=req.end_stage,
+        use_cache=not req.fresh, reservation=reservation,
+    )
+
+
+@pipeline_router.get("", response_model=PipelineRun)
+async def get_pipeline(project_id: str) -> PipelineRun:
+    """Status of the project's most recent pipeline."""
+    run = await get_pipelines().latest(project_id)
+    if not run:
+        raise HTTPException(status_code=404, detail="No pipeline for this project")
+    return run
+
+
+@pipeline_router.get("/events")
+async def pipeline_events(project_id: str, request: Request, pipeline_id: str | None = None):
+    """Stream a pipeline's feed: its own events and those of every stage it runs.
+
+    Follows the running pipeline unless ``pipeline_id`` is given;
+    reconnecting with ``Last-Event-ID`` resumes after the last event received.
+    """
+    pipelines = get_pipelines()
+    after = 0
+    resume = parse_event_id(request.headers.get("last-event-id", ""))
+    if resume:
+        pipeline_id, after = resume
+    elif not pipeline_id:
+        active = pipelines.active(project_id)
+        pipeline_id = active.id if active else None
+
+    run = await pipelines.get(pipeline_id) if pipeline_id else None
+    if not run or run.project_id != project_id:
+        raise HTTPException(status_code=404, detail="Pipeline not found")
+
+    async def event_generator():
+        async for item in pipelines.events(run.id, after):
+            if item is None:
+                yield {"comment": "heartbeat"}
+            else:
+                yield _sse_message(run.id, *item)
+
+    return EventSourceResponse(event_generator())
+
+
+@pipeline_router.post("/cancel", response_model=dict)
+async def cancel_pipeline(project_id: str) -> dict:
+    """Stop the running pipeline, cancelling the stage it is on."""
+    pipelines = get_pipelines()
+    active = pipelines.active(project_id)
+    if not active:
+        raise HTTPException(status_code=409, detail="No pipeline is running")
+    await pipelines.cancel(active.id)
+    return {"ok": True, "pipeline_id": active.id}
+
+
 # --- Report generation (separate prefix for project-level endpoint) ---
 
 report_router = APIRouter(prefix="/api/projects/{project_id}", tags=["report"])
@@ -159,7 +493,7 @@ Attribute key claims to the agents that made them where relevant.\
 
 
 @report_router.post("/report")
-async def generate_report(project_id: str):
+async def generate_report(project_id: str, fresh: bool = False):
     db = get_db()
     llm = get_llm()
 
@@ -205,15 +539,18 @@ async def generate_report(project_id: str):
     user_message = "\n".join(sections)
 
     try:
-        report_content = await llm.complete(
-            system_prompt=REPORT_SYSTEM_PROMPT,
-            user_message=user_message,
-            temperature=0.3,
-            max_tokens=8192,
-        )
-        return {"ok": True, "report": report_content}
+        with track_usage("report") as calls:
+            report_content = await llm.complete(
+                system_prompt=REPORT_SYSTEM_PROMPT,
+                user_message=user_message,
+                temperature=0.3,
+                max_tokens=8192,
+                cache=not fresh,
+            )
     except Exception as exc:
         raise HTTPException(status_code=500, detail=f"Report generation failed: {exc}")
+    await db.record_llm_calls(project_id, None, calls)
+    return {"ok": True, "report": report_content}
 
 
 def _stage_name(num: int) -> str:
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import json
 import os
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 
 import aiosqlite
@@ -9,10 +10,18 @@ import aiosqlite
 from ..models import (
     AgentConfig,
     AgentOutput,
+    CallUsage,
     ConflictReport,
+    JobStatus,
+    PipelineRun,
+    PipelineStatus,
     Project,
     ProjectState,
+    SSEEvent,
+    SSEEventType,
+    StageJob,
     StageResult,
+    StageRunLock,
     StageStatus,
 )
 
@@ -37,6 +46,7 @@ CREATE TABLE IF NOT EXISTS agents (
     system_prompt TEXT NOT NULL,
     stage INTEGER NOT NULL,
     temperature REAL DEFAULT 0.7,
+    max_tokens INTEGER DEFAULT 4096,
     model TEXT DEFAULT 'claude-sonnet-4-20250514',
     conflict_partners TEXT DEFAULT '[]',
     enabled INTEGER DEFAULT 1,
@@ -53,6 +63,8 @@ CREATE TABLE IF NOT EXISTS stage_results (
     human_override TEXT DEFAULT NULL,
     human_notes TEXT DEFAULT '',
     approved_at TEXT DEFAULT NULL,
+    digest TEXT DEFAULT NULL,
+    digest_fingerprint TEXT DEFAULT NULL,
     created_at TEXT DEFAULT (datetime('now')),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
     UNIQUE(project_id, stage_number)
@@ -69,6 +81,7 @@ CREATE TABLE IF NOT EXISTS agent_outputs (
     claims TEXT DEFAULT '[]',
     status TEXT DEFAULT 'pending',
     error TEXT DEFAULT NULL,
+    usage TEXT DEFAULT NULL,
     created_at TEXT DEFAULT (datetime('now')),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE,
     FOREIGN KEY (stage_result_id) REFERENCES stage_results(id) ON DELETE CASCADE
@@ -83,8 +96,105 @@ CREATE TABLE IF NOT EXISTS documents (
     created_at TEXT DEFAULT (datetime('now')),
     FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
 );
+
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    response TEXT NOT NULL,
+    created_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_cache_created_at ON llm_cache(created_at);
+
+CREATE TABLE IF NOT EXISTS llm_calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    project_id TEXT NOT NULL,
+    stage_number INTEGER,
+    agent_output_id TEXT,
+    agent_name TEXT,
+    purpose TEXT DEFAULT '',
+    model TEXT DEFAULT '',
+    input_tokens INTEGER DEFAULT 0,
+    output_tokens INTEGER DEFAULT 0,
+    cache_creation_input_tokens INTEGER DEFAULT 0,
+    cache_read_input_tokens INTEGER DEFAULT 0,
+    stop_reason TEXT,
+    latency_ms INTEGER DEFAULT 0,
+    ttfb_ms INTEGER,
+    cost_usd REAL DEFAULT 0,
+    cached INTEGER DEFAULT 0,
+    batch INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (datetime('now')),
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_llm_calls_project ON llm_calls(project_id, stage_number);
+
+CREATE TABLE IF NOT EXISTS stage_jobs (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    stage_number INTEGER NOT NULL,
+    status TEXT DEFAULT 'running',
+    error TEXT DEFAULT NULL,
+    event_count INTEGER DEFAULT 0,
+    idempotency_key TEXT DEFAULT NULL,
+    created_at TEXT DEFAULT (datetime('now')),
+    finished_at TEXT DEFAULT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_stage_jobs_stage ON stage_jobs(project_id, stage_number, created_at);
+CREATE UNIQUE INDEX IF NOT EXISTS idx_stage_jobs_idempotency_key
+    ON stage_jobs(project_id, stage_number, idempotency_key) WHERE idempotency_key IS NOT NULL;
+
+CREATE TABLE IF NOT EXISTS stage_run_locks (
+    project_id TEXT NOT NULL,
+    stage_number INTEGER NOT NULL,
+    job_id TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    acquired_at TEXT NOT NULL,
+    expires_at TEXT NOT NULL,
+    PRIMARY KEY (project_id, stage_number)
+);
+
+CREATE TABLE IF NOT EXISTS stage_job_events (
+    job_id TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    event TEXT NOT NULL,
+    PRIMARY KEY (job_id, seq),
+    FOREIGN KEY (job_id) REFERENCES stage_jobs(id) ON DELETE CASCADE
+);
+
+CREATE TABLE IF NOT EXISTS pipeline_runs (
+    id TEXT PRIMARY KEY,
+    project_id TEXT NOT NULL,
+    status TEXT DEFAULT 'running',
+    policy TEXT NOT NULL,
+    start_stage INTEGER NOT NULL,
+    end_stage INTEGER NOT NULL,
+    current_stage INTEGER NOT NULL,
+    stage_jobs TEXT DEFAULT '{}',
+    auto_approved TEXT DEFAULT '[]',
+    blockers TEXT DEFAULT '[]',
+    error TEXT DEFAULT NULL,
+    created_at TEXT DEFAULT (datetime('now')),
+    finished_at TEXT DEFAULT NULL,
+    FOREIGN KEY (project_id) REFERENCES projects(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_pipeline_runs_project ON pipeline_runs(project_id, created_at);
 """
 
+def _hours_ago(hours: int) -> str:
+    """ISO timestamp ``hours`` ago, comparable with the models' created_at."""
+    return (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+
+
+USAGE_SUM_COLUMNS = (
+    "input_tokens", "output_tokens", "cache_creation_input_tokens",
+    "cache_read_input_tokens", "latency_ms", "cost_usd",
+)
+
 
 class Database:
     def __init__(self, path: str):
@@ -93,6 +203,13 @@ class Database:
     async def initialize(self) -> None:
         os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
         async with aiosqlite.connect(self._path) as db:
+            # Migrate: stage jobs created before idempotency keys, ahead of
+            # the schema, which indexes them
+            cursor = await db.execute("PRAGMA table_info(stage_jobs)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            if columns and "idempotency_key" not in columns:
+                await db.execute("ALTER TABLE stage_jobs ADD COLUMN idempotency_key TEXT DEFAULT NULL")
+
             await db.executescript(SCHEMA)
             # Migrate: add folder column to existing databases
             cursor = await db.execute("PRAGMA table_info(projects)")
@@ -100,6 +217,27 @@ class Database:
             if "folder" not in columns:
                 await db.execute("ALTER TABLE projects ADD COLUMN folder TEXT DEFAULT ''")
 
+            # Migrate: add usage column to existing agent outputs
+            cursor = await db.execute("PRAGMA table_info(agent_outputs)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            if "usage" not in columns:
+                await db.execute("ALTER TABLE agent_outputs ADD COLUMN usage TEXT DEFAULT NULL")
+
+            # Migrate: add per-agent max_tokens
+            cursor = await db.execute("PRAGMA table_info(agents)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            if "max_tokens" not in columns:
+                await db.execute("ALTER TABLE agents ADD COLUMN max_tokens INTEGER DEFAULT 4096")
+
+            # Migrate: add compacted stage digests
+            cursor = await db.execute("PRAGMA table_info(stage_results)")
+            columns = {row[1] for row in await cursor.fetchall()}
+            if "digest" not in columns:
+                await db.execute("ALTER TABLE stage_results ADD COLUMN digest TEXT DEFAULT NULL")
+                await db.execute(
+                    "ALTER TABLE stage_results ADD COLUMN digest_fingerprint TEXT DEFAULT NULL"
+                )
+
             # Migrate: seed new surprise-focused agents if missing
             cursor = await db.execute(
                 "SELECT id FROM agents WHERE id = 'assumption-breaker' AND project_id IS NULL"
@@ -231,22 +369,15 @@ class Database:
                 status=StageStatus(row["status"]),
                 conflict_report=json.loads(row["conflict_report"]) if row["conflict_report"] else None,
                 human_override=row["human_override"], human_notes=row["human_notes"],
-                approved_at=row["approved_at"], created_at=row["created_at"],
+                approved_at=row["approved_at"], digest=row["digest"],
+                digest_fingerprint=row["digest_fingerprint"], created_at=row["created_at"],
             )
             # Load agent outputs
             out_cursor = await db.execute(
                 "SELECT * FROM agent_outputs WHERE stage_result_id = ? ORDER BY created_at", (sr.id,)
             )
             out_rows = await out_cursor.fetchall()
-            sr.agent_outputs = [
-                AgentOutput(
-                    id=r["id"], agent_id=r["agent_id"], agent_name=r["agent_name"],
-                    stage=r["stage"], project_id=r["project_id"], content=r["content"],
-                    claims=json.loads(r["claims"]), status=r["status"], error=r["error"],
-                    created_at=r["created_at"],
-                )
-                for r in out_rows
-            ]
+            sr.agent_outputs = [self._row_to_output(r) for r in out_rows]
             results.append(sr)
         return results
 
@@ -265,44 +396,79 @@ class Database:
                 status=StageStatus(row["status"]),
                 conflict_report=json.loads(row["conflict_report"]) if row["conflict_report"] else None,
                 human_override=row["human_override"], human_notes=row["human_notes"],
-                approved_at=row["approved_at"], created_at=row["created_at"],
+                approved_at=row["approved_at"], digest=row["digest"],
+                digest_fingerprint=row["digest_fingerprint"], created_at=row["created_at"],
             )
             out_cursor = await db.execute(
                 "SELECT * FROM agent_outputs WHERE stage_result_id = ? ORDER BY created_at", (sr.id,)
             )
             out_rows = await out_cursor.fetchall()
-            sr.agent_outputs = [
-                AgentOutput(
-                    id=r["id"], agent_id=r["agent_id"], agent_name=r["agent_name"],
-                    stage=r["stage"], project_id=r["project_id"], content=r["content"],
-                    claims=json.loads(r["claims"]), status=r["status"], error=r["error"],
-                    created_at=r["created_at"],
-                )
-                for r in out_rows
-            ]
+            sr.agent_outputs = [self._row_to_output(r) for r in out_rows]
             return sr
 
+    async def list_stage_results(self, status: StageStatus) -> list[StageResult]:
+        """Return every stage result, across projects, with the given status."""
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "SELECT project_id, stage_number FROM stage_results WHERE status = ? "
+                "ORDER BY created_at",
+                (status,),
+            )
+            keys = await cursor.fetchall()
+        results = []
+        for project_id, stage_number in keys:
+            sr = await self.get_stage_result(project_id, stage_number)
+            if sr:
+                results.append(sr)
+        return results
+
     async def save_stage_result(self, sr: StageResult) -> None:
         conflict_json = sr.conflict_report.model_dump_json() if sr.conflict_report else None
         async with self._connect() as db:
             await db.execute(
                 "INSERT OR REPLACE INTO stage_results "
-                "(id, project_id, stage_number, status, conflict_report, human_override, human_notes, approved_at, created_at) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                "(id, project_id, stage_number, status, conflict_report, human_override, human_notes, "
+                "approved_at, digest, digest_fingerprint, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (sr.id, sr.project_id, sr.stage_number, sr.status, conflict_json,
-                 sr.human_override, sr.human_notes, sr.approved_at, sr.created_at),
+                 sr.human_override, sr.human_notes, sr.approved_at,
+                 sr.digest, sr.digest_fingerprint, sr.created_at),
             )
+            # The outputs replace any checkpointed ones (e.g. an agent that
+            # errored before a resume and has been run again)
+            await db.execute("DELETE FROM agent_outputs WHERE stage_result_id = ?", (sr.id,))
             for out in sr.agent_outputs:
-                await db.execute(
-                    "INSERT OR REPLACE INTO agent_outputs "
-                    "(id, agent_id, agent_name, stage, project_id, stage_result_id, content, claims, status, error, created_at) "
-                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
-                    (out.id, out.agent_id, out.agent_name, out.stage, out.project_id, sr.id,
-                     out.content, json.dumps([c.model_dump() for c in out.claims]),
-                     out.status, out.error, out.created_at),
-                )
+                await self._insert_output(db, sr.id, out)
             await db.commit()
 
+    async def save_agent_output(self, stage_result_id: str, output: AgentOutput) -> None:
+        """Checkpoint one agent's output into a (running) stage result."""
+        async with self._connect() as db:
+            await self._insert_output(db, stage_result_id, output)
+            await db.commit()
+
+    @staticmethod
+    async def _insert_output(db: aiosqlite.Connection, stage_result_id: str, out: AgentOutput) -> None:
+        await db.execute(
+            "INSERT OR REPLACE INTO agent_outputs "
+            "(id, agent_id, agent_name, stage, project_id, stage_result_id, content, claims, status, error, usage, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (out.id, out.agent_id, out.agent_name, out.stage, out.project_id, stage_result_id,
+             out.content, json.dumps([c.model_dump() for c in out.claims]),
+             out.status, out.error,
+             out.usage.model_dump_json() if out.usage else None, out.created_at),
+        )
+
+    @staticmethod
+    def _row_to_output(row: aiosqlite.Row) -> AgentOutput:
+        return AgentOutput(
+            id=row["id"], agent_id=row["agent_id"], agent_name=row["agent_name"],
+            stage=row["stage"], project_id=row["project_id"], content=row["content"],
+            claims=json.loads(row["claims"]), status=row["status"], error=row["error"],
+            usage=json.loads(row["usage"]) if row["usage"] else None,
+            created_at=row["created_at"],
+        )
+
     async def update_stage_result(self, project_id: str, stage_number: int, **fields: object) -> None:
         if not fields:
             return
@@ -319,10 +485,10 @@ class Database:
     async def create_agent(self, agent: AgentConfig) -> AgentConfig:
         async with self._connect() as db:
             await db.execute(
-                "INSERT INTO agents (id, name, role, perspective, system_prompt, stage, temperature, model, conflict_partners, enabled, project_id) "
-                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                "INSERT INTO agents (id, name, role, perspective, system_prompt, stage, temperature, max_tokens, model, conflict_partners, enabled, project_id) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
                 (agent.id, agent.name, agent.role, agent.perspective, agent.system_prompt,
-                 agent.stage, agent.temperature, agent.model,
+                 agent.stage, agent.temperature, agent.max_tokens, agent.model,
                  json.dumps(agent.conflict_partners), int(agent.enabled), agent.project_id),
             )
             await db.commit()
@@ -389,11 +555,367 @@ class Database:
         return AgentConfig(
             id=row["id"], name=row["name"], role=row["role"],
             perspective=row["perspective"], system_prompt=row["system_prompt"],
-            stage=row["stage"], temperature=row["temperature"], model=row["model"],
+            stage=row["stage"], temperature=row["temperature"],
+            max_tokens=row["max_tokens"] or 4096, model=row["model"],
             conflict_partners=json.loads(row["conflict_partners"]),
             enabled=bool(row["enabled"]), project_id=row["project_id"],
         )
 
+    # --- LLM usage accounting ---
+
+    async def record_llm_calls(
+        self,
+        project_id: str,
+        stage_number: int | None,
+        calls: list[CallUsage],
+        agent_output_id: str | None = None,
+        agent_name: str | None = None,
+    ) -> None:
+        """Persist the usage of individual LLM calls made for a project."""
+        if not calls:
+            return
+        async with self._connect() as db:
+            await db.executemany(
+                "INSERT INTO llm_calls (project_id, stage_number, agent_output_id, agent_name, "
+                "purpose, model, input_tokens, output_tokens, cache_creation_input_tokens, "
+                "cache_read_input_tokens, stop_reason, latency_ms, ttfb_ms, cost_usd, cached, batch) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (project_id, stage_number, agent_output_id, agent_name,
+                     c.purpose, c.model, c.input_tokens, c.output_tokens,
+                     c.cache_creation_input_tokens, c.cache_read_input_tokens,
+                     c.stop_reason, c.latency_ms, c.ttfb_ms, c.cost_usd,
+                     int(c.cached), int(c.batch))
+                    for c in calls
+                ],
+            )
+            await db.commit()
+
+    async def get_usage_summary(self, project_id: str, stage_number: int | None = None) -> dict:
+        """Aggregate recorded LLM usage for a project, or for one of its stages.
+
+        Returns overall totals plus breakdowns by call purpose and by stage
+        (project scope) or by agent (stage scope).
+        """
+        sums = ", ".join(f"COALESCE(SUM({c}), 0) AS {c}" for c in USAGE_SUM_COLUMNS)
+        select = f"COUNT(*) AS calls, {sums}, AVG(ttfb_ms) AS avg_ttfb_ms"
+        where = "WHERE project_id = ?"
+        params: list[object] = [project_id]
+        if stage_number is not None:
+            where += " AND stage_number = ?"
+            params.append(stage_number)
+        group_key = "agent_name" if stage_number is not None else "stage_number"
+
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(f"SELECT {select} FROM llm_calls {where}", params)
+            totals = dict(await cursor.fetchone())
+            cursor = await db.execute(
+                f"SELECT purpose, {select} FROM llm_calls {where} GROUP BY purpose ORDER BY purpose",
+                params,
+            )
+            by_purpose = [dict(r) for r in await cursor.fetchall()]
+            cursor = await db.execute(
+                f"SELECT {group_key}, {select} FROM llm_calls {where} "
+                f"AND {group_key} IS NOT NULL GROUP BY {group_key} ORDER BY {group_key}",
+                params,
+            )
+            breakdown = [dict(r) for r in await cursor.fetchall()]
+
+        return {
+            "project_id": project_id,
+            "stage_number": stage_number,
+            "totals": totals,
+            "by_purpose": by_purpose,
+            ("by_agent" if stage_number is not None else "by_stage"): breakdown,
+        }
+
+    # --- Stage jobs ---
+
+    async def create_stage_job(self, job: StageJob) -> StageJob:
+        async with self._connect() as db:
+            await db.execute(
+                "INSERT INTO stage_jobs (id, project_id, stage_number, status, error, event_count, "
+                "idempotency_key, created_at, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (job.id, job.project_id, job.stage_number, job.status, job.error,
+                 job.event_count, job.idempotency_key, job.created_at, job.finished_at),
+            )
+            await db.commit()
+        return job
+
+    async def update_stage_job(self, job_id: str, **fields: object) -> None:
+        if not fields:
+            return
+        sets = ", ".join(f"{k} = ?" for k in fields)
+        vals = list(fields.values()) + [job_id]
+        async with self._connect() as db:
+            await db.execute(f"UPDATE stage_jobs SET {sets} WHERE id = ?", vals)
+            await db.commit()
+
+    async def get_stage_job(self, job_id: str) -> StageJob | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM stage_jobs WHERE id = ?", (job_id,))
+            row = await cursor.fetchone()
+            return self._row_to_job(row) if row else None
+
+    async def get_latest_stage_job(self, project_id: str, stage_number: int) -> StageJob | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM stage_jobs WHERE project_id = ? AND stage_number = ? "
+                "ORDER BY created_at DESC LIMIT 1",
+                (project_id, stage_number),
+            )
+            row = await cursor.fetchone()
+            return self._row_to_job(row) if row else None
+
+    async def get_stage_job_by_idempotency_key(
+        self, project_id: str, stage_number: int, idempotency_key: str,
+    ) -> StageJob | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM stage_jobs WHERE project_id = ? AND stage_number = ? "
+                "AND idempotency_key = ?",
+                (project_id, stage_number, idempotency_key),
+            )
+            row = await cursor.fetchone()
+            return self._row_to_job(row) if row else None
+
+    async def delete_stage_job(self, job_id: str) -> None:
+        async with self._connect() as db:
+            await db.execute("DELETE FROM stage_jobs WHERE id = ?", (job_id,))
+            await db.commit()
+
+    async def list_stage_jobs(self, status: JobStatus | None = None) -> list[StageJob]:
+        query = "SELECT * FROM stage_jobs"
+        params: list[object] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at"
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            return [self._row_to_job(r) for r in await cursor.fetchall()]
+
+    @staticmethod
+    def _row_to_job(row: aiosqlite.Row) -> StageJob:
+        return StageJob(
+            id=row["id"], project_id=row["project_id"], stage_number=row["stage_number"],
+            status=JobStatus(row["status"]), error=row["error"],
+            event_count=row["event_count"], idempotency_key=row["idempotency_key"],
+            created_at=row["created_at"], finished_at=row["finished_at"],
+        )
+
+    # --- Stage run locks ---
+
+    async def acquire_stage_run_lock(
+        self, lock: StageRunLock, replace_job_id: str | None = None,
+    ) -> StageRunLock:
+        """Take a stage's run lock unless an unexpired lease holds it.
+
+        ``replace_job_id`` also takes it over from that job's lease, expired
+        or not. Returns the lock as it stands afterwards: ``lock`` if it was
+        acquired, the current holder's otherwise.
+        """
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            # A single statement, so concurrent processes can't both win;
+            # julianday() orders the lease times whatever their ISO 8601 form
+            await db.execute(
+                "INSERT INTO stage_run_locks "
+                "(project_id, stage_number, job_id, owner, acquired_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (project_id, stage_number) DO UPDATE SET "
+                "job_id = excluded.job_id, owner = excluded.owner, "
+                "acquired_at = excluded.acquired_at, expires_at = excluded.expires_at "
+                "WHERE julianday(stage_run_locks.expires_at) < julianday(excluded.acquired_at) "
+                "OR stage_run_locks.job_id = ?",
+                (lock.project_id, lock.stage_number, lock.job_id, lock.owner,
+                 lock.acquired_at, lock.expires_at, replace_job_id),
+            )
+            await db.commit()
+            cursor = await db.execute(
+                "SELECT * FROM stage_run_locks WHERE project_id = ? AND stage_number = ?",
+                (lock.project_id, lock.stage_number),
+            )
+            row = await cursor.fetchone()
+        return self._row_to_lock(row) if row else lock
+
+    async def renew_stage_run_lock(self, job_id: str, expires_at: str) -> bool:
+        """Extend a job's lease; False if the job no longer holds the lock."""
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "UPDATE stage_run_locks SET expires_at = ? WHERE job_id = ?",
+                (expires_at, job_id),
+            )
+            await db.commit()
+            return cursor.rowcount > 0
+
+    async def release_stage_run_lock(self, job_id: str) -> None:
+        async with self._connect() as db:
+            await db.execute("DELETE FROM stage_run_locks WHERE job_id = ?", (job_id,))
+            await db.commit()
+
+    async def get_stage_run_lock(self, project_id: str, stage_number: int) -> StageRunLock | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM stage_run_locks WHERE project_id = ? AND stage_number = ?",
+                (project_id, stage_number),
+            )
+            row = await cursor.fetchone()
+            return self._row_to_lock(row) if row else None
+
+    @staticmethod
+    def _row_to_lock(row: aiosqlite.Row) -> StageRunLock:
+        return StageRunLock(
+            project_id=row["project_id"], stage_number=row["stage_number"],
+            job_id=row["job_id"], owner=row["owner"],
+            acquired_at=row["acquired_at"], expires_at=row["expires_at"],
+        )
+
+    async def append_stage_job_events(self, job_id: str, events: list[tuple[int, SSEEvent]]) -> None:
+        """Persist a batch of (sequence number, event) pairs of a job's event log."""
+        if not events:
+            return
+        async with self._connect() as db:
+            await db.executemany(
+                "INSERT OR REPLACE INTO stage_job_events (job_id, seq, event) VALUES (?, ?, ?)",
+                [(job_id, seq, event.model_dump_json()) for seq, event in events],
+            )
+            await db.commit()
+
+    async def delete_stage_job_deltas(self, job_id: str, agent_ids: list[str]) -> None:
+        """Drop the persisted text deltas of agents whose complete output is logged."""
+        if not agent_ids:
+            return
+        placeholders = ", ".join("?" for _ in agent_ids)
+        async with self._connect() as db:
+            await db.execute(
+                "DELETE FROM stage_job_events WHERE job_id = ? "
+                "AND json_extract(event, '$.type') = ? "
+                f"AND json_extract(event, '$.agent_id') IN ({placeholders})",
+                (job_id, SSEEventType.AGENT_DELTA.value, *agent_ids),
+            )
+            await db.commit()
+
+    async def list_stage_job_events(self, job_id: str, after: int = 0) -> list[tuple[int, SSEEvent]]:
+        """Return a job's persisted events with a sequence number above ``after``."""
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "SELECT seq, event FROM stage_job_events WHERE job_id = ? AND seq > ? ORDER BY seq",
+                (job_id, after),
+            )
+            rows = await cursor.fetchall()
+            return [(seq, SSEEvent.model_validate_json(event)) for seq, event in rows]
+
+    async def prune_stage_jobs(self, max_age_hours: int) -> None:
+        """Delete finished jobs, and their event logs, older than ``max_age_hours``."""
+        async with self._connect() as db:
+            await db.execute(
+                "DELETE FROM stage_job_events WHERE job_id IN "
+                "(SELECT id FROM stage_jobs WHERE status != 'running' AND created_at < ?)",
+                (_hours_ago(max_age_hours),),
+            )
+            await db.execute(
+                "DELETE FROM stage_jobs WHERE status != 'running' AND created_at < ?",
+                (_hours_ago(max_age_hours),),
+            )
+            await db.commit()
+
+    # --- Pipeline runs ---
+
+    async def save_pipeline_run(self, run: PipelineRun) -> None:
+        async with self._connect() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO pipeline_runs "
+                "(id, project_id, status, policy, start_stage, end_stage, current_stage, "
+                "stage_jobs, auto_approved, blockers, error, created_at, finished_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (run.id, run.project_id, run.status, run.policy.model_dump_json(),
+                 run.start_stage, run.end_stage, run.current_stage,
+                 json.dumps(run.stage_jobs), json.dumps(run.auto_approved), json.dumps(run.blockers),
+                 run.error, run.created_at, run.finished_at),
+            )
+            await db.commit()
+
+    async def get_pipeline_run(self, run_id: str) -> PipelineRun | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute("SELECT * FROM pipeline_runs WHERE id = ?", (run_id,))
+            row = await cursor.fetchone()
+            return self._row_to_pipeline_run(row) if row else None
+
+    async def get_latest_pipeline_run(self, project_id: str) -> PipelineRun | None:
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(
+                "SELECT * FROM pipeline_runs WHERE project_id = ? ORDER BY created_at DESC LIMIT 1",
+                (project_id,),
+            )
+            row = await cursor.fetchone()
+            return self._row_to_pipeline_run(row) if row else None
+
+    async def list_pipeline_runs(self, status: PipelineStatus | None = None) -> list[PipelineRun]:
+        query = "SELECT * FROM pipeline_runs"
+        params: list[object] = []
+        if status is not None:
+            query += " WHERE status = ?"
+            params.append(status)
+        query += " ORDER BY created_at"
+        async with self._connect() as db:
+            db.row_factory = aiosqlite.Row
+            cursor = await db.execute(query, params)
+            return [self._row_to_pipeline_run(r) for r in await cursor.fetchall()]
+
+    @staticmethod
+    def _row_to_pipeline_run(row: aiosqlite.Row) -> PipelineRun:
+        return PipelineRun(
+            id=row["id"], project_id=row["project_id"], status=PipelineStatus(row["status"]),
+            policy=json.loads(row["policy"]), start_stage=row["start_stage"],
+            end_stage=row["end_stage"], current_stage=row["current_stage"],
+            stage_jobs=json.loads(row["stage_jobs"] or "{}"),
+            auto_approved=json.loads(row["auto_approved"] or "[]"),
+            blockers=json.loads(row["blockers"] or "[]"),
+            error=row["error"], created_at=row["created_at"], finished_at=row["finished_at"],
+        )
+
+    # --- LLM response cache ---
+
+    async def get_cached_response(self, key: str, ttl_seconds: int) -> str | None:
+        """Return a cached LLM response if present and younger than ``ttl_seconds``."""
+        async with self._connect() as db:
+            cursor = await db.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND created_at >= datetime('now', ?)",
+                (key, f"-{int(ttl_seconds)} seconds"),
+            )
+            row = await cursor.fetchone()
+            return row[0] if row else None
+
+    async def put_cached_response(
+        self, key: str, model: str, response: str, ttl_seconds: int, max_rows: int
+    ) -> None:
+        """Store an LLM response, then drop expired rows and the oldest beyond ``max_rows``."""
+        async with self._connect() as db:
+            await db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, model, response, created_at) "
+                "VALUES (?, ?, ?, datetime('now'))",
+                (key, model, response),
+            )
+            await db.execute(
+                "DELETE FROM llm_cache WHERE created_at < datetime('now', ?)",
+                (f"-{int(ttl_seconds)} seconds",),
+            )
+            await db.execute(
+                "DELETE FROM llm_cache WHERE key NOT IN "
+                "(SELECT key FROM llm_cache ORDER BY created_at DESC LIMIT ?)",
+                (max_rows,),
+            )
+            await db.commit()
+
     # --- Documents ---
 
     async def create_document(
@@ -0,0 +1,100 @@
+"""Shared fixtures: a fresh database, fake-server LLM clients, and the stage routes."""
+
+from __future__ import annotations
+
+from collections.abc import AsyncIterator
+
+import httpx
+import pytest
+from fastapi import FastAPI
+
+from sor.engine.defaults import DEFAULT_AGENTS
+from sor.engine.fake_server import FakeServerConfig, _FakeMessages
+from sor.engine.jobs import JobManager
+from sor.engine.llm_client import LLMClient
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.providers import FakeProvider
+from sor.main import app_state
+from sor.models import Project
+from sor.routes import stages
+from sor.store.database import Database
+
+
+def fast_config(**overrides) -> FakeServerConfig:
+    """A fake server that answers at once with short responses."""
+    settings = {
+        "ttft_ms": 0.0,
+        "ttft_distribution": "fixed",
+        "tokens_per_second": 100_000.0,
+        "output_tokens": 40,
+    }
+    settings.update(overrides)
+    return FakeServerConfig(**settings)
+
+
+@pytest.fixture
+async def db(tmp_path) -> Database:
+    database = Database(str(tmp_path / "sor.db"))
+    await database.initialize()
+    for agent in DEFAULT_AGENTS:
+        await database.create_agent(agent)
+    return database
+
+
+@pytest.fixture
+async def make_llm():
+    """Build LLMClients on the in-process fake server; closed after the test."""
+    clients: list[LLMClient] = []
+
+    def make(config: FakeServerConfig | None = None, **kwargs) -> LLMClient:
+        provider = FakeProvider(config=config or fast_config())
+        client = LLMClient(api_key="test", provider=provider, **kwargs)
+        clients.append(client)
+        return client
+
+    yield make
+    for client in clients:
+        await client.close()
+
+
+@pytest.fixture
+def requests(monkeypatch) -> list[dict]:
+    """Every request the fake server plans a response for."""
+    seen: list[dict] = []
+    plan = _FakeMessages.plan
+
+    def recording(self, params: dict) -> dict:
+        seen.append(params)
+        return plan(self, params)
+
+    monkeypatch.setattr(_FakeMessages, "plan", recording)
+    return seen
+
+
+@pytest.fixture
+async def project(db: Database) -> Project:
+    created = Project(name="Test", research_question="Does caffeine improve recall?")
+    await db.create_project(created)
+    await db.clone_defaults_for_project(created.id)
+    return created
+
+
+@pytest.fixture
+async def api(db: Database, make_llm, monkeypatch) -> AsyncIterator[httpx.AsyncClient]:
+    """A client for the stage routes, served from ``db`` and the fake server.
+
+    The routes find their components in ``app_state``; tests can swap one
+    (say, the admission controller) with ``monkeypatch.setitem``.
+    """
+    orchestrator = StageOrchestrator(make_llm(), db)
+    jobs = JobManager(orchestrator, db)
+    monkeypatch.setitem(app_state, "db", db)
+    monkeypatch.setitem(app_state, "orchestrator", orchestrator)
+    monkeypatch.setitem(app_state, "jobs", jobs)
+    app = FastAPI()
+    app.include_router(stages.router)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        yield client
+    await jobs.shutdown()
+    await orchestrator.shutdown()
@@ -0,0 +1,100 @@
+import pytest
+
+from sor.engine.admission import AdmissionController, AdmissionRefused
+from sor.engine.jobs import JobManager
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.retry import CircuitBreaker
+from sor.engine.scheduler import Lane, StageScheduler
+from sor.main import app_state
+
+from .conftest import fast_config
+from .test_jobs import collect
+
+
+def make_admission(jobs: JobManager, scheduler: StageScheduler | None = None, **kwargs):
+    return AdmissionController(
+        scheduler or StageScheduler(), jobs, kwargs.pop("breaker", CircuitBreaker()), **kwargs,
+    )
+
+
+async def refusal(admission: AdmissionController, agent_count: int, lane=Lane.INTERACTIVE):
+    with pytest.raises(AdmissionRefused) as refused:
+        await admission.admit(agent_count, lane)
+    return refused.value.refusal
+
+
+async def test_a_burst_counts_the_runs_admitted_before_it(db, make_llm):
+    jobs = JobManager(StageOrchestrator(make_llm(), db), db)
+    admission = make_admission(jobs, max_queued_calls=6)
+
+    first = await admission.admit(4)
+    # Nothing has reached the scheduler yet, but the first run's calls count
+    refused = await refusal(admission, 4)
+    assert refused.status_code == 429
+    assert refused.retry_after >= 1
+
+    for _ in range(4):
+        first.take_call()
+    second = await admission.admit(4)
+    first.release()
+    assert admission.status()["agent_calls"]["reserved"] == 4
+    second.release()
+    assert admission.status()["agent_calls"]["reserved"] == 0
+    assert admission.status()["stage_runs"]["starting"] == 0
+
+
+async def test_a_starting_run_counts_as_running(db, make_llm):
+    jobs = JobManager(StageOrchestrator(make_llm(), db), db)
+    admission = make_admission(jobs, max_running_stages=1)
+
+    reservation = await admission.admit(1)
+
+    assert "1 stage runs" in (await refusal(admission, 1)).reason
+    reservation.release()
+    (await admission.admit(1)).release()
+
+
+async def test_batch_runs_get_half_the_queue(db, make_llm):
+    jobs = JobManager(StageOrchestrator(make_llm(), db), db)
+    admission = make_admission(jobs, max_queued_calls=8)
+
+    assert (await refusal(admission, 5, Lane.BATCH)).status_code == 429
+    (await admission.admit(5)).release()
+
+
+async def test_a_run_hands_its_reservation_over_as_it_starts(db, make_llm, project):
+    scheduler = StageScheduler(max_concurrency=2)
+    jobs = JobManager(StageOrchestrator(make_llm(fast_config()), db, scheduler=scheduler), db)
+    admission = make_admission(jobs, scheduler)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+
+    reservation = await admission.admit(len(agents))
+    job = await jobs.start(project, 1, agents, reservation=reservation)
+    assert admission.status()["stage_runs"] == {"running": 1, "starting": 0, "max_running": None}
+    await collect(jobs, job.id)
+
+    # Every call took itself off the reservation on entering the scheduler
+    assert reservation.calls == 0
+    assert scheduler.stats()["granted"] == len(agents)
+    status = admission.status()
+    assert status["state"] == "ok"
+    assert status["agent_calls"]["reserved"] == 0
+    assert status["stage_runs"]["running"] == 0
+
+
+async def test_routes_refuse_runs_with_retry_after(api, db, project, monkeypatch):
+    breaker = CircuitBreaker(failure_threshold=1, cooldown=30.0)
+    admission = make_admission(app_state["jobs"], breaker=breaker, max_queued_calls=2)
+    monkeypatch.setitem(app_state, "admission", admission)
+    url = f"/api/projects/{project.id}/stages/1/run"
+
+    # Stage 1 has four agents, more than the queue allows
+    response = await api.get(url)
+    assert response.status_code == 429
+    assert int(response.headers["retry-after"]) >= 1
+
+    breaker.record_failure()
+    response = await api.get(url)
+    assert response.status_code == 503
+    assert 1 <= int(response.headers["retry-after"]) <= 30
+    assert await db.list_stage_jobs() == []
@@ -0,0 +1,67 @@
+import asyncio
+from contextlib import aclosing
+
+from sor.engine.broadcast import BroadcastHub
+from sor.engine.jobs import JobManager
+from sor.engine.orchestrator import StageOrchestrator
+from sor.models import SSEEvent, SSEEventType
+
+from .conftest import fast_config
+
+
+def event(n: int) -> SSEEvent:
+    return SSEEvent(type=SSEEventType.AGENT_DELTA, data={"text": str(n)})
+
+
+async def test_a_lagging_subscriber_catches_up_from_the_backlog():
+    hub = BroadcastHub(queue_size=2)
+    channel = hub.open("project", 1, "job")
+    received: list[int] = []
+
+    async def follow() -> None:
+        async with aclosing(channel.subscribe(heartbeat=None)) as events:
+            async for seq, _ in events:
+                received.append(seq)
+
+    follower = asyncio.create_task(follow())
+    await asyncio.sleep(0)
+    # Published without yielding: the subscriber's queue overflows
+    for n in range(10):
+        channel.publish(event(n))
+    # It stopped taking pushes once full, and no publish waited on it
+    (subscriber,) = channel._subscribers
+    assert subscriber.lagging and subscriber.queue.qsize() == 2
+    hub.close(channel)
+    await follower
+
+    assert received == list(range(1, 11))
+    assert hub.stats() == {"channels": 0, "subscribers": 0}
+
+
+async def test_a_slow_viewer_neither_loses_events_nor_holds_up_the_run(db, make_llm, project):
+    hub = BroadcastHub(queue_size=2)
+    jobs = JobManager(StageOrchestrator(make_llm(fast_config()), db), db, hub=hub)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    job = await jobs.start(project, 1, agents)
+    run_finished = asyncio.Event()
+
+    async def view(stall: bool) -> list[int]:
+        seqs: list[int] = []
+        async with aclosing(jobs.events(job.id)) as events:
+            async for item in events:
+                if item is None:
+                    continue
+                seqs.append(item[0])
+                if stall and len(seqs) == 1:
+                    # Stop reading until the whole run has been published
+                    await run_finished.wait()
+        return seqs
+
+    slow = asyncio.create_task(view(stall=True))
+    fast = await view(stall=False)
+    run_finished.set()
+    slow_seqs = await slow
+
+    assert fast == list(range(1, len(fast) + 1))
+    assert slow_seqs == fast
+    assert len(fast) > 2
@@ -0,0 +1,61 @@
+import asyncio
+
+from sor.engine.jobs import JobManager
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.rate_limiter import RateLimiter
+from sor.models import JobStatus, SSEEventType, StageStatus
+
+from .conftest import fast_config
+from .test_jobs import collect
+
+
+async def test_cancel_stops_the_agents_and_frees_their_capacity(db, make_llm, project):
+    limiter = RateLimiter(max_concurrency=8)
+    llm = make_llm(fast_config(ttft_ms=5000.0), rate_limiter=limiter)
+    jobs = JobManager(StageOrchestrator(llm, db), db)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    loop = asyncio.get_running_loop()
+
+    job = await jobs.start(project, 1, agents)
+    await asyncio.sleep(0.1)
+    # The first agent is priming the prompt cache; the others wait on it
+    assert limiter.stats()["in_flight"] == 1
+    started = loop.time()
+    await jobs.cancel(job.id)
+
+    # The requests were aborted rather than waited out
+    assert loop.time() - started < 1.0
+    assert limiter.stats()["in_flight"] == 0
+    assert llm.stats()["single_flight"]["in_flight"] == 0
+
+    events = await collect(jobs, job.id)
+    ended = events[-1][1]
+    assert ended.type == SSEEventType.STAGE_CANCELLED
+    assert (await jobs.get(job.id)).status == JobStatus.CANCELLED
+
+    # Only the agent that had started keeps an output, marked cancelled
+    result = await db.get_stage_result(project.id, 1)
+    assert result.status == StageStatus.CANCELLED
+    (partial,) = result.agent_outputs
+    assert partial.status == "cancelled"
+    assert [p["output_id"] for p in ended.data["partial_outputs"]] == [partial.id]
+    assert await db.get_stage_run_lock(project.id, 1) is None
+
+
+async def test_a_cancelled_stage_is_finished_by_a_rerun(db, make_llm, project):
+    slow = JobManager(StageOrchestrator(make_llm(fast_config(ttft_ms=5000.0)), db), db)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    job = await slow.start(project, 1, agents)
+    await asyncio.sleep(0.1)
+    await slow.cancel(job.id)
+
+    jobs = JobManager(StageOrchestrator(make_llm(), db), db)
+    checkpoint = await db.get_stage_result(project.id, 1)
+    rerun = await jobs.start(project, 1, agents, checkpoint=checkpoint)
+    events = await collect(jobs, rerun.id)
+
+    assert events[-1][1].type == SSEEventType.STAGE_COMPLETE
+    result = await db.get_stage_result(project.id, 1)
+    assert result.status == StageStatus.COMPLETE
+    assert {o.status for o in result.agent_outputs} == {"complete"}
+    assert len(result.agent_outputs) == len(agents)
@@ -0,0 +1,72 @@
+from sor.engine.context_budget import (
+    CONTEXT_WINDOW,
+    SAFETY_MARGIN,
+    TRIM_MARKER,
+    ContextSection,
+    estimate_tokens,
+    pack_sections,
+    prompt_budget,
+)
+
+# Digits and punctuation cost a token per character, short words far less,
+# so a cut placed by the average characters per token lands too late
+DENSE_THEN_SPARSE = "1,2,3,4,5\n" * 400 + "ab cd " * 700
+
+
+def test_prompt_budget_sets_aside_output_margin_and_instructions():
+    instructions = "Answer briefly."
+
+    budget = prompt_budget(4096, instructions)
+
+    assert budget == int(CONTEXT_WINDOW * (1 - SAFETY_MARGIN)) - 4096 - estimate_tokens(instructions)
+
+
+def test_trimmed_section_fits_the_remaining_budget():
+    packed = pack_sections(
+        [
+            ContextSection(key="question", text="What matters most?", priority=0, trimmable=False),
+            ContextSection(key="documents", text=DENSE_THEN_SPARSE, priority=1),
+        ],
+        budget=1000,
+    )
+
+    assert packed.decisions == {"question": "full", "documents": "trimmed"}
+    assert packed.texts["documents"].endswith(TRIM_MARKER)
+    assert sum(estimate_tokens(text) for text in packed.texts.values()) <= 1000
+    assert packed.estimated_tokens <= 1000
+
+
+def test_trims_at_a_line_break():
+    packed = pack_sections(
+        [ContextSection(key="notes", text=DENSE_THEN_SPARSE, priority=0)], budget=500,
+    )
+
+    kept = packed.texts["notes"].removesuffix(TRIM_MARKER)
+    assert kept.endswith("1,2,3,4,5")
+    assert estimate_tokens(packed.texts["notes"]) <= 500
+
+
+def test_prefers_the_fallback_to_trimming():
+    packed = pack_sections(
+        [
+            ContextSection(key="question", text="What matters most?", priority=0),
+            ContextSection(key="stage_1", text="word " * 5000, priority=1, fallback="A short digest."),
+        ],
+        budget=1000,
+    )
+
+    assert packed.decisions["stage_1"] == "summarised"
+    assert packed.texts["stage_1"] == "A short digest."
+
+
+def test_drops_what_cannot_be_trimmed_usefully():
+    packed = pack_sections(
+        [
+            ContextSection(key="question", text="word " * 900, priority=0),
+            ContextSection(key="documents", text="word " * 5000, priority=1),
+            ContextSection(key="context", text="word " * 5000, priority=2, trimmable=False),
+        ],
+        budget=1000,
+    )
+
+    assert packed.decisions == {"question": "full", "documents": "dropped", "context": "dropped"}
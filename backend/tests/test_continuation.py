@@ -0,0 +1,63 @@
+from sor.engine.response_cache import ResponseCache
+from sor.engine.usage import track_usage
+
+from .conftest import fast_config
+
+
+async def test_continues_a_truncated_response_from_a_prefill(make_llm, requests):
+    llm = make_llm(fast_config(output_tokens=40), max_continuations=2)
+
+    with track_usage("test") as calls:
+        text = await llm.complete("You are verbose.", "Tell me everything.", max_tokens=5)
+
+    assert len(requests) == 3
+    assert [c.stop_reason for c in calls] == ["max_tokens"] * 3
+    first_part = requests[1]["messages"][-1]
+    assert first_part["role"] == "assistant"
+    assert text.startswith(first_part["content"])
+    assert requests[2]["messages"][-1]["content"].startswith(first_part["content"])
+    assert len(text.split()) == 15
+
+
+async def test_stops_once_the_response_ends(make_llm, requests):
+    llm = make_llm(fast_config(output_tokens=10), max_continuations=2)
+
+    with track_usage("test") as calls:
+        await llm.complete("You are terse.", "Say something.", max_tokens=1000)
+
+    assert len(requests) == 1
+    assert calls[0].stop_reason == "end_turn"
+
+
+async def test_streamed_continuation_yields_one_seamless_text(make_llm, requests):
+    llm = make_llm(fast_config(output_tokens=40), max_continuations=1)
+
+    stream = llm.complete_stream("You are verbose.", "Tell me everything.", max_tokens=4)
+    chunks = [chunk async for chunk in stream]
+
+    assert len(requests) == 2
+    text = "".join(chunks)
+    assert len(text.split()) == 8
+    assert "  " not in text
+
+
+async def test_tool_input_is_not_continued(make_llm, requests):
+    tool = {
+        "name": "record",
+        "description": "Record the answer.",
+        "input_schema": {"type": "object", "properties": {"answer": {"type": "string"}}},
+    }
+
+    await make_llm(max_continuations=2).complete_tool("Answer.", "Question.", [tool], max_tokens=2)
+
+    assert len(requests) == 1
+
+
+async def test_the_joined_text_is_cached(make_llm, requests, db):
+    llm = make_llm(fast_config(output_tokens=40), cache=ResponseCache(db), max_continuations=2)
+
+    text = await llm.complete("You are verbose.", "Tell me everything.", max_tokens=5, temperature=0.0)
+    again = await llm.complete("You are verbose.", "Tell me everything.", max_tokens=5, temperature=0.0)
+
+    assert again == text
+    assert len(requests) == 3
@@ -0,0 +1,181 @@
+import asyncio
+from contextlib import aclosing
+from datetime import datetime, timedelta, timezone
+
+from sor.engine.jobs import JobManager, parse_event_id
+from sor.engine.orchestrator import StageOrchestrator
+from sor.models import (
+    JobStatus, SSEEvent, SSEEventType, StageJob, StageRunLock, StageStatus, lease_time,
+)
+from sor.store.database import Database
+
+from .conftest import fast_config
+
+
+def make_jobs(db: Database, llm, **kwargs) -> JobManager:
+    return JobManager(StageOrchestrator(llm, db), db, **kwargs)
+
+
+async def collect(jobs: JobManager, job_id: str, after: int = 0) -> list[tuple[int, SSEEvent]]:
+    """Every event of a job after ``after``, until its log ends."""
+    async with aclosing(jobs.events(job_id, after)) as events:
+        return [item async for item in events if item is not None]
+
+
+async def evicted(jobs: JobManager, job_id: str) -> None:
+    """Wait until a finished job has been persisted and dropped from memory."""
+    async with asyncio.timeout(5):
+        while jobs.is_local(job_id):
+            await asyncio.sleep(0.01)
+
+
+def test_parse_event_id():
+    assert parse_event_id("job-1:42") == ("job-1", 42)
+    assert parse_event_id("job-1:") is None
+    assert parse_event_id("job-1:x") is None
+    assert parse_event_id(":3") is None
+
+
+async def test_replays_after_last_event_id_once_evicted(db, make_llm, project):
+    jobs = make_jobs(db, make_llm(), retention_seconds=0)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+
+    job = await jobs.start(project, 1, agents)
+    live = await collect(jobs, job.id)
+    await evicted(jobs, job.id)
+
+    last_seen = live[2][0]
+    replayed = await collect(jobs, job.id, after=last_seen)
+
+    # Deltas of agents whose complete output was logged are not kept
+    expected = [
+        (seq, event.type) for seq, event in live
+        if seq > last_seen and event.type != SSEEventType.AGENT_DELTA
+    ]
+    assert [(seq, event.type) for seq, event in replayed] == expected
+    assert replayed[-1][1].type == SSEEventType.STAGE_COMPLETE
+    assert (await jobs.get(job.id)).status == JobStatus.COMPLETE
+
+
+async def test_a_reconnecting_viewer_gets_every_event_it_missed(db, make_llm, project):
+    jobs = make_jobs(db, make_llm())
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    job = await jobs.start(project, 1, agents)
+
+    seen: list[int] = []
+    async with aclosing(jobs.events(job.id)) as events:
+        async for item in events:
+            if item is not None:
+                seen.append(item[0])
+            if len(seen) == 3:
+                break
+    rest = await collect(jobs, job.id, after=seen[-1])
+
+    seqs = seen + [seq for seq, _ in rest]
+    assert seqs == list(range(1, len(seqs) + 1))
+    assert rest[-1][1].type == SSEEventType.STAGE_COMPLETE
+
+
+async def test_only_one_of_two_managers_runs_a_stage(db, make_llm, project, tmp_path):
+    other_db = Database(str(tmp_path / "sor.db"))
+    await other_db.initialize()
+    slow = fast_config(ttft_ms=300.0)
+    jobs_a = make_jobs(db, make_llm(slow), owner="host-a:1")
+    jobs_b = make_jobs(other_db, make_llm(slow), owner="host-b:1")
+    agents = await db.list_agents(stage=1, project_id=project.id)
+
+    job_a, job_b = await asyncio.gather(
+        jobs_a.start(project, 1, agents), jobs_b.start(project, 1, agents),
+    )
+
+    assert job_a.id == job_b.id
+    assert jobs_a.is_local(job_a.id) != jobs_b.is_local(job_a.id)
+    assert [job.id for job in await db.list_stage_jobs()] == [job_a.id]
+
+    # The other manager follows the run through the persisted log
+    follower = jobs_b if jobs_a.is_local(job_a.id) else jobs_a
+    followed = await collect(follower, job_a.id)
+    assert followed[0][1].type == SSEEventType.STAGE_START
+    assert followed[-1][1].type == SSEEventType.STAGE_COMPLETE
+    assert (await follower.get(job_a.id)).status == JobStatus.COMPLETE
+
+
+async def test_a_job_that_loses_its_lock_leaves_the_stage_alone(db, make_llm, project):
+    jobs = make_jobs(db, make_llm(fast_config(ttft_ms=5000.0)), retention_seconds=0, lock_ttl=0.3)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    job = await jobs.start(project, 1, agents)
+
+    # Another process takes the stage over
+    thief = StageJob(project_id=project.id, stage_number=1)
+    await db.create_stage_job(thief)
+    await db.acquire_stage_run_lock(
+        StageRunLock(
+            project_id=project.id, stage_number=1, job_id=thief.id, owner="host-b:1",
+            expires_at=(datetime.now(timezone.utc) + timedelta(minutes=1)).isoformat(),
+        ),
+        replace_job_id=job.id,
+    )
+
+    events = await collect(jobs, job.id)
+    await evicted(jobs, job.id)
+
+    types = [event.type for _, event in events]
+    assert SSEEventType.STAGE_CANCELLED not in types
+    assert types[-1] == SSEEventType.STAGE_ERROR
+    finished = await db.get_stage_job(job.id)
+    assert finished.status == JobStatus.FAILED
+    assert "taken over" in finished.error
+
+    result = await db.get_stage_result(project.id, 1)
+    assert result.status == StageStatus.RUNNING
+    assert result.agent_outputs == []
+    lock = await db.get_stage_run_lock(project.id, 1)
+    assert lock.job_id == thief.id
+
+
+async def test_an_idempotency_key_gets_the_same_job(db, make_llm, project):
+    jobs = make_jobs(db, make_llm(fast_config(ttft_ms=200.0)))
+    agents = await db.list_agents(stage=1, project_id=project.id)
+
+    first, second = await asyncio.gather(
+        jobs.start(project, 1, agents, idempotency_key="retry-1"),
+        jobs.start(project, 1, agents, idempotency_key="retry-1"),
+    )
+    await collect(jobs, first.id)
+
+    assert second.id == first.id
+    assert (await jobs.find(project.id, 1, "retry-1")).id == first.id
+    assert [job.id for job in await db.list_stage_jobs()] == [first.id]
+
+
+async def test_lease_expiry_compares_times_not_text(db, project):
+    # Written by another process: whole seconds, in another UTC offset
+    plus_two = timezone(timedelta(hours=2))
+    expired = (datetime.now(plus_two) - timedelta(seconds=5)).replace(microsecond=0)
+    await db.acquire_stage_run_lock(StageRunLock(
+        project_id=project.id, stage_number=1, job_id="old", owner="host-b:1",
+        acquired_at=expired.isoformat(), expires_at=expired.isoformat(),
+    ))
+
+    taken = await db.acquire_stage_run_lock(StageRunLock(
+        project_id=project.id, stage_number=1, job_id="new", owner="host-a:1",
+        expires_at=lease_time(datetime.now(timezone.utc) + timedelta(minutes=1)),
+    ))
+    assert taken.job_id == "new"
+
+    live = (datetime.now(plus_two) + timedelta(minutes=1)).replace(microsecond=0)
+    await db.acquire_stage_run_lock(StageRunLock(
+        project_id=project.id, stage_number=2, job_id="live", owner="host-b:1",
+        expires_at=live.isoformat(),
+    ))
+    held = await db.acquire_stage_run_lock(StageRunLock(
+        project_id=project.id, stage_number=2, job_id="new", owner="host-a:1",
+        expires_at=lease_time(datetime.now(timezone.utc) + timedelta(minutes=1)),
+    ))
+    assert held.job_id == "live"
+
+
+def test_lease_time_keeps_microseconds():
+    moment = datetime(2026, 1, 1, 12, 0, 5, tzinfo=timezone(timedelta(hours=2)))
+
+    assert lease_time(moment) == "2026-01-01T10:00:05.000000+00:00"
@@ -0,0 +1,49 @@
+import pytest
+
+from sor.engine.json_repair import parse_partial_json
+
+
+@pytest.mark.parametrize(
+    ("text", "expected"),
+    [
+        ('{"a": 1}', {"a": 1}),
+        ('Here you go:\n```json\n{"a": 1}\n```\nThanks', {"a": 1}),
+        ('Sure! {"ok": true} is the answer', {"ok": True}),
+        ('```json\n{"a": [1, 2', {"a": [1, 2]}),
+        ('{"a": "hel', {"a": "hel"}),
+        ('{"a": 1, "b', {"a": 1}),
+        ('{"a": 1, "b":', {"a": 1}),
+        ('{"a": 1.5, "b": tr', {"a": 1.5}),
+        ('{"a": "say \\"hi', {"a": 'say "hi'}),
+        ('{"a": "x\\', {}),
+        ('{"items": [{"x": 1}, {"x": 2', {"items": [{"x": 1}, {"x": 2}]}),
+        ('{"a": {"b": {"c": "deep', {"a": {"b": {"c": "deep"}}}),
+        ('{"a": [1, 2,],}', {"a": [1, 2]}),
+        ("[1, 2, 3", [1, 2, 3]),
+    ],
+)
+def test_recovers(text, expected):
+    assert parse_partial_json(text) == expected
+
+
+@pytest.mark.parametrize("text", ["", "no json here", "```\nplain text\n```"])
+def test_rejects_text_without_json(text):
+    with pytest.raises(ValueError):
+        parse_partial_json(text)
+
+
+async def test_tool_input_cut_off_at_max_tokens_keeps_finished_fields(make_llm):
+    tool = {
+        "name": "record_findings",
+        "description": "Record findings.",
+        "input_schema": {
+            "type": "object",
+            "properties": {"title": {"type": "string"}, "notes": {"type": "string"}},
+            "required": ["title", "notes"],
+        },
+    }
+    partial = await make_llm().complete_tool("Summarise.", "Findings.", [tool], max_tokens=3)
+
+    # Cut off inside the second field: only the first one is kept
+    assert list(partial) == ["title"]
+    assert partial["title"]
@@ -0,0 +1,49 @@
+import asyncio
+from collections import Counter
+from contextlib import aclosing
+
+from sor.engine import orchestrator as orchestrator_module
+from sor.engine.broadcast import BroadcastHub
+from sor.engine.jobs import JobManager
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.pipeline import PipelineRunner
+from sor.models import ApprovalMode, ApprovalPolicy, PipelineStatus, SSEEventType
+
+
+async def test_the_next_stage_gets_the_digest_built_during_approval(
+    db, make_llm, project, requests, monkeypatch,
+):
+    builds: Counter[int] = Counter()
+    build = orchestrator_module.build_stage_digest
+
+    async def slow_build(stage_result, llm_client):
+        builds[stage_result.stage_number] += 1
+        await asyncio.sleep(0.3)
+        return await build(stage_result, llm_client)
+
+    monkeypatch.setattr(orchestrator_module, "build_stage_digest", slow_build)
+    hub = BroadcastHub()
+    orchestrator = StageOrchestrator(make_llm(), db)
+    jobs = JobManager(orchestrator, db, hub=hub)
+    pipelines = PipelineRunner(orchestrator, jobs, db, hub)
+
+    run = await pipelines.start(
+        project, 1, policy=ApprovalPolicy(mode=ApprovalMode.ALWAYS), end_stage=2,
+    )
+    async with aclosing(pipelines.events(run.id)) as events:
+        feed = [item[1].type async for item in events if item is not None]
+
+    assert feed[-1] == SSEEventType.PIPELINE_COMPLETE
+    assert (await pipelines.get(run.id)).status == PipelineStatus.COMPLETE
+    # Approval reused the build started once the conflict report existed
+    assert builds[1] == 1
+    # Stage 2's agents were sent the digest, not the full stage 1 text
+    stage_two_contexts = [
+        block["text"] for params in requests for block in params.get("system", [])
+        if isinstance(block, dict) and "## Stage 1" in block["text"] and "Approved" in block["text"]
+    ]
+    assert stage_two_contexts
+    for text in stage_two_contexts:
+        assert "## Stage 1: Problem Framing (Approved, digest)" in text
+        assert "## Stage 1 (Approved)" not in text
+    await orchestrator.shutdown()
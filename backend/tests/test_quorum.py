@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from sor.engine.fake_server import _FakeMessages
+from sor.engine.orchestrator import STRAGGLER_STOPPED, StageOrchestrator
+from sor.models import SSEEvent, SSEEventType, StageStatus
+
+
+@pytest.fixture
+def slow_agents(monkeypatch) -> dict[str, float]:
+    """Seconds to first token for the agents whose system prompt is a key."""
+    delays: dict[str, float] = {}
+    plan = _FakeMessages.plan
+
+    def delayed(self, params: dict) -> dict:
+        planned = plan(self, params)
+        for block in params.get("system", []):
+            if isinstance(block, dict) and block.get("text") in delays:
+                planned["ttft"] = delays[block["text"]]
+        return planned
+
+    monkeypatch.setattr(_FakeMessages, "plan", delayed)
+    return delays
+
+
+async def run_stage(orchestrator, db, project) -> tuple[list[SSEEvent], list]:
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    project = await db.get_project(project.id)
+    events = [event async for event in orchestrator.run_stage(project, 1, agents)]
+    return events, agents
+
+
+def conflict_events(events: list[SSEEvent]) -> list[tuple[SSEEventType, bool]]:
+    kinds = (SSEEventType.CONFLICT_START, SSEEventType.CONFLICT_COMPLETE)
+    return [(e.type, bool(e.data.get("partial"))) for e in events if e.type in kinds]
+
+
+async def test_late_outputs_are_folded_into_the_quorum_report(
+    db, make_llm, project, slow_agents, requests,
+):
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    late = agents[-1]
+    slow_agents[late.system_prompt] = 0.4
+    orchestrator = StageOrchestrator(make_llm(), db, quorum=0.75)
+
+    events, _ = await run_stage(orchestrator, db, project)
+
+    types = [(e.type, e.agent_id) for e in events]
+    late_done = types.index((SSEEventType.AGENT_COMPLETE, late.id))
+    starts = [(i, e) for i, e in enumerate(events) if e.type == SSEEventType.CONFLICT_START]
+    (_, first_start), (fold, fold_start), (_, final_start) = starts
+    # Detection started on the quorum and reported before the late agent finished
+    assert first_start.data == {**first_start.data, "partial": True, "agent_count": 3}
+    assert types.index((SSEEventType.CONFLICT_COMPLETE, None)) < late_done
+    # The late output was then folded in, leaving nothing for the final pass
+    assert fold > late_done
+    assert fold_start.data["late_agents"] == 1
+    assert final_start.data["late_agents"] == 0
+
+    # The update sends the late output in full, and the report for the others
+    result = await db.get_stage_result(project.id, 1)
+    outputs = {o.agent_id: o for o in result.agent_outputs}
+    assert {o.status for o in outputs.values()} == {"complete"}
+    update = requests[-1]["system"][0]["text"]
+    assert outputs[late.id].content in update
+    assert all(outputs[a.id].content not in update for a in agents[:-1])
+
+
+async def test_stragglers_are_stopped_at_the_deadline(db, make_llm, project, slow_agents):
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    straggler = agents[-1]
+    slow_agents[straggler.system_prompt] = 30.0
+    # Every agent is needed for the quorum; the deadline still applies
+    orchestrator = StageOrchestrator(make_llm(), db, stage_deadline=0.5)
+    loop = asyncio.get_running_loop()
+
+    started = loop.time()
+    events, _ = await run_stage(orchestrator, db, project)
+
+    assert loop.time() - started < 2.0
+    assert events[-1].type == SSEEventType.STAGE_COMPLETE
+    result = await db.get_stage_result(project.id, 1)
+    assert result.status == StageStatus.COMPLETE
+    stopped = [o for o in result.agent_outputs if o.agent_id == straggler.id]
+    assert [(o.status, o.error) for o in stopped] == [("cancelled", STRAGGLER_STOPPED)]
+    assert sum(o.status == "complete" for o in result.agent_outputs) == len(agents) - 1
+
+
+async def test_a_late_output_before_the_deadline_is_kept(db, make_llm, project, slow_agents):
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    late, straggler = agents[-2], agents[-1]
+    slow_agents[late.system_prompt] = 0.3
+    slow_agents[straggler.system_prompt] = 30.0
+    orchestrator = StageOrchestrator(make_llm(), db, quorum=0.5, stage_deadline=1.0)
+
+    events, _ = await run_stage(orchestrator, db, project)
+
+    result = await db.get_stage_result(project.id, 1)
+    statuses = {o.agent_id: o.status for o in result.agent_outputs}
+    assert statuses[late.id] == "complete"
+    assert statuses[straggler.id] == "cancelled"
+    # Detection started on the quorum; the late agent was folded in after
+    late_done = [(e.type, e.agent_id) for e in events].index((SSEEventType.AGENT_COMPLETE, late.id))
+    assert any(
+        e.data.get("partial") and e.data["late_agents"]
+        for e in events[late_done:] if e.type == SSEEventType.CONFLICT_START
+    )
+    assert result.conflict_report is not None
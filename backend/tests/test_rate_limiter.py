@@ -0,0 +1,68 @@
+import asyncio
+
+from sor.engine.rate_limiter import RateLimiter
+from sor.engine.retry import RetryPolicy
+
+from .conftest import fast_config
+
+
+async def test_starts_at_the_configured_concurrency():
+    limiter = RateLimiter(max_concurrency=8)
+    peak = 0
+    release = asyncio.Event()
+
+    async def call() -> None:
+        nonlocal peak
+        async with limiter.reserve(100, 100):
+            peak = max(peak, limiter.stats()["in_flight"])
+            await release.wait()
+
+    tasks = [asyncio.create_task(call()) for _ in range(12)]
+    await asyncio.sleep(0.05)
+    assert limiter.concurrency_limit == 8
+    assert peak == 8
+    release.set()
+    await asyncio.gather(*tasks)
+    assert limiter.stats()["in_flight"] == 0
+
+
+def test_halves_on_throttling_and_recovers_on_success():
+    limiter = RateLimiter(max_concurrency=8)
+
+    limiter.observe(429, {})
+    assert limiter.concurrency_limit == 4
+    limiter.observe(529, {})
+    assert limiter.concurrency_limit == 2
+
+    for _ in range(100):
+        limiter.observe(200, {})
+    assert limiter.concurrency_limit == 8
+
+
+def test_adopts_the_limits_in_response_headers():
+    limiter = RateLimiter(requests_per_minute=1000)
+
+    limiter.observe(200, {
+        "anthropic-ratelimit-requests-limit": "50",
+        "anthropic-ratelimit-requests-remaining": "10",
+    })
+
+    assert limiter.stats()["buckets"]["requests"] == {"limit": 50, "available": 10}
+
+
+async def test_fake_server_rejections_lower_the_limit(make_llm):
+    limiter = RateLimiter(max_concurrency=8)
+    llm = make_llm(
+        fast_config(error_rate_429=1.0),
+        rate_limiter=limiter,
+        retry_policy=RetryPolicy(max_attempts=1),
+    )
+
+    results = await asyncio.gather(
+        *(llm.complete("You are terse.", f"Question {i}.") for i in range(2)),
+        return_exceptions=True,
+    )
+
+    assert all(isinstance(result, Exception) for result in results)
+    assert limiter.concurrency_limit == 2
+    assert limiter.stats()["throttled_responses"] == 2
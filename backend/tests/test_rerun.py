@@ -0,0 +1,88 @@
+from sor.engine.orchestrator import StageOrchestrator
+from sor.models import SSEEvent, SSEEventType, StageStatus
+
+
+async def run(orchestrator, db, project, agents, **kwargs) -> list[SSEEvent]:
+    project = await db.get_project(project.id)
+    return [event async for event in orchestrator.run_stage(project, 1, agents, **kwargs)]
+
+
+def reused_report(events: list[SSEEvent]) -> bool:
+    (start,) = [e for e in events if e.type == SSEEventType.CONFLICT_START]
+    return start.data["reused_report"]
+
+
+async def conflict_calls(db, project) -> int:
+    summary = await db.get_usage_summary(project.id, 1)
+    return sum(p["calls"] for p in summary["by_purpose"] if p["purpose"] == "conflict")
+
+
+async def first_run(db, make_llm, project):
+    orchestrator = StageOrchestrator(make_llm(), db)
+    agents = await db.list_agents(stage=1, project_id=project.id)
+    await run(orchestrator, db, project, agents)
+    return orchestrator, agents, await db.get_stage_result(project.id, 1)
+
+
+async def test_a_rerun_replaces_only_the_rerun_agents(db, make_llm, project):
+    orchestrator, agents, before = await first_run(db, make_llm, project)
+    rerun, *kept = agents
+    # A changed prompt, so the rerun agent answers differently
+    changed = rerun.model_copy(update={"system_prompt": rerun.system_prompt + " Be brief."})
+    calls = await conflict_calls(db, project)
+    # The checkpoint is completed in place
+    outputs_before = {o.agent_id: o for o in before.model_copy(deep=True).agent_outputs}
+
+    events = await run(
+        orchestrator, db, project, [changed, *kept],
+        checkpoint=before, rerun_agent_ids={rerun.id},
+    )
+
+    after = await db.get_stage_result(project.id, 1)
+    outputs_after = {o.agent_id: o for o in after.agent_outputs}
+    assert outputs_after.keys() == outputs_before.keys()
+    for agent in kept:
+        assert outputs_after[agent.id] == outputs_before[agent.id]
+    assert outputs_after[rerun.id].id != outputs_before[rerun.id].id
+    assert outputs_after[rerun.id].content != outputs_before[rerun.id].content
+    assert after.status == StageStatus.COMPLETE
+    assert not reused_report(events)
+    assert await conflict_calls(db, project) > calls
+
+
+async def test_detection_is_skipped_when_the_outputs_come_back_unchanged(db, make_llm, project):
+    orchestrator, agents, before = await first_run(db, make_llm, project)
+    report = before.conflict_report
+    calls = await conflict_calls(db, project)
+
+    events = await run(
+        orchestrator, db, project, agents, checkpoint=before, rerun_agent_ids={agents[0].id},
+    )
+
+    after = await db.get_stage_result(project.id, 1)
+    assert reused_report(events)
+    assert after.conflict_report == report
+    assert await conflict_calls(db, project) == calls
+
+
+async def test_detection_runs_when_the_checkpoint_has_no_report(db, make_llm, project):
+    orchestrator, agents, before = await first_run(db, make_llm, project)
+    before.conflict_report = None
+    calls = await conflict_calls(db, project)
+
+    events = await run(
+        orchestrator, db, project, agents, checkpoint=before, rerun_agent_ids={agents[0].id},
+    )
+
+    assert not reused_report(events)
+    assert await conflict_calls(db, project) > calls
+
+
+async def test_an_approved_stage_cannot_be_rerun(api, db, make_llm, project):
+    await first_run(db, make_llm, project)
+    await db.update_stage_result(project.id, 1, status=StageStatus.APPROVED)
+
+    response = await api.post(f"/api/projects/{project.id}/stages/1/rerun", json={})
+
+    assert response.status_code == 409
+    assert (await db.get_stage_result(project.id, 1)).status == StageStatus.APPROVED
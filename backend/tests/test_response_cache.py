@@ -0,0 +1,58 @@
+from sor.engine.response_cache import ResponseCache
+
+SUMMARY_TOOL = {
+    "name": "record_summary",
+    "description": "Record a summary of the findings.",
+    "input_schema": {
+        "type": "object",
+        "properties": {"summary": {"type": "string"}, "confidence": {"type": "number"}},
+        "required": ["summary", "confidence"],
+    },
+}
+
+
+async def test_cache_hits_only_for_the_same_tools(make_llm, db):
+    cache = ResponseCache(db)
+    llm = make_llm(cache=cache)
+    other_tool = {**SUMMARY_TOOL, "description": "Record a one-line summary."}
+
+    first = await llm.complete_tool("Summarise.", "Findings: none.", [SUMMARY_TOOL], "record_summary")
+    again = await llm.complete_tool("Summarise.", "Findings: none.", [SUMMARY_TOOL], "record_summary")
+    assert again == first
+    assert cache.stats()["memory_hits"] == 1
+
+    await llm.complete_tool("Summarise.", "Findings: none.", [other_tool], "record_summary")
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 2
+    assert stats["writes"] == 2
+
+
+async def test_persisted_entries_survive_a_new_cache(make_llm, db):
+    llm = make_llm(cache=ResponseCache(db))
+    first = await llm.complete("You are terse.", "Say something.", temperature=0.0)
+
+    cache = ResponseCache(db)
+    again = await make_llm(cache=cache).complete("You are terse.", "Say something.", temperature=0.0)
+
+    assert again == first
+    assert cache.stats()["db_hits"] == 1
+
+
+async def test_cache_false_bypasses_the_cache(make_llm, db):
+    cache = ResponseCache(db)
+    llm = make_llm(cache=cache)
+
+    await llm.complete("You are terse.", "Say something.", cache=False)
+    await llm.complete("You are terse.", "Say something.", cache=False)
+
+    assert cache.stats()["writes"] == 0
+    assert cache.stats()["memory_hits"] == 0
+
+
+def test_cache_key_covers_tools():
+    payload = {"model": "m", "system": "s", "messages": [{"role": "user", "content": "u"}]}
+    with_tools = {**payload, "tools": [SUMMARY_TOOL], "tool_choice": {"type": "tool", "name": "record_summary"}}
+
+    assert ResponseCache.key(payload) != ResponseCache.key(with_tools)
+    assert ResponseCache.key(with_tools) == ResponseCache.key(dict(with_tools))
@@ -0,0 +1,100 @@
+import random
+
+import pytest
+
+from sor.engine.llm_client import CircuitOpenError, LLMError
+from sor.engine.retry import CircuitBreaker, RetryPolicy
+
+from .conftest import fast_config
+
+
+class RecordingPolicy(RetryPolicy):
+    """Records every backoff it computes, then retries almost at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.delays: list[float | None] = []
+
+    def next_delay(self, attempt, deadline_at, headers=None):
+        delay = super().next_delay(attempt, deadline_at, headers)
+        self.delays.append(delay)
+        return None if delay is None else 0.001
+
+
+def _seed_failing_first(rate: float, rolls_per_request: int = 1, roll: int = 0) -> int:
+    """A fake-server seed whose first request fails at ``rate`` and second does not.
+
+    Each request draws ``rolls_per_request`` numbers from the failure
+    generator; ``roll`` is the one deciding the failure.
+    """
+    for seed in range(1000):
+        rng = random.Random(seed)
+        first = [rng.random() for _ in range(rolls_per_request)]
+        second = [rng.random() for _ in range(rolls_per_request)]
+        if first[roll] < rate <= second[roll]:
+            return seed
+    raise AssertionError("no such seed")
+
+
+async def stream(llm) -> list[str]:
+    return [chunk async for chunk in llm.complete_stream("You are terse.", "Say something.")]
+
+
+async def test_retries_a_429_no_sooner_than_retry_after(make_llm):
+    policy = RecordingPolicy(base_delay=0.01)
+    llm = make_llm(fast_config(error_rate_429=0.5, seed=_seed_failing_first(0.5)), retry_policy=policy)
+
+    text = await llm.complete("You are terse.", "Say something.")
+
+    assert text
+    # The fake server sends retry-after: 1, well above the 10ms backoff cap
+    assert policy.delays == [pytest.approx(1.0)]
+
+
+async def test_gives_up_after_max_attempts(make_llm):
+    policy = RecordingPolicy(max_attempts=3, base_delay=0.01)
+    llm = make_llm(fast_config(error_rate_429=1.0), retry_policy=policy)
+
+    with pytest.raises(LLMError):
+        await llm.complete("You are terse.", "Say something.")
+
+    assert policy.delays == [pytest.approx(1.0), pytest.approx(1.0), None]
+
+
+async def test_retries_a_stream_overloaded_before_the_first_token(make_llm):
+    policy = RecordingPolicy(base_delay=0.01)
+    # Each streamed request rolls for a 429, then for a stream error
+    seed = _seed_failing_first(0.5, rolls_per_request=2, roll=1)
+    llm = make_llm(fast_config(stream_error_rate=0.5, seed=seed), retry_policy=policy)
+
+    chunks = await stream(llm)
+
+    assert "".join(chunks).strip()
+    assert len(policy.delays) == 1
+    assert 0.0 <= policy.delays[0] <= 0.01
+
+
+async def test_raises_a_stream_overloaded_after_output(make_llm):
+    policy = RecordingPolicy(base_delay=0.01)
+    llm = make_llm(fast_config(stream_error_rate=1.0, stream_error_after=3), retry_policy=policy)
+    chunks: list[str] = []
+
+    with pytest.raises(LLMError, match="overloaded_error"):
+        async for chunk in llm.complete_stream("You are terse.", "Say something."):
+            chunks.append(chunk)
+
+    assert len(chunks) == 3
+    assert policy.delays == []
+
+
+async def test_breaker_sheds_calls_after_repeated_overloads(make_llm):
+    llm = make_llm(
+        fast_config(error_rate_529=1.0),
+        retry_policy=RecordingPolicy(max_attempts=2, base_delay=0.01),
+        circuit_breaker=CircuitBreaker(failure_threshold=2, cooldown=60.0),
+    )
+    with pytest.raises(LLMError):
+        await llm.complete("You are terse.", "Say something.")
+
+    with pytest.raises(CircuitOpenError):
+        await llm.complete("You are terse.", "Something else.")
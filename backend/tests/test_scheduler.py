@@ -0,0 +1,89 @@
+import asyncio
+
+from sor.engine.jobs import JobManager
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.scheduler import Lane, StageScheduler
+from sor.models import Project
+
+from .conftest import fast_config
+from .test_jobs import collect
+
+
+async def queue(
+    scheduler: StageScheduler, project_id: str, granted: list[str],
+    lane: Lane = Lane.INTERACTIVE, release: asyncio.Event | None = None,
+) -> asyncio.Task:
+    """Queue a call that records its grant, then holds its slot until ``release``."""
+
+    async def call() -> None:
+        async with scheduler.slot(project_id, lane):
+            granted.append(project_id if lane == Lane.INTERACTIVE else f"{project_id}:batch")
+            if release is not None:
+                await release.wait()
+
+    task = asyncio.create_task(call())
+    await asyncio.sleep(0)
+    return task
+
+
+async def test_the_project_with_fewest_running_calls_goes_next():
+    scheduler = StageScheduler(max_concurrency=2)
+    granted: list[str] = []
+    hold_a, hold_x = asyncio.Event(), asyncio.Event()
+    tasks = [
+        await queue(scheduler, "a", granted, release=hold_a),
+        await queue(scheduler, "x", granted, release=hold_x),
+        await queue(scheduler, "a", granted),
+        await queue(scheduler, "a", granted),
+        await queue(scheduler, "b", granted),
+    ]
+    assert scheduler.stats()["waiting"] == {"interactive": 3, "batch": 0}
+
+    hold_x.set()
+    await asyncio.sleep(0.01)
+    # "a" still runs a call, so "b" goes ahead of the earlier "a" calls
+    assert granted == ["a", "x", "b", "a", "a"]
+    hold_a.set()
+    await asyncio.gather(*tasks)
+    assert scheduler.stats()["running"] == 0
+
+
+async def test_the_batch_lane_gets_every_nth_grant():
+    scheduler = StageScheduler(max_concurrency=1, batch_every=3)
+    granted: list[str] = []
+    hold = asyncio.Event()
+    tasks = [await queue(scheduler, "first", granted, release=hold)]
+    for _ in range(2):
+        tasks.append(await queue(scheduler, "p", granted, lane=Lane.BATCH))
+    for _ in range(4):
+        tasks.append(await queue(scheduler, "p", granted))
+
+    hold.set()
+    await asyncio.gather(*tasks)
+
+    assert granted == ["first", "p", "p", "p:batch", "p", "p", "p:batch"]
+
+
+async def test_an_interactive_stage_overtakes_a_batch_one(db, make_llm, project):
+    scheduler = StageScheduler(max_concurrency=1, batch_every=100)
+    llm = make_llm(fast_config(ttft_ms=50.0))
+    jobs = JobManager(StageOrchestrator(llm, db, scheduler=scheduler), db)
+    other = Project(name="Other", research_question="Does sleep improve recall?")
+    await db.create_project(other)
+    await db.clone_defaults_for_project(other.id)
+    finished: list[str] = []
+
+    async def run(target: Project, lane: Lane) -> None:
+        agents = await db.list_agents(stage=1, project_id=target.id)
+        job = await jobs.start(target, 1, agents, lane=lane)
+        await collect(jobs, job.id)
+        finished.append(lane)
+
+    batch = asyncio.create_task(run(project, Lane.BATCH))
+    await asyncio.sleep(0.01)
+    await run(other, Lane.INTERACTIVE)
+    await batch
+
+    # The batch stage started first but waits for the interactive one
+    assert finished == [Lane.INTERACTIVE, Lane.BATCH]
+    assert scheduler.stats()["granted"] == 8
@@ -0,0 +1,75 @@
+import asyncio
+
+from sor.engine.usage import track_usage
+
+from .conftest import fast_config
+
+SLOW = fast_config(ttft_ms=200.0)
+
+
+async def tracked(llm, purpose: str, **kwargs) -> tuple[str, list]:
+    with track_usage(purpose) as calls:
+        text = await llm.complete("You are terse.", "Say something.", temperature=0.0, **kwargs)
+    return text, calls
+
+
+async def test_identical_calls_share_one_upstream_call_and_its_usage(make_llm):
+    llm = make_llm(SLOW)
+
+    (first, first_calls), (second, second_calls) = await asyncio.gather(
+        tracked(llm, "first"), tracked(llm, "second"),
+    )
+
+    assert first == second
+    assert llm.stats()["single_flight"] == {"upstream_calls": 1, "deduplicated": 1, "in_flight": 0}
+    # Each caller is charged half, and the halves add up to the real call
+    totals = llm.stats()["usage"]
+    for field in ("input_tokens", "output_tokens"):
+        shares = [first_calls[0].model_dump()[field], second_calls[0].model_dump()[field]]
+        assert sum(shares) == totals[field]
+        assert abs(shares[0] - shares[1]) <= 1
+    assert [c.purpose for c in first_calls + second_calls] == ["first", "second"]
+
+
+async def test_uncached_calls_are_never_shared(make_llm):
+    llm = make_llm(SLOW)
+
+    (_, first_calls), (_, second_calls) = await asyncio.gather(
+        tracked(llm, "first", cache=False), tracked(llm, "second", cache=False),
+    )
+
+    assert llm.stats()["single_flight"]["upstream_calls"] == 0
+    output_tokens = first_calls[0].output_tokens + second_calls[0].output_tokens
+    assert output_tokens == llm.stats()["usage"]["output_tokens"]
+
+
+async def test_a_follower_leaving_does_not_stop_the_call(make_llm):
+    llm = make_llm(SLOW)
+
+    leaving = asyncio.create_task(tracked(llm, "leaving"))
+    staying = asyncio.create_task(tracked(llm, "staying"))
+    await asyncio.sleep(0.05)
+    leaving.cancel()
+
+    text, calls = await staying
+    assert text
+    assert leaving.cancelled()
+    # Only the caller that saw the call finish pays for it
+    assert calls[0].output_tokens == llm.stats()["usage"]["output_tokens"]
+    assert llm.stats()["single_flight"]["upstream_calls"] == 1
+
+
+async def test_the_call_stops_when_every_follower_has_left(make_llm):
+    llm = make_llm(fast_config(ttft_ms=5000.0))
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+
+    tasks = [asyncio.create_task(tracked(llm, name)) for name in ("a", "b")]
+    await asyncio.sleep(0.05)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    # The last caller to leave waited for the upstream call to unwind
+    assert llm.stats()["single_flight"] == {"upstream_calls": 1, "deduplicated": 1, "in_flight": 0}
+    assert loop.time() - started < 1.0
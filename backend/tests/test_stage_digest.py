@@ -0,0 +1,58 @@
+import asyncio
+
+from sor.engine.orchestrator import StageOrchestrator
+from sor.engine.stage_digest import has_fresh_digest
+from sor.models import StageResult, StageStatus
+
+from .conftest import fast_config
+
+# Long enough to be condensed by an LLM call
+OVERRIDE = "The recall effect is real but small. " * 400
+
+
+async def finished_stage(db, project, **fields) -> StageResult:
+    result = StageResult(
+        project_id=project.id, stage_number=1, status=StageStatus.COMPLETE, **fields,
+    )
+    await db.save_stage_result(result)
+    return result
+
+
+async def test_approval_does_not_wait_for_the_digest(db, make_llm, project):
+    orchestrator = StageOrchestrator(make_llm(fast_config(ttft_ms=500.0)), db)
+    await finished_stage(db, project, human_override=OVERRIDE)
+    loop = asyncio.get_running_loop()
+
+    started = loop.time()
+    assert await orchestrator.approve_stage(project.id, 1) == 2
+    assert loop.time() - started < 0.4
+
+    # Until the digest lands, the next stage gets the stage's full text
+    agents = await db.list_agents(stage=2, project_id=project.id)
+    context, _ = await orchestrator._load_shared_context(
+        await db.get_project(project.id), 2, agents,
+    )
+    assert OVERRIDE.strip() in context
+
+    building = await orchestrator.compact_stage(project.id, 1)
+    digest = await building
+    stored = await db.get_stage_result(project.id, 1)
+    assert stored.digest == digest
+    assert has_fresh_digest(stored)
+
+
+async def test_an_override_supersedes_the_digest_being_built(db, make_llm, project):
+    orchestrator = StageOrchestrator(make_llm(fast_config(ttft_ms=300.0)), db)
+    await finished_stage(db, project, human_override=OVERRIDE)
+    await orchestrator.approve_stage(project.id, 1)
+    first = await orchestrator.compact_stage(project.id, 1)
+
+    await db.update_stage_result(project.id, 1, human_override="Caffeine did nothing.")
+    second = await orchestrator.compact_stage(project.id, 1)
+
+    assert second is not first
+    await asyncio.gather(first, second, return_exceptions=True)
+    assert first.cancelled()
+    stored = await db.get_stage_result(project.id, 1)
+    assert has_fresh_digest(stored)
+    assert "Caffeine did nothing." in stored.digest
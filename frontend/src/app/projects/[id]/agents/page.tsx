@@ -210,6 +210,7 @@ export default function AgentsPage() {
                       system_prompt: "",
                       stage: addingToStage,
                       temperature: 0.7,
+                      max_tokens: 4096,
                       model: "gpt-4",
                       conflict_partners: [],
                       enabled: true,
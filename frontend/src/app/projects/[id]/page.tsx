@@ -1,17 +1,52 @@
 "use client";
 
-import { useEffect, useState } from "react";
+import { useCallback, useEffect, useRef, useState } from "react";
 import { useParams } from "next/navigation";
 import Link from "next/link";
 import { api } from "@/lib/api";
-import type { Project } from "@/lib/types";
+import { followPipelineSSE } from "@/lib/sse";
+import type { ApprovalMode, PipelineRun, Project } from "@/lib/types";
 import { STAGE_NAMES } from "@/lib/types";
 
+const APPROVAL_MODES: { id: ApprovalMode; label: string }[] = [
+  { id: "confidence", label: "Approve unless agents confidently disagree" },
+  { id: "always", label: "Approve every stage" },
+  { id: "manual", label: "Stop after each stage" },
+];
+
 export default function ProjectOverviewPage() {
   const params = useParams();
   const projectId = params.id as string;
   const [project, setProject] = useState<Project | null>(null);
   const [loading, setLoading] = useState(true);
+  const [pipeline, setPipeline] = useState<PipelineRun | null>(null);
+  const [approvalMode, setApprovalMode] = useState<ApprovalMode>("confidence");
+  const [pipelineStage, setPipelineStage] = useState<number | null>(null);
+  const [pipelineError, setPipelineError] = useState<string | null>(null);
+  const cleanupRef = useRef<(() => void) | null>(null);
+
+  const refresh = useCallback(() => {
+    api.getProject(projectId).then(setProject).catch(() => {});
+    api.getPipeline(projectId).then(setPipeline).catch(() => {});
+  }, [projectId]);
+
+  const followPipeline = useCallback((run: PipelineRun) => {
+    cleanupRef.current?.();
+    setPipeline(run);
+    setPipelineStage(run.current_stage);
+    setPipelineError(null);
+    cleanupRef.current = followPipelineSSE(projectId, run.id, {
+      onStage: (data) => setPipelineStage(data.stage_number),
+      onStageApproved: () => refresh(),
+      onPaused: () => refresh(),
+      onComplete: () => refresh(),
+      onCancelled: () => refresh(),
+      onError: (err) => {
+        setPipelineError(err.message);
+        refresh();
+      },
+    });
+  }, [projectId, refresh]);
 
   useEffect(() => {
     api
@@ -19,6 +54,28 @@ export default function ProjectOverviewPage() {
       .then(setProject)
       .catch(() => {})
       .finally(() => setLoading(false));
+    api
+      .getPipeline(projectId)
+      .then((run) => (run.status === "running" ? followPipeline(run) : setPipeline(run)))
+      .catch(() => {});
+    return () => cleanupRef.current?.();
+  }, [projectId, followPipeline]);
+
+  const handleStartPipeline = useCallback(async () => {
+    setPipelineError(null);
+    try {
+      followPipeline(await api.startPipeline(projectId, { mode: approvalMode }));
+    } catch (err: any) {
+      setPipelineError(err.message);
+    }
+  }, [projectId, approvalMode, followPipeline]);
+
+  const handleCancelPipeline = useCallback(async () => {
+    try {
+      await api.cancelPipeline(projectId);
+    } catch (err: any) {
+      setPipelineError(err.message);
+    }
   }, [projectId]);
 
   if (loading || !project) {
@@ -54,6 +111,70 @@ export default function ProjectOverviewPage() {
         </div>
       )}
 
+      {/* Unattended run of the remaining stages */}
+      {project.state !== "complete" && (
+        <div className="bg-zinc-900 rounded-xl border border-zinc-800 p-6">
+          <div className="flex items-start justify-between gap-4">
+            <div>
+              <h3 className="text-sm font-semibold text-zinc-300 mb-1">Run Remaining Stages</h3>
+              {pipeline?.status === "running" ? (
+                <p className="text-sm text-amber-400">
+                  Running stage {pipelineStage ?? pipeline.current_stage}: {STAGE_NAMES[pipelineStage ?? pipeline.current_stage]}
+                </p>
+              ) : pipeline?.status === "awaiting_approval" ? (
+                <div className="text-sm text-zinc-400">
+                  <p>
+                    Stopped at{" "}
+                    <Link href={`/projects/${project.id}/stages/${pipeline.current_stage}`} className="text-indigo-400 hover:underline">
+                      stage {pipeline.current_stage}
+                    </Link>
+                    , which needs your approval:
+                  </p>
+                  <ul className="list-disc list-inside text-xs text-zinc-500 mt-1">
+                    {pipeline.blockers.map((b) => (
+                      <li key={b}>{b}</li>
+                    ))}
+                  </ul>
+                </div>
+              ) : (
+                <p className="text-sm text-zinc-500">
+                  Runs each stage in turn and approves it according to the policy below.
+                </p>
+              )}
+              {pipelineError && <p className="text-xs text-red-400 mt-1">{pipelineError}</p>}
+            </div>
+            {pipeline?.status === "running" ? (
+              <button
+                onClick={handleCancelPipeline}
+                className="px-4 py-2 bg-zinc-800 text-zinc-200 rounded-lg text-sm font-medium hover:bg-zinc-700 transition-colors flex-shrink-0"
+              >
+                Cancel
+              </button>
+            ) : (
+              <div className="flex items-center gap-2 flex-shrink-0">
+                <select
+                  value={approvalMode}
+                  onChange={(e) => setApprovalMode(e.target.value as ApprovalMode)}
+                  className="bg-zinc-800 border border-zinc-700 rounded-lg px-2 py-2 text-xs text-zinc-300"
+                >
+                  {APPROVAL_MODES.map((m) => (
+                    <option key={m.id} value={m.id}>
+                      {m.label}
+                    </option>
+                  ))}
+                </select>
+                <button
+                  onClick={handleStartPipeline}
+                  className="px-4 py-2 bg-indigo-600 text-white rounded-lg text-sm font-medium hover:bg-indigo-500 transition-colors"
+                >
+                  Run All
+                </button>
+              </div>
+            )}
+          </div>
+        </div>
+      )}
+
       {/* Research context */}
       {project.context && (
         <div className="bg-zinc-900 rounded-xl border border-zinc-800 p-6">
@@ -23,6 +23,8 @@ export default function StageDetailPage() {
   const [activeTab, setActiveTab] = useState<Tab>("outputs");
   const [isRunning, setIsRunning] = useState(false);
   const [streamingAgents, setStreamingAgents] = useState<Set<string>>(new Set());
+  // Agent id -> position in the server's queue, until the agent starts streaming
+  const [queuePositions, setQueuePositions] = useState<Record<string, number>>({});
   const [overrideContent, setOverrideContent] = useState("");
   const [overrideNotes, setOverrideNotes] = useState("");
   const [savingOverride, setSavingOverride] = useState(false);
@@ -61,10 +63,11 @@ export default function StageDetailPage() {
     };
   }, [fetchData]);
 
-  const handleRunStage = useCallback(() => {
+  const followRun = useCallback((jobId?: string) => {
     setIsRunning(true);
     setError(null);
     setStreamingAgents(new Set());
+    setQueuePositions({});
 
     const cleanup = runStageSSE(projectId, stageNum, {
       onAgentStart: (data) => {
@@ -102,7 +105,18 @@ export default function StageDetailPage() {
             };
           }
           const exists = prev.agent_outputs.some((o) => o.agent_id === data.agent_id);
-          if (exists) return prev;
+          if (exists) {
+            // Re-run: clear the previous output so streamed deltas start fresh
+            return {
+              ...prev,
+              status: "running",
+              agent_outputs: prev.agent_outputs.map((o) =>
+                o.agent_id === data.agent_id
+                  ? { ...o, content: "", status: "running" as const, error: null }
+                  : o
+              ),
+            };
+          }
           return {
             ...prev,
             status: "running",
@@ -124,6 +138,25 @@ export default function StageDetailPage() {
           };
         });
       },
+      onAgentQueued: (data) => {
+        setQueuePositions((prev) => ({ ...prev, [data.agent_id]: data.position }));
+      },
+      onAgentDelta: (data) => {
+        setQueuePositions((prev) => {
+          if (!(data.agent_id in prev)) return prev;
+          const { [data.agent_id]: _, ...rest } = prev;
+          return rest;
+        });
+        setStageResult((prev) => {
+          if (!prev) return prev;
+          return {
+            ...prev,
+            agent_outputs: prev.agent_outputs.map((o) =>
+              o.agent_id === data.agent_id ? { ...o, content: o.content + data.text } : o
+            ),
+          };
+        });
+      },
       onAgentComplete: (data) => {
         setStreamingAgents((prev) => {
           const next = new Set(prev);
@@ -138,6 +171,7 @@ export default function StageDetailPage() {
               o.agent_id === data.agent_id
                 ? {
                     ...o,
+                    id: data.output_id || o.id,
                     content: data.content || o.content,
                     claims: data.claims || o.claims,
                     status: "complete" as const,
@@ -161,7 +195,7 @@ export default function StageDetailPage() {
               o.agent_id === data.agent_id
                 ? {
                     ...o,
-                    status: "error" as const,
+                    status: data.cancelled ? ("cancelled" as const) : ("error" as const),
                     error: data.error || "Unknown error",
                   }
                 : o
@@ -173,13 +207,26 @@ export default function StageDetailPage() {
       onConflictComplete: (data) => {
         setStageResult((prev) => {
           if (!prev) return prev;
-          return { ...prev, conflict_report: data };
+          return { ...prev, conflict_report: data.conflict_report ?? prev.conflict_report };
         });
-        setActiveTab("debate");
+        // A partial report (from the agents that finished first) is shown
+        // in place, the final one switches to it
+        if (!data.partial) setActiveTab("debate");
       },
       onStageComplete: (data) => {
         setIsRunning(false);
         setStreamingAgents(new Set());
+        // Outputs and the conflict report have already arrived via their
+        // own events, so only the persisted id and status need updating.
+        setStageResult((prev) => {
+          if (!prev) return prev;
+          return { ...prev, id: data.stage_result_id || prev.id, status: "complete" };
+        });
+      },
+      onStageCancelled: () => {
+        setIsRunning(false);
+        setStreamingAgents(new Set());
+        // Reload to pick up the partial outputs as they were saved
         fetchData();
       },
       onError: (err) => {
@@ -187,11 +234,31 @@ export default function StageDetailPage() {
         setStreamingAgents(new Set());
         setError(err.message);
       },
-    });
+    }, jobId);
 
     cleanupRef.current = cleanup;
   }, [projectId, stageNum, fetchData]);
 
+  const handleRunStage = useCallback(() => followRun(), [followRun]);
+
+  const handleRetryFailed = useCallback(async () => {
+    setError(null);
+    try {
+      const { job_id } = await api.rerunAgents(projectId, stageNum);
+      followRun(job_id);
+    } catch (err: any) {
+      setError(err.message);
+    }
+  }, [projectId, stageNum, followRun]);
+
+  const handleCancelRun = useCallback(async () => {
+    try {
+      await api.cancelStage(projectId, stageNum);
+    } catch (err: any) {
+      setError(err.message);
+    }
+  }, [projectId, stageNum]);
+
   const handleSaveOverride = useCallback(async () => {
     if (!overrideContent.trim()) return;
     setSavingOverride(true);
@@ -236,8 +303,9 @@ export default function StageDetailPage() {
   const stageStatus = stageResult?.status || "pending";
   const agentOutputs = stageResult?.agent_outputs || [];
   const conflictReport = stageResult?.conflict_report;
-  const canRun = stageStatus === "pending" || stageStatus === "complete";
+  const canRun = stageStatus === "pending" || stageStatus === "complete" || stageStatus === "cancelled";
   const canApprove = stageStatus === "complete" && !isRunning;
+  const hasFailedAgents = agentOutputs.some((o) => o.status === "error" || o.status === "cancelled");
 
   const tabs: { id: Tab; label: string; count?: number }[] = [
     { id: "outputs", label: "Agent Outputs", count: agentOutputs.length },
@@ -305,6 +373,28 @@ export default function StageDetailPage() {
                 )}
               </button>
             )}
+            {isRunning && (
+              <button
+                onClick={handleCancelRun}
+                className="inline-flex items-center gap-1.5 px-4 py-2.5 bg-zinc-800 text-zinc-200 rounded-lg text-sm font-medium hover:bg-zinc-700 transition-colors"
+              >
+                <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                  <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M6 18L18 6M6 6l12 12" />
+                </svg>
+                Cancel
+              </button>
+            )}
+            {(stageStatus === "complete" || stageStatus === "cancelled") && hasFailedAgents && !isRunning && (
+              <button
+                onClick={handleRetryFailed}
+                className="inline-flex items-center gap-1.5 px-4 py-2.5 bg-zinc-800 text-zinc-200 rounded-lg text-sm font-medium hover:bg-zinc-700 transition-colors"
+              >
+                <svg className="w-4 h-4" fill="none" stroke="currentColor" viewBox="0 0 24 24">
+                  <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M4 4v5h.582m15.356 2A8.001 8.001 0 004.582 9m0 0H9m11 11v-5h-.581m0 0a8.003 8.003 0 01-15.357-2m15.357 2H15" />
+                </svg>
+                Retry Failed Agents
+              </button>
+            )}
             {stageStatus === "approved" && stageNum === 6 && (
               <button
                 onClick={() => router.push(`/projects/${projectId}/report`)}
@@ -391,6 +481,7 @@ export default function StageDetailPage() {
                     key={output.agent_id}
                     output={output}
                     isStreaming={streamingAgents.has(output.agent_id)}
+                    queuePosition={queuePositions[output.agent_id]}
                   />
                 ))}
               </div>
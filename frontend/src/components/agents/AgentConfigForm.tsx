@@ -22,6 +22,7 @@ export function AgentConfigForm({
   const [perspective, setPerspective] = useState(agent?.perspective || "");
   const [systemPrompt, setSystemPrompt] = useState(agent?.system_prompt || "");
   const [temperature, setTemperature] = useState(agent?.temperature ?? 0.7);
+  const [maxTokens, setMaxTokens] = useState(agent?.max_tokens ?? 4096);
   const [stage, setStage] = useState(agent?.stage ?? 1);
   const [conflictPartners, setConflictPartners] = useState<string[]>(
     agent?.conflict_partners || []
@@ -53,6 +54,7 @@ export function AgentConfigForm({
           perspective: perspective.trim(),
           system_prompt: systemPrompt.trim(),
           temperature,
+          max_tokens: maxTokens,
           stage,
           conflict_partners: conflictPartners,
         });
@@ -60,7 +62,7 @@ export function AgentConfigForm({
         setSaving(false);
       }
     },
-    [name, role, perspective, systemPrompt, temperature, stage, conflictPartners, onSave]
+    [name, role, perspective, systemPrompt, temperature, maxTokens, stage, conflictPartners, onSave]
   );
 
   const inputClass = "w-full px-3 py-2 bg-zinc-950 border border-zinc-700 rounded-lg text-sm text-zinc-200 placeholder:text-zinc-600 focus:outline-none focus:ring-2 focus:ring-indigo-500 focus:border-indigo-500 transition-colors";
@@ -168,6 +170,26 @@ export function AgentConfigForm({
         </p>
       </div>
 
+      {/* Max tokens */}
+      <div>
+        <label htmlFor="agent-max-tokens" className="block text-sm font-medium text-zinc-300 mb-1">
+          Max Tokens per Call
+        </label>
+        <input
+          id="agent-max-tokens"
+          type="number"
+          min={256}
+          max={64000}
+          step={256}
+          value={maxTokens}
+          onChange={(e) => setMaxTokens(Number(e.target.value) || 4096)}
+          className={inputClass}
+        />
+        <p className="text-xs text-zinc-600 mt-1">
+          Outputs cut off at this limit are continued automatically
+        </p>
+      </div>
+
       {/* Stage */}
       <div>
         <label htmlFor="agent-stage" className="block text-sm font-medium text-zinc-300 mb-1">
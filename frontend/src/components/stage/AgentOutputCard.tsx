@@ -5,9 +5,26 @@ import type { AgentOutput } from "@/lib/types";
 interface AgentOutputCardProps {
   output: AgentOutput;
   isStreaming: boolean;
+  queuePosition?: number;
 }
 
-function StatusIndicator({ status, isStreaming }: { status: AgentOutput["status"]; isStreaming: boolean }) {
+function StatusIndicator({
+  status,
+  isStreaming,
+  queuePosition,
+}: {
+  status: AgentOutput["status"];
+  isStreaming: boolean;
+  queuePosition?: number;
+}) {
+  if (queuePosition !== undefined && (status === "running" || isStreaming)) {
+    return (
+      <div className="flex items-center gap-1.5">
+        <div className="w-3 h-3 rounded-full bg-zinc-600 animate-pulse" />
+        <span className="text-xs text-zinc-400 font-medium">Queued #{queuePosition}</span>
+      </div>
+    );
+  }
   if (status === "running" || isStreaming) {
     return (
       <div className="flex items-center gap-1.5">
@@ -44,7 +61,7 @@ function StatusIndicator({ status, isStreaming }: { status: AgentOutput["status"
   );
 }
 
-export function AgentOutputCard({ output, isStreaming }: AgentOutputCardProps) {
+export function AgentOutputCard({ output, isStreaming, queuePosition }: AgentOutputCardProps) {
   return (
     <div
       className={`bg-zinc-950 rounded-xl border p-5 transition-all ${
@@ -74,7 +91,7 @@ export function AgentOutputCard({ output, isStreaming }: AgentOutputCardProps) {
             <p className="text-[11px] text-zinc-600">Stage {output.stage}</p>
           </div>
         </div>
-        <StatusIndicator status={output.status} isStreaming={isStreaming} />
+        <StatusIndicator status={output.status} isStreaming={isStreaming} queuePosition={queuePosition} />
       </div>
 
       {/* Content */}
@@ -1,4 +1,4 @@
-import type { Project, StageResult, AgentConfig } from './types';
+import type { Project, StageResult, AgentConfig, ApprovalPolicy, PipelineRun } from './types';
 
 const API_BASE = process.env.NEXT_PUBLIC_API_URL || "";
 
@@ -43,12 +43,36 @@ export const api = {
     }
     return res.json();
   },
+  rerunAgents: (projectId: string, stageNum: number, agentIds?: string[]) =>
+    apiFetch<{ ok: boolean; job_id: string; agent_ids: string[] | null }>(`/api/projects/${projectId}/stages/${stageNum}/rerun`, {
+      method: "POST",
+      // A retried request gets the job the first one started
+      headers: { "Content-Type": "application/json", "Idempotency-Key": crypto.randomUUID() },
+      body: JSON.stringify({ agent_ids: agentIds ?? null }),
+    }),
+  cancelStage: (projectId: string, stageNum: number) =>
+    apiFetch<{ ok: boolean; job_id: string | null }>(`/api/projects/${projectId}/stages/${stageNum}/cancel`, {
+      method: "POST",
+    }),
   saveOverride: (projectId: string, stageNum: number, content: string, notes?: string) =>
     apiFetch<{ ok: boolean }>(`/api/projects/${projectId}/stages/${stageNum}/override`, {
       method: "PUT",
       body: JSON.stringify({ content, notes: notes || "" }),
     }),
 
+  // Unattended pipeline
+  startPipeline: (projectId: string, policy: ApprovalPolicy, endStage?: number) =>
+    apiFetch<PipelineRun>(`/api/projects/${projectId}/pipeline`, {
+      method: "POST",
+      body: JSON.stringify({ policy, end_stage: endStage ?? 6 }),
+    }),
+  getPipeline: (projectId: string) =>
+    apiFetch<PipelineRun>(`/api/projects/${projectId}/pipeline`),
+  cancelPipeline: (projectId: string) =>
+    apiFetch<{ ok: boolean; pipeline_id: string }>(`/api/projects/${projectId}/pipeline/cancel`, {
+      method: "POST",
+    }),
+
   // Agents
   listAgents: (params?: { stage?: number; project_id?: string }) => {
     const qs = new URLSearchParams();
@@ -1,25 +1,41 @@
 export interface SSECallbacks {
   onAgentStart?: (data: { agent_id: string; agent_name: string }) => void;
+  onAgentQueued?: (data: { agent_id: string; agent_name: string; position: number; lane: string }) => void;
+  onAgentDelta?: (data: { agent_id: string; agent_name: string; text: string }) => void;
   onAgentComplete?: (data: any) => void;
   onAgentError?: (data: any) => void;
   onConflictStart?: () => void;
   onConflictComplete?: (data: any) => void;
   onStageComplete?: (data: any) => void;
+  onStageCancelled?: (data: any) => void;
   onError?: (error: Error) => void;
 }
 
 export function runStageSSE(
   projectId: string,
   stageNum: number,
-  callbacks: SSECallbacks
+  callbacks: SSECallbacks,
+  jobId?: string
 ): () => void {
   const apiBase = process.env.NEXT_PUBLIC_API_URL || "";
-  const url = `${apiBase}/api/projects/${projectId}/stages/${stageNum}/run`;
+  // With a job id, follow that (already started) job instead of starting a
+  // run. Otherwise the key makes the browser's automatic reconnects join the
+  // run this request started rather than start another one.
+  const query = jobId
+    ? `?job_id=${encodeURIComponent(jobId)}`
+    : `?idempotency_key=${crypto.randomUUID()}`;
+  const url = `${apiBase}/api/projects/${projectId}/stages/${stageNum}/run${query}`;
   const eventSource = new EventSource(url);
 
   eventSource.addEventListener("agent_start", (e) => {
     callbacks.onAgentStart?.(JSON.parse(e.data));
   });
+  eventSource.addEventListener("agent_queued", (e) => {
+    callbacks.onAgentQueued?.(JSON.parse(e.data));
+  });
+  eventSource.addEventListener("agent_delta", (e) => {
+    callbacks.onAgentDelta?.(JSON.parse(e.data));
+  });
   eventSource.addEventListener("agent_complete", (e) => {
     callbacks.onAgentComplete?.(JSON.parse(e.data));
   });
@@ -36,11 +52,92 @@ export function runStageSSE(
     callbacks.onStageComplete?.(JSON.parse(e.data));
     eventSource.close();
   });
-  eventSource.onerror = (e) => {
-    callbacks.onError?.(new Error("SSE connection failed"));
+  eventSource.addEventListener("stage_cancelled", (e) => {
+    callbacks.onStageCancelled?.(JSON.parse(e.data));
+    eventSource.close();
+  });
+  eventSource.addEventListener("stage_error", (e) => {
+    const data = JSON.parse(e.data);
+    callbacks.onError?.(new Error(data.error || "Stage run failed"));
     eventSource.close();
+  });
+  eventSource.onerror = () => {
+    // The run continues server-side: the browser reconnects by itself and
+    // resumes after the last event it received (Last-Event-ID).
+    if (eventSource.readyState === EventSource.CLOSED) {
+      reportConnectionFailure(apiBase, callbacks);
+    }
   };
 
   // Return cleanup function
   return () => eventSource.close();
 }
+
+// EventSource hides the response status, so ask the server whether the run
+// was refused under load (429/503) to tell the user when to retry.
+function reportConnectionFailure(apiBase: string, callbacks: SSECallbacks) {
+  fetch(`${apiBase}/api/llm/load`)
+    .then((res) => res.json())
+    .then((load) => {
+      if (load.state === "overloaded" || load.state === "unavailable") {
+        callbacks.onError?.(
+          new Error(`Server busy: ${load.reason}. Try again in ${load.retry_after_seconds}s.`)
+        );
+      } else {
+        callbacks.onError?.(new Error("SSE connection failed"));
+      }
+    })
+    .catch(() => callbacks.onError?.(new Error("SSE connection failed")));
+}
+
+export interface PipelineCallbacks {
+  onStage?: (data: { stage_number: number; job_id: string | null }) => void;
+  onStageApproved?: (data: { stage_number: number; next_stage: number | null }) => void;
+  onPaused?: (data: { stage_number: number; blockers: string[] }) => void;
+  onComplete?: (data: any) => void;
+  onCancelled?: (data: any) => void;
+  onError?: (error: Error) => void;
+}
+
+export function followPipelineSSE(
+  projectId: string,
+  pipelineId: string,
+  callbacks: PipelineCallbacks
+): () => void {
+  const apiBase = process.env.NEXT_PUBLIC_API_URL || "";
+  const url = `${apiBase}/api/projects/${projectId}/pipeline/events?pipeline_id=${encodeURIComponent(pipelineId)}`;
+  const eventSource = new EventSource(url);
+
+  // The feed also carries every stage's own events; only the pipeline's
+  // progress is followed here.
+  eventSource.addEventListener("pipeline_stage", (e) => {
+    callbacks.onStage?.(JSON.parse(e.data));
+  });
+  eventSource.addEventListener("stage_approved", (e) => {
+    callbacks.onStageApproved?.(JSON.parse(e.data));
+  });
+  eventSource.addEventListener("pipeline_paused", (e) => {
+    callbacks.onPaused?.(JSON.parse(e.data));
+    eventSource.close();
+  });
+  eventSource.addEventListener("pipeline_complete", (e) => {
+    callbacks.onComplete?.(JSON.parse(e.data));
+    eventSource.close();
+  });
+  eventSource.addEventListener("pipeline_cancelled", (e) => {
+    callbacks.onCancelled?.(JSON.parse(e.data));
+    eventSource.close();
+  });
+  eventSource.addEventListener("pipeline_error", (e) => {
+    const data = JSON.parse(e.data);
+    callbacks.onError?.(new Error(data.error || "Pipeline failed"));
+    eventSource.close();
+  });
+  eventSource.onerror = () => {
+    if (eventSource.readyState === EventSource.CLOSED) {
+      callbacks.onError?.(new Error("SSE connection failed"));
+    }
+  };
+
+  return () => eventSource.close();
+}
@@ -13,6 +13,7 @@ export interface AgentConfig {
   system_prompt: string;
   stage: number;
   temperature: number;
+  max_tokens: number;
   model: string;
   conflict_partners: string[];
   enabled: boolean;
@@ -27,7 +28,7 @@ export interface AgentOutput {
   project_id: string;
   content: string;
   claims: Claim[];
-  status: "pending" | "running" | "complete" | "error";
+  status: "pending" | "running" | "complete" | "error" | "cancelled";
   error: string | null;
   created_at: string;
 }
@@ -60,7 +61,7 @@ export interface ConflictReport {
   synthesis: string;
 }
 
-export type StageStatus = "pending" | "running" | "complete" | "approved" | "skipped";
+export type StageStatus = "pending" | "running" | "complete" | "approved" | "skipped" | "cancelled";
 
 export interface StageResult {
   id: string;
@@ -72,6 +73,8 @@ export interface StageResult {
   human_override: string | null;
   human_notes: string;
   approved_at: string | null;
+  digest: string | null;
+  digest_fingerprint: string | null;
   created_at: string;
 }
 
@@ -90,6 +93,33 @@ export interface Project {
   updated_at: string;
 }
 
+export type ApprovalMode = "manual" | "always" | "confidence";
+
+export interface ApprovalPolicy {
+  mode: ApprovalMode;
+  confidence_threshold?: number;
+  max_confident_disagreements?: number;
+  require_all_agents?: boolean;
+}
+
+export type PipelineStatus = "running" | "awaiting_approval" | "complete" | "failed" | "cancelled";
+
+export interface PipelineRun {
+  id: string;
+  project_id: string;
+  status: PipelineStatus;
+  policy: ApprovalPolicy;
+  start_stage: number;
+  end_stage: number;
+  current_stage: number;
+  stage_jobs: Record<string, string>;
+  auto_approved: number[];
+  blockers: string[];
+  error: string | null;
+  created_at: string;
+  finished_at: string | null;
+}
+
 export const STAGE_NAMES: Record<number, string> = {
   1: "Problem Framing",
   2: "Evidence Gathering",